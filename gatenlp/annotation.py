@@ -5,9 +5,13 @@ import copy as lib_copy
 from functools import total_ordering
 from gatenlp.features import Features
 from gatenlp.offsetmapper import OFFSET_TYPE_JAVA, OFFSET_TYPE_PYTHON
-from gatenlp.utils import allowspan, support_annotation_or_set
+from gatenlp.utils import allowspan, support_annotation_or_set, intern_name, intern_feature_names
 from gatenlp.span import Span
 
+# the features dictionary of all annotations without features, never modified
+_NO_FEATURES = {}
+
+
 # TODO: add find_ann(ann) method to find all annotations which are equal to the given one
 #     this can also be used for content based membership tests, e.g. if annset.find(ann) ...
 @total_ordering
@@ -21,7 +25,11 @@ class Annotation:   # pylint: disable=R0904
 
     All fields except the features are immutable, once the annotation has been created
     only the features can be changed.
+
+    The Features object of an annotation which has no features only gets created when the features are
+    first accessed.
     """
+    __slots__ = ("_owner_set", "_features", "_type", "_start", "_end", "_id", "__weakref__")
 
     @allowspan
     def __init__(self, start: int, end: int, anntype: str, features=None, annid: int = 0):
@@ -55,12 +63,28 @@ class Annotation:   # pylint: disable=R0904
                 "id={annid}, features={features}: features must not be an int, mixed up with annid?"
             )
         self._owner_set = None
-        self._features = Features(features, _change_logger=self._log_feature_change)
+        # the Features object, or None if there are no features and the features have not been accessed yet
+        self._features = Features(features, _change_logger=self._log_feature_change) if features else None
         self._type = anntype
         self._start = start
         self._end = end
         self._id = annid
 
+    @classmethod
+    def _new(cls, start: int, end: int, anntype: str, features, annid: int):
+        """
+        Create an annotation without the checks done by the constructor, for creating many
+        annotations from offsets which have already been checked.
+        """
+        ann = cls.__new__(cls)
+        ann._owner_set = None
+        ann._features = Features(features, _change_logger=ann._log_feature_change) if features else None
+        ann._type = anntype
+        ann._start = start
+        ann._end = end
+        ann._id = annid
+        return ann
+
     @property
     def type(self) -> str:
         """
@@ -87,7 +111,24 @@ class Annotation:   # pylint: disable=R0904
         """
         Returns the features for the annotation.
         """
-        return self._features
+        features = self._features
+        if features is None:
+            features = self._features = Features(_change_logger=self._log_feature_change)
+        return features
+
+    def _features_data(self) -> dict:
+        """
+        Returns the dictionary of features without creating the Features object, for read-only use.
+        """
+        features = self._features
+        return _NO_FEATURES if features is None else features.data
+
+    def _features_to_dict(self) -> dict:
+        """
+        Returns `features.to_dict()` without creating the Features object.
+        """
+        features = self._features
+        return {} if features is None else features.to_dict()
 
     @property
     def id(self):  # pylint: disable=C0103
@@ -129,20 +170,15 @@ class Annotation:   # pylint: disable=R0904
         Returns:
 
         """
-        if self._changelog() is None:
+        owner = self._owner_set
+        if owner is None:
             return
-        command = "ann-" + command
-        change = {
-            "command": command,
-            "type": "annotation",
-            "set": self._owner_set.name,
-            "id": self.id,
-        }
-        if feature is not None:
-            change["feature"] = feature
-        if value is not None:
-            change["value"] = value
-        self._changelog().append(change)
+        if owner._feature_indices:
+            owner._update_feature_indices(self, command, feature, value)
+        changelog = owner.changelog
+        if changelog is None:
+            return
+        changelog._log_ann_feature("ann-" + command, self._owner_set.name, self.id, feature=feature, value=value)
 
     def equal(self, other):
         """
@@ -156,7 +192,7 @@ class Annotation:   # pylint: disable=R0904
             self.start == other.start and \
             self.end == other.end and \
             self.type == other.type and \
-            self.features == other.features
+            self._features_data() == other._features_data()
 
     def same(self, other):
         """
@@ -171,7 +207,7 @@ class Annotation:   # pylint: disable=R0904
             self.start == other.start and \
             self.end == other.end and \
             self.type == other.type and \
-            self.features == other.features
+            self._features_data() == other._features_data()
 
     def __lt__(self, other) -> bool:
         """
@@ -208,7 +244,7 @@ class Annotation:   # pylint: disable=R0904
         String representation of the annotation.
         """
         return "Annotation({},{},{},features={},id={})".format(
-            self.start, self.end, self.type, self._features, self.id
+            self.start, self.end, self.type, self._features or "Features({})", self.id
         )
 
     @property
@@ -501,7 +537,7 @@ class Annotation:   # pylint: disable=R0904
             "start": start,
             "end": end,
             "id": self.id,
-            "features": self._features.to_dict(),
+            "features": self._features_to_dict(),
         }
 
     @staticmethod
@@ -517,9 +553,9 @@ class Annotation:   # pylint: disable=R0904
         ann = Annotation(
             dictrepr.get("start"),
             dictrepr.get("end"),
-            dictrepr.get("type"),
+            intern_name(dictrepr.get("type")),
             annid=dictrepr.get("id"),
-            features=dictrepr.get("features"),
+            features=intern_feature_names(dictrepr.get("features")),
         )
         ann._owner_set = owner_set
         return ann
@@ -536,7 +572,7 @@ class Annotation:   # pylint: disable=R0904
         return self.__copy__()
 
     def __deepcopy__(self, memo=None):
-        if self._features is not None:
+        if self._features:
             fts = lib_copy.deepcopy(self._features.to_dict(), memo=memo)
         else:
             fts = None
@@ -5,16 +5,17 @@ annotations which can arbitrarily overlap.
 AnnotationSet instances compare equal by object identity and are hashable.
 """
 
-from typing import Any, List, Union, Dict, Set, KeysView, Iterator, Generator
+from typing import Any, List, Union, Dict, Set, Tuple, KeysView, Iterator, Generator
 # TODO: prior to Python 3.9 we need different Iterable definitions for typing and type checking
 from collections.abc import Iterable as abc_Iterable
 from typing import Iterable, Optional
-from collections import defaultdict
+from collections import defaultdict, Counter
 import copy
+import bisect
 from gatenlp.span import Span
 from gatenlp.annotation import Annotation
 from gatenlp.impl import SortedIntvls
-from gatenlp.utils import support_annotation_or_set, allowspan
+from gatenlp.utils import support_annotation_or_set, allowspan, intern_name
 
 __pdoc__ = {
     "AnnotationSet.__iter__": True,
@@ -31,10 +32,84 @@ class InvalidOffsetError(KeyError):
     pass
 
 
+# the kinds of indices an annotation set can have: by offset, by offset and length (used when iterating in
+# start offset and length order) and by type
+INDEX_KINDS = ("offset", "ol", "type")
+
+# the number of index builds and lookups for all annotation sets, see global_index_stats()
+_GLOBAL_INDEX_COUNTS = Counter()
+
+
+def _index_stats_dict(counts):
+    return {
+        kind: {"builds": counts[kind + "_builds"], "lookups": counts[kind + "_lookups"]} for kind in INDEX_KINDS
+    }
+
+
+# the key in a feature index for the ids of all annotations with a feature value which is not hashable
+UNHASHABLE_VALUES = object()
+
+
+def _feature_index_key(value):
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return UNHASHABLE_VALUES
+
+
+def _feature_index_add(index, annid, fdata, feature):
+    """
+    Add the annotation id to the feature index under the value of the feature in fdata, if it has the feature.
+    """
+    if feature in fdata:
+        index[_feature_index_key(fdata[feature])].add(annid)
+
+
+def _feature_index_remove(index, annid, fdata, feature):
+    """
+    Remove the annotation id from the feature index, if it has the feature in fdata.
+    """
+    if feature in fdata:
+        key = _feature_index_key(fdata[feature])
+        annids = index.get(key)
+        if annids is not None:
+            annids.discard(annid)
+            if not annids:
+                del index[key]
+
+
+def global_index_stats(reset: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Returns the number of times each kind of index was built and used for a lookup, summed over all
+    annotation sets since the program started or since the statistics were last reset.
+
+    Args:
+        reset: if True, reset the counts to zero after returning them
+
+    Returns:
+        a dictionary which maps each index kind ("offset", "ol", "type") to a dictionary with the keys
+        "builds" and "lookups"
+    """
+    stats = _index_stats_dict(_GLOBAL_INDEX_COUNTS)
+    if reset:
+        _GLOBAL_INDEX_COUNTS.clear()
+    return stats
+
+
 class AnnotationSet:
     """
     Represents a collection of annotations for a document.
     """
+    # True if the annotation map, annotation set and indices may be shared with a copy of this set
+    # and must be copied before modifying them
+    _shared = False
+    # the number of index builds and lookups for this set, created when first needed
+    _index_counts = None
+    # the feature indices created with create_feature_index: a map from (type, feature name) to a map from
+    # each feature value to the set of ids of the annotations of that type which have that value
+    _feature_indices = None
+
     def __init__(self, name: str = ""):
         """
         Creates a detached mutable annotation set, i.e. an AnnotationSet which
@@ -68,6 +143,7 @@ class AnnotationSet:
         self._annset = set()
         self._is_immutable = False
         self._next_annid = 0
+        self._shared = False
 
     @classmethod
     def _create(cls, name: str = "", owner_doc=None):
@@ -121,6 +197,9 @@ class AnnotationSet:
         The annotations contained in the detached set are identical (same objects)
         as the annotations in the original set.
 
+        A detached copy of the whole set shares the indices which already exist with this set, so they do
+        not have to get built again.
+
         Args:
           restrict_to: an iterable of annotation ids, if None, all the
               annotations from this set.
@@ -128,16 +207,17 @@ class AnnotationSet:
         Returns:
           an immutable annotation set
         """
+        if restrict_to is None:
+            # share the annotations and all indices which already exist with this set, they only get copied
+            # if this set gets modified
+            annset = self.__copy__()
+            annset._is_immutable = True
+            return annset
         annset = AnnotationSet(name="detached-from:" + self.name)
         annset._is_immutable = True
-        if restrict_to is None:
-            annset._annotations = {
-                annid: self._annotations[annid] for annid in self._annotations.keys()
-            }
-        else:
-            annset._annotations = {
-                annid: self._annotations[annid] for annid in restrict_to
-            }
+        annset._annotations = {
+            annid: self._annotations[annid] for annid in restrict_to
+        }
         annset._annset.update(annset._annotations.values())
         annset._next_annid = self._next_annid
         return annset
@@ -287,25 +367,42 @@ class AnnotationSet:
         """
         return self._owner_doc is None
 
+    def _count_index_use(self, kind: str, built: bool) -> None:
+        """
+        Count a lookup of the index of the given kind, and a build if built is True.
+        """
+        counts = self._index_counts
+        if counts is None:
+            counts = self._index_counts = Counter()
+        key = kind + "_lookups"
+        counts[key] += 1
+        _GLOBAL_INDEX_COUNTS[key] += 1
+        if built:
+            key = kind + "_builds"
+            counts[key] += 1
+            _GLOBAL_INDEX_COUNTS[key] += 1
+
     def _create_index_by_offset(self) -> None:
         """
         Generates the offset index, if it does not already exist.
         The offset index is an interval tree that stores the annotation
         ids for the offset interval of the annotation.
         """
-        if self._index_by_offset is None:
+        built = self._index_by_offset is None
+        if built:
             self._index_by_offset = SortedIntvls()
-            for ann in self._annotations.values():
-                self._index_by_offset.add(ann.start, ann.end, ann.id)
+            self._index_by_offset.update([(ann.start, ann.end, ann.id) for ann in self._annotations.values()])
+        self._count_index_use("offset", built)
 
     def _create_index_by_ol(self) -> None:
         """
         Generates an index by start offset, end offset and annotation id
         """
-        if self._index_by_ol is None:
+        built = self._index_by_ol is None
+        if built:
             self._index_by_ol = SortedIntvls(by_ol=True)
-            for ann in self._annotations.values():
-                self._index_by_ol.add(ann.start, ann.end, ann.id)
+            self._index_by_ol.update([(ann.start, ann.end, ann.id) for ann in self._annotations.values()])
+        self._count_index_use("ol", built)
 
     def _create_index_by_type(self) -> None:
         """
@@ -313,10 +410,75 @@ class AnnotationSet:
         The type index is a map from
         annotation type to a set of all annotation ids with that type.
         """
-        if self._index_by_type is None:
+        built = self._index_by_type is None
+        if built:
             self._index_by_type = defaultdict(set)
             for ann in self._annotations.values():
                 self._index_by_type[ann.type].add(ann.id)
+        self._count_index_use("type", built)
+
+    def build_indices(self, kinds: Union[None, str, Iterable[str]] = None, rebuild: bool = False) -> None:
+        """
+        Builds the indices of the given kinds now, instead of when they are first needed. Once built, the indices
+        are kept up to date when annotations get added, removed or their offsets get changed.
+
+        Args:
+            kinds: the kind of index or an iterable of index kinds to build, see `INDEX_KINDS`: "offset" for
+                the index used by all offset based methods, "ol" for the index used for iterating by start offset
+                and length, "type" for the index by annotation type. If None, all kinds of indices.
+            rebuild: if True, build the indices again even if they already exist
+        """
+        kinds = self._index_kinds(kinds)
+        if rebuild:
+            self.drop_indices(kinds)
+        for kind in kinds:
+            if kind == "offset":
+                self._create_index_by_offset()
+            elif kind == "ol":
+                self._create_index_by_ol()
+            else:
+                self._create_index_by_type()
+
+    def drop_indices(self, kinds: Union[None, str, Iterable[str]] = None) -> None:
+        """
+        Removes the indices of the given kinds to free their memory, they get built again when needed.
+
+        Args:
+            kinds: the kind of index or an iterable of index kinds to remove, see `build_indices`.
+                If None, all kinds of indices.
+        """
+        for kind in self._index_kinds(kinds):
+            # this does not change any index which may be shared with a copy of this set
+            if kind == "offset":
+                self._index_by_offset = None
+            elif kind == "ol":
+                self._index_by_ol = None
+            else:
+                self._index_by_type = None
+
+    @staticmethod
+    def _index_kinds(kinds) -> List[str]:
+        if kinds is None:
+            return list(INDEX_KINDS)
+        if isinstance(kinds, str):
+            kinds = [kinds]
+        kinds = list(kinds)
+        for kind in kinds:
+            if kind not in INDEX_KINDS:
+                raise Exception(f"Not a known index kind: {kind}, must be one of {INDEX_KINDS}")
+        return kinds
+
+    def index_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns information about the indices of this set: for each index kind ("offset", "ol", "type"),
+        a dictionary with the keys "built" (True if the index currently exists), "builds" (how often the index
+        was built) and "lookups" (how often the index was used).
+        """
+        stats = _index_stats_dict(self._index_counts or Counter())
+        stats["offset"]["built"] = self._index_by_offset is not None
+        stats["ol"]["built"] = self._index_by_ol is not None
+        stats["type"]["built"] = self._index_by_type is not None
+        return stats
 
     def _add_to_indices(self, annotation: Annotation) -> None:
         """
@@ -330,6 +492,10 @@ class AnnotationSet:
             self._index_by_type[annotation.type].add(annotation.id)
         if self._index_by_offset is not None:
             self._index_by_offset.add(annotation.start, annotation.end, annotation.id)
+        if self._index_by_ol is not None:
+            self._index_by_ol.add(annotation.start, annotation.end, annotation.id)
+        if self._feature_indices:
+            self._add_to_feature_indices(annotation)
 
     def _remove_from_indices(self, annotation: Annotation) -> None:
         """
@@ -342,8 +508,89 @@ class AnnotationSet:
             self._index_by_offset.remove(
                 annotation.start, annotation.end, annotation.id
             )
+        if self._index_by_ol is not None:
+            self._index_by_ol.remove(
+                annotation.start, annotation.end, annotation.id
+            )
         if self._index_by_type is not None:
-            self._index_by_type[annotation.type].remove(annotation.id)
+            typeids = self._index_by_type[annotation.type]
+            typeids.remove(annotation.id)
+            if not typeids:
+                del self._index_by_type[annotation.type]
+        if self._feature_indices:
+            fdata = annotation._features_data()
+            for (anntype, feature), index in self._feature_indices.items():
+                if anntype == annotation.type:
+                    _feature_index_remove(index, annotation.id, fdata, feature)
+
+    def _add_to_feature_indices(self, annotation: Annotation) -> None:
+        """
+        Add the annotation to all feature indices for its type.
+        """
+        fdata = annotation._features_data()
+        if not fdata:
+            return
+        for (anntype, feature), index in self._feature_indices.items():
+            if anntype == annotation.type:
+                _feature_index_add(index, annotation.id, fdata, feature)
+
+    def _update_feature_indices(self, annotation: Annotation, command: str, feature: str, value) -> None:
+        """
+        Update the feature indices for a change of the features of an annotation owned by this set. This
+        gets called before the change is carried out.
+        """
+        fdata = annotation._features_data()
+        for (anntype, fname), index in self._feature_indices.items():
+            if anntype != annotation.type:
+                continue
+            if command == "features:clear":
+                _feature_index_remove(index, annotation.id, fdata, fname)
+            elif fname == feature:
+                _feature_index_remove(index, annotation.id, fdata, fname)
+                if command == "feature:set":
+                    _feature_index_add(index, annotation.id, {fname: value}, fname)
+
+    def create_feature_index(self, anntype: str, feature: str) -> None:
+        """
+        Creates an index of the values of a feature for all annotations of the given type, which is used by
+        `with_feature` and kept up to date when annotations get added or removed and when the features of
+        the annotations get changed. All annotations with feature values which are not hashable are stored
+        together under the key `UNHASHABLE_VALUES`.
+
+        NOTE: changes of the features are only tracked for the annotations owned by this set, so the index
+        of a detached set which shares its annotations with another set may get out of date.
+
+        Args:
+            anntype: the annotation type
+            feature: the feature name
+        """
+        if self._feature_indices is None:
+            self._feature_indices = {}
+        key = (anntype, feature)
+        if key in self._feature_indices:
+            return
+        index = defaultdict(set)
+        self._create_index_by_type()
+        for annid in self._index_by_type.get(anntype, ()):
+            _feature_index_add(index, annid, self._annotations[annid]._features_data(), feature)
+        self._feature_indices[key] = index
+
+    def drop_feature_index(self, anntype: str, feature: str) -> None:
+        """
+        Removes the feature index for the given annotation type and feature name, if it exists.
+
+        Args:
+            anntype: the annotation type
+            feature: the feature name
+        """
+        if self._feature_indices:
+            self._feature_indices.pop((anntype, feature), None)
+
+    def has_feature_index(self, anntype: str, feature: str) -> bool:
+        """
+        Returns True if there is a feature index for the given annotation type and feature name.
+        """
+        return self._feature_indices is not None and (anntype, feature) in self._feature_indices
 
     @staticmethod
     def _intvs2idlist(intvs, ignore_id=None) -> List[int]:
@@ -533,33 +780,107 @@ class AnnotationSet:
         if self._is_immutable:
             raise Exception("Cannot add an annotation to an immutable annotation set")
         self._check_offsets(start, end)
-        if annid and annid in self._annotations:
+        if annid is not None and annid in self._annotations:
             raise Exception(
                 "Cannot add annotation with id {}, already in set".format(annid)
             )
         if annid is None:
             annid = self._next_annid
             self._next_annid = self._next_annid + 1
-        ann = Annotation(start, end, anntype, features=features, annid=annid)
+        elif annid >= self._next_annid:
+            # make sure an annotation id assigned later does not clash with this one
+            self._next_annid = annid + 1
+        ann = Annotation(start, end, intern_name(anntype), features=features, annid=annid)
         ann._owner_set = self
+        if self._shared:
+            self._unshare()
         if not self._annotations:
             self._annotations = {}
         self._annotations[annid] = ann
         self._annset.add(ann)
         self._add_to_indices(ann)
-        if self.changelog is not None:
-            entry = {
-                "command": "annotation:add",
-                "set": self.name,
-                "start": ann.start,
-                "end": ann.end,
-                "type": ann.type,
-                "features": ann._features.to_dict(),
-                "id": ann.id,
-            }
-            self.changelog.append(entry)
+        changelog = self.changelog
+        if changelog is not None:
+            changelog._log_add_ann(self.name, ann)
         return ann
 
+    def add_many(self, annsdata: Iterable[Tuple]) -> List[Annotation]:
+        """
+        Adds many new annotations at once. This is faster than adding each annotation
+        with `add` because the indices, if they exist, are updated once for all annotations.
+        The annotations get the next free annotation ids, in order, unless an annotation id is given.
+
+        If any of the annotations cannot be added, an exception is raised and the set is left unchanged.
+
+        Args:
+            annsdata: an iterable of tuples (start, end, type), (start, end, type, features) or
+                (start, end, type, features, annid). If annid is given and not None, it must not
+                already be used in the set.
+
+        Returns:
+            the list of new annotations
+        """
+        if self._is_immutable:
+            raise Exception("Cannot add an annotation to an immutable annotation set")
+        # create and check all the annotations first, so that the set stays unchanged if there is an error
+        anns = []
+        nextid = self._next_annid
+        newids = set()
+        annotations = self._annotations or {}
+        check_offsets = self._check_offsets
+        if self._owner_doc is None or self._owner_doc.text is None:
+            doc_size = None
+        else:
+            doc_size = len(self._owner_doc)
+        new_annotation = Annotation._new
+        for anndata in annsdata:
+            start, end, anntype = anndata[0], anndata[1], anndata[2]
+            features = anndata[3] if len(anndata) > 3 else None
+            annid = anndata[4] if len(anndata) > 4 else None
+            if doc_size is not None and not 0 <= start <= end <= doc_size:
+                # raises the appropriate error
+                check_offsets(start, end)
+            if start > end:
+                raise InvalidOffsetError("Annotation ends before it starts")
+            if isinstance(features, int):
+                raise Exception("Parameter features must not be an int: mixed up with annid?")
+            if annid is None:
+                annid = nextid
+            elif annid in annotations or annid in newids:
+                raise Exception(
+                    "Cannot add annotation with id {}, already in set".format(annid)
+                )
+            if annid >= nextid:
+                nextid = annid + 1
+            newids.add(annid)
+            ann = new_annotation(start, end, intern_name(anntype), features, annid)
+            ann._owner_set = self
+            anns.append(ann)
+        if self._shared:
+            self._unshare()
+        if not self._annotations:
+            self._annotations = {}
+        self._annotations.update((ann.id, ann) for ann in anns)
+        self._next_annid = nextid
+        self._annset.update(anns)
+        if self._index_by_type is not None:
+            for ann in anns:
+                self._index_by_type[ann.type].add(ann.id)
+        if self._feature_indices:
+            for ann in anns:
+                self._add_to_feature_indices(ann)
+        if self._index_by_offset is not None or self._index_by_ol is not None:
+            intvs = [(ann.start, ann.end, ann.id) for ann in anns]
+            if self._index_by_offset is not None:
+                self._index_by_offset.update(intvs)
+            if self._index_by_ol is not None:
+                self._index_by_ol.update(intvs)
+        changelog = self.changelog
+        if changelog is not None:
+            for ann in anns:
+                changelog._log_add_ann(self.name, ann)
+        return anns
+
     def add_ann(self, ann, annid: int = None):
         """
         Adds a shallow copy of the given ann to the annotation set,
@@ -666,6 +987,8 @@ class AnnotationSet:
             ann = annoriter
         else:
             raise Exception("Not an Annotation or annotation id: {}".format(annoriter))
+        if self._shared:
+            self._unshare()
         # remove from the set of annotations. This should never fail, since we
         # checked above that the annotation is in the set.
         self._annset.remove(ann)
@@ -689,12 +1012,20 @@ class AnnotationSet:
                 will get annotation ids starting from 0. IMPORTANT: this must not be used for code to run in the
                 Java GATE Python plugin, as Java GATE handles annotation ids differently!
         """
-        self._annotations.clear()
-        self._annset.clear()
+        if self._shared:
+            self._annotations = {}
+            self._annset = set()
+            self._shared = False
+        else:
+            self._annotations.clear()
+            self._annset.clear()
         if reset_annids:
             self._next_annid = 0
         self._index_by_offset = None
+        self._index_by_ol = None
         self._index_by_type = None
+        if self._feature_indices:
+            self._feature_indices = {key: defaultdict(set) for key in self._feature_indices}
         if self.changelog is not None:
             self.changelog.append({"command": "annotations:clear", "set": self.name})
 
@@ -712,22 +1043,50 @@ class AnnotationSet:
         Args:
             memo: for internal use by our __deepcopy__ implementation.
         """
+        if self._shared:
+            self._unshare()
         tmpdict = {}
         for annid, ann in self._annotations.items():
             newann = copy.deepcopy(ann, memo=memo)
             ann._owner_set = None
+            newann._owner_set = self
             tmpdict[annid] = newann
         for annid, ann in tmpdict.items():
             self._annset.remove(self._annotations[annid])
             self._annotations[annid] = ann
             self._annset.add(ann)
 
+    def _unshare(self):
+        """
+        Make sure the annotation map, annotation set and indices are not shared with any copy of this set,
+        so they can get modified.
+        """
+        self._annotations = dict(self._annotations)
+        self._annset = set(self._annset)
+        if self._index_by_offset is not None:
+            self._index_by_offset = self._index_by_offset.copy()
+        if self._index_by_ol is not None:
+            self._index_by_ol = self._index_by_ol.copy()
+        if self._index_by_type is not None:
+            self._index_by_type = defaultdict(set, {k: set(v) for k, v in self._index_by_type.items()})
+        self._shared = False
+
     def __copy__(self):
         """
         NOTE: creating a copy always creates a detached set, but a mutable one.
-        """
-        c = self.detach()
-        c._is_immutable = False
+
+        The copy is cheap: the copy and the original share all the data structures until one of them gets
+        modified for the first time, only then that set gets its own copy (copy-on-write).
+        """
+        c = AnnotationSet(name="detached-from:" + self.name)
+        c._annotations = self._annotations
+        c._annset = self._annset
+        c._index_by_offset = self._index_by_offset
+        c._index_by_ol = self._index_by_ol
+        c._index_by_type = self._index_by_type
+        c._next_annid = self._next_annid
+        c._shared = True
+        self._shared = True
         return c
 
     def copy(self):
@@ -1091,6 +1450,38 @@ class AnnotationSet:
             annids = [ann.id for ann in retanns]
         return self.detach(restrict_to=annids)
 
+    def with_feature(self, anntype: str, feature: str, value) -> "AnnotationSet":
+        """
+        Gets annotations of the given type which have the given feature with the given value.
+        This uses the feature index for the type and feature if it has been created with
+        `create_feature_index`, otherwise all annotations of the type are checked.
+
+        Args:
+            anntype: the annotation type
+            feature: the feature name
+            value: the feature value, compared for equality
+
+        Returns:
+            an immutable detached annotation set with the matching annotations
+        """
+        index = None
+        if self._feature_indices is not None:
+            index = self._feature_indices.get((anntype, feature))
+        if index is None:
+            self._create_index_by_type()
+            candidates = self._index_by_type.get(anntype, ())
+        else:
+            key = _feature_index_key(value)
+            if key is not UNHASHABLE_VALUES:
+                return self.detach(restrict_to=index.get(key, ()))
+            candidates = index.get(key, ())
+        annids = []
+        for annid in candidates:
+            fdata = self._annotations[annid]._features_data()
+            if feature in fdata and fdata[feature] == value:
+                annids.append(annid)
+        return self.detach(restrict_to=annids)
+
     def by_offset(self):
         """
         Yields lists of annotations which start at the same offset.
@@ -1368,6 +1759,147 @@ class AnnotationSet:
             ignore_id = None
         return self._restrict_intvs(intvs, ignore_id=ignore_id)
 
+    def _anns_by_start(self) -> List[Annotation]:
+        """
+        Return the list of annotations in this set sorted by start offset, using the offset index.
+        """
+        self._create_index_by_offset()
+        anns = self._annotations
+        return [anns[annid] for _start, _end, annid in self._index_by_offset.irange()]
+
+    def group_within(self, containers: Iterable[Annotation], include_self: bool = False) \
+            -> Dict[Annotation, "AnnotationSet"]:
+        """
+        For each of the container annotations, gets the annotations in this set which are within the
+        container, like `within(container)`, but for all containers in a single pass over the containers and
+        the annotations of this set, both sorted by start offset.
+
+        Args:
+            containers: an annotation set or iterable of annotations
+            include_self: if True, a container annotation which is also in this set is included in its own group
+
+        Returns:
+            a dictionary which maps each container annotation, in the order of `containers`, to an immutable
+            detached annotation set of the annotations within it
+        """
+        anns = self._anns_by_start()
+        containers = list(containers)
+        groups = {container: [] for container in containers}
+        nanns = len(anns)
+        first = 0
+        for container in sorted(containers, key=lambda a: a.start):
+            cstart = container.start
+            cend = container.end
+            # the containers get processed by increasing start offset, so all annotations which start
+            # before the current container start can be skipped for all remaining containers
+            while first < nanns and anns[first].start < cstart:
+                first += 1
+            members = groups[container]
+            i = first
+            while i < nanns and anns[i].start <= cend:
+                ann = anns[i]
+                if ann.end <= cend and (include_self or ann is not container):
+                    members.append(ann.id)
+                i += 1
+        return {container: self.detach(restrict_to=annids) for container, annids in groups.items()}
+
+    def group_overlapping(self, others: Iterable[Annotation], include_self: bool = False) \
+            -> Dict[Annotation, "AnnotationSet"]:
+        """
+        For each of the other annotations, gets the annotations in this set which overlap with it,
+        like `overlapping(other)`, but for all other annotations in a single pass over both, sorted by
+        start offset.
+
+        Args:
+            others: an annotation set or iterable of annotations
+            include_self: if True, an annotation from others which is also in this set is included in its
+                own group
+
+        Returns:
+            a dictionary which maps each of the other annotations, in the order of `others`, to an immutable
+            detached annotation set of the annotations of this set overlapping with it
+        """
+        anns = self._anns_by_start()
+        others = list(others)
+        groups = {other: [] for other in others}
+        nanns = len(anns)
+        nxt = 0
+        # the annotations which start before the start of the current other annotation and end after it
+        active = []
+        for other in sorted(others, key=lambda a: a.start):
+            ostart = other.start
+            oend = other.end
+            while nxt < nanns and anns[nxt].start < ostart:
+                active.append(anns[nxt])
+                nxt += 1
+            active = [ann for ann in active if ann.end > ostart]
+            members = groups[other]
+            # all active annotations overlap, whether the other annotation has zero length or not
+            members.extend(ann.id for ann in active if include_self or ann is not other)
+            i = nxt
+            while i < nanns and (anns[i].start < oend or anns[i].start == ostart):
+                ann = anns[i]
+                if include_self or ann is not other:
+                    members.append(ann.id)
+                i += 1
+        return {other: self.detach(restrict_to=annids) for other, annids in groups.items()}
+
+    def nearest_before(self, others: Iterable[Annotation]) -> Dict[Annotation, Optional[Annotation]]:
+        """
+        For each of the other annotations, gets the annotation in this set which ends closest before
+        or at the start of the other annotation, in a single pass over both sorted by offset. If there
+        are several, the one which starts last is used, then the one with the smallest id.
+        The other annotation itself is never used.
+
+        Args:
+            others: an annotation set or iterable of annotations
+
+        Returns:
+            a dictionary which maps each of the other annotations, in the order of `others`, to the
+            nearest annotation or None if there is none
+        """
+        anns = sorted(self._annotations.values(), key=lambda a: (a.end, a.start, -a.id))
+        others = list(others)
+        nearest = dict.fromkeys(others)
+        nanns = len(anns)
+        i = 0
+        best = prev = None
+        for other in sorted(others, key=lambda a: a.start):
+            while i < nanns and anns[i].end <= other.start:
+                prev = best
+                best = anns[i]
+                i += 1
+            nearest[other] = prev if best is other else best
+        return nearest
+
+    def nearest_after(self, others: Iterable[Annotation]) -> Dict[Annotation, Optional[Annotation]]:
+        """
+        For each of the other annotations, gets the annotation in this set which starts closest after
+        or at the end of the other annotation, in a single pass over both sorted by offset. If there
+        are several, the one which ends first is used, then the one with the smallest id.
+        The other annotation itself is never used.
+
+        Args:
+            others: an annotation set or iterable of annotations
+
+        Returns:
+            a dictionary which maps each of the other annotations, in the order of `others`, to the
+            nearest annotation or None if there is none
+        """
+        anns = sorted(self._annotations.values(), key=lambda a: (a.start, a.end, a.id), reverse=True)
+        others = list(others)
+        nearest = dict.fromkeys(others)
+        nanns = len(anns)
+        i = 0
+        best = prev = None
+        for other in sorted(others, key=lambda a: a.end, reverse=True):
+            while i < nanns and anns[i].start >= other.end:
+                prev = best
+                best = anns[i]
+                i += 1
+            nearest[other] = prev if best is other else best
+        return nearest
+
     @support_annotation_or_set
     def before(
             self, start: int, end: int, ann: Optional["Annotation"] = None,
@@ -1575,7 +2107,7 @@ class AnnotationSet:
         """
         In-place update the offset of the annotation with the given id. THIS IS FOR INTERNAL USE ONLY!
         Using this method can lead to many different kinds of hard to debug and surprising bugs!
-        NOTE: this only updates the by offset index if it already exists. If the offsets are both
+        NOTE: this only updates the indices which already exist. If the offsets are both
         are unchanged, this is a NOOP.
 
         Args:
@@ -1586,14 +2118,12 @@ class AnnotationSet:
         ann = self._annotations[id]
         if ann.start == start and ann.end == end:
             return   # nothing to do really
+        if self._shared:
+            self._unshare()
         # print(f"DEBUG: updating offset for {id} from {ann.start},{ann.end} to {start},{end}")
-        if self._index_by_offset is not None:
-            self._index_by_offset.remove(
-                ann.start, ann.end, ann.id
-            )
+        self._remove_from_indices(ann)
         ann._update_offsets(start, end)
-        if self._index_by_offset is not None:
-            self._index_by_offset.add(ann.start, ann.end, ann.id)
+        self._add_to_indices(ann)
 
     def _edit_anns(self, edits, affected_strategy):
         """
@@ -1601,138 +2131,76 @@ class AnnotationSet:
         new offset spans for all annotations that remain in the set, and a set of annids for annotations that
         have to get deleted.
 
+        All offsets are remapped in a single pass: the edits are sorted and the cumulative length changes of
+        all edits are pre-calculated, so the new offset for each annotation offset is found with a binary search
+        over the edits.
+
         Args:
             edits: the edit(s) to carry out
+            affected_strategy: one of "delete_all", "adapt", "keepadapt", see `_edit`
 
         Returns:
             anns: dictionary mapping annotation ids to pairs start,end of new offsets for that annotation
             anns2delete: set of annotation ids to delete as a aresult of the edits
         """
-        # convert the list of edits into a list of lists [startoff, endoff, len, startlist, endlist]
-        # where the lists will contain later the ids of annotation starting/ending within that span
-        # This also makes sure that if the edits are mutable, we do not change them in any way
-        edits = [[l[0], l[1], len(l[2]) if isinstance(l[2], str) else l[2], [], []] for l in edits]
-
-        # sort the edits by ending, then starting offsets: since we operate from start to end, as soon as
-        # processing has moved past some offset, the annotations before that offset do not need to get
-        # updated any more.
-        edits.sort(key=lambda x: (x[1], x[0]), reverse=False)
-
-        # optimization: instead of recalculating relevant overlaps after each edit, calculate
-        # them beforehand
-
-        # For each edit, add the ids of annotations that start/end in that interval to the start/end lists
-        # of the edit tuple. Also collect the ids of those annotations in sets for starting or ending, starting, ending
-        # in any edit. This is necessary because offset adaptions necessary for annotations starting/ending in
-        # a span need to get handled different from offset adaptations for all other annotations
-        self._create_index_by_offset()
-        affectedids_start = set()
-        affectedids_end = set()
-        for edit in edits:
-            # find all annotations which start or end within the span of the edit (or both)
-            sintvs = self._index_by_offset.starting_within(edit[0], edit[1])
-            eintvs = self._index_by_offset.ending_within(edit[0], edit[1])
-            for intv in sintvs:
-                if affected_strategy != "delete":
-                    edit[3].append(intv[2])
-                affectedids_start.add(intv[2])
-            for intv in eintvs:
-                if affected_strategy != "delete":
-                    edit[4].append(intv[2])
-                affectedids_end.add(intv[2])
-
-        # Any changes of offsets or deletions are not carried out until the very end. For this we
-        # keep a dictionary with all the annotations id to [start,end] and a set of annotations to delete
-        anns = {ann.id: [ann.start, ann.end] for ann in self._annotations.values()}
+        # convert the edits into tuples (startoff, endoff, newlen), sorted by ending, then starting offsets.
+        # Since edits may not overlap, the starting offsets are then sorted as well
+        edits = sorted(
+            [(e[0], e[1], len(e[2]) if isinstance(e[2], str) else e[2]) for e in edits],
+            key=lambda x: (x[1], x[0])
+        )
+        froms = [e[0] for e in edits]
+        tos = [e[1] for e in edits]
+        # cumdeltas[i] is the total change of length caused by all edits before edit i
+        cumdeltas = [0]
+        for editfrom, editto, newlen in edits:
+            cumdeltas.append(cumdeltas[-1] + newlen - (editto - editfrom))
+        nedits = len(edits)
+        delete_all = affected_strategy == "delete_all"
+        adapt = affected_strategy == "adapt"
+
+        anns = {}
         anns2delete = set()
-        # also keep sorted lists of annid by start and end offset, but only for non-affected annotations (outside of
-        # edits). The offset is accessed from anns because it can change during the process
-        idsbystart = []
-        idsbyend = []
-        # we are getting the annotations in offset order, so the two lists we create are also in starting
-        # offset order, for the first list this is what we need
-
-        for ann in self.iter():
-            annid = ann.id
-            if annid not in affectedids_start:
-                idsbystart.append(annid)
-            if annid not in affectedids_end:
-                idsbyend.append(annid)
-        # sort the idsbyend list by end offset
-        idsbyend.sort(key=lambda x: anns[x][1], reverse=False)
-
-        # ptr_start/end are indices into the start2ids/end2ids lists: pointing to the first entry for which
-        # annotation offsets still need to get adapted
-        ptr_start = None
-        ptr_end = None
-        if len(idsbystart) > 0:
-            ptr_start = 0
-        if len(idsbyend) > 0:
-            ptr_end = 0
-
-        for idx in range(len(edits)):
-            edit = edits[idx]
-            editfrom, editto, editlen, edit_sanns, edit_eanns = edit
-            newlen = len(edit[2]) if isinstance(edit[2], str) else edit[2]
-            oldlen = editto - editfrom
-            delta = newlen - oldlen
-            editto_new = editto + delta
-            # in order to process this span we need to do this:
-            # - adapt all affected annotations, i.e. annotations which start or end in this span,
-            #   according to the strategy.
-            # - change the offsets of all annotations after this edit if the length of the span changed
-            # - also change the offsets of all edits after this edit if the length of the span changed
-
-            for annid in edit_sanns:  # all the ids of anns starting in this edit
-                if affected_strategy == "delete_all":
-                    if annid in anns:
-                        anns2delete.add(annid)
-                        del anns[annid]
-                elif affected_strategy == "adapt":
-                    anns[annid][0] = editfrom
-                elif affected_strategy == "keepadapt":
-                    if anns[annid][0] > editto:
-                        anns[annid][0] = editfrom
-            for annid in edit_eanns:  # all the ids of anns ending in this edit
-                if affected_strategy == "delete_all":
-                    if annid in anns:
-                        anns2delete.add(annid)
-                        del anns[annid]
-                elif affected_strategy == "adapt":
-                    anns[annid][1] = editto_new
-                elif affected_strategy == "keepadapt":
-                    if anns[annid][1] > editto_new:
-                        anns[annid][1] = editto_new
-            if delta != 0:
-                for idx2 in range(idx+1, len(edits)):
-                    otheredit = edits[idx2]
-                    otheredit[0] += delta
-                    otheredit[1] += delta
-                while anns[idsbystart[ptr_start]][0] < editto:
-                    ptr_start += 1
-                    if ptr_start >= len(idsbystart):
-                        ptr_start = None
-                        break
-                # adapt all the annotations
-                if ptr_start is not None:
-                    for idx2 in range(ptr_start, len(idsbystart)):
-                        annid = idsbystart[idx2]
-                        if annid not in anns2delete:
-                            # print(f"DEBUG: update start for {annid} from {anns[annid][0]} by {delta}")
-                            anns[annid][0] += delta
-                # find the first annotation that ends at or after the current edit
-                while anns[idsbyend[ptr_end]][1] <= editto:
-                    ptr_end += 1
-                    if ptr_end >= len(idsbyend):
-                        ptr_end = None
-                        break
-                # adapt all the annotations
-                if ptr_end is not None:
-                    for idx2 in range(ptr_end, len(idsbyend)):
-                        annid = idsbyend[idx2]
-                        if annid not in anns2delete:
-                            # print(f"DEBUG: update end for {annid} from {anns[annid][0]} by {delta}")
-                            anns[annid][1] += delta
+        for annid, ann in self._annotations.items():
+            start = ann.start
+            end = ann.end
+            # a start offset is affected by an edit if it is in [from, to), then it is the last edit
+            # which starts at or before the offset, otherwise it is shifted by all edits that end at or before it
+            idx = bisect.bisect_right(froms, start) - 1
+            if idx >= 0 and start < tos[idx]:
+                if delete_all:
+                    anns2delete.add(annid)
+                    continue
+                newfrom = froms[idx] + cumdeltas[idx]
+                if adapt:
+                    newstart = newfrom
+                else:
+                    newstart = start + cumdeltas[idx]
+                    if newstart > newfrom + edits[idx][2]:
+                        newstart = newfrom
+            else:
+                newstart = start + cumdeltas[bisect.bisect_right(tos, start)]
+            if end == start:
+                # a zero length annotation stays zero length, e.g. it moves after text inserted at its offset
+                anns[annid] = [newstart, newstart]
+                continue
+            # an end offset is affected by an edit if it is in (from, to], then it is the first edit which
+            # ends at or after the offset, otherwise it is shifted by all edits that end before it
+            idx = bisect.bisect_left(tos, end)
+            if idx < nedits and froms[idx] < end:
+                if delete_all:
+                    anns2delete.add(annid)
+                    continue
+                newto = froms[idx] + cumdeltas[idx] + edits[idx][2]
+                if adapt:
+                    newend = newto
+                else:
+                    newend = end + cumdeltas[idx]
+                    if newend > newto:
+                        newend = newto
+            else:
+                newend = end + cumdeltas[idx]
+            anns[annid] = [newstart, newend]
         return anns, anns2delete
 
     def _edit(self, edits, affected_strategy="keepadapt"):
@@ -1760,13 +2228,25 @@ class AnnotationSet:
         if isinstance(edits, tuple) and not isinstance(edits[0], Iterable):
             edits = [edits]
 
+        if self._shared:
+            self._unshare()
         anns, anns2delete = self._edit_anns(edits, affected_strategy)
         # now delete all annotations to be delete
         for annid in anns2delete:
             # print(f"DEBUG: removing annotation {self[annid]}")
             self.remove(annid)
 
-        # and adapt all annotation offsets, if necessary
-        for annid in anns:
-            start, end = anns[annid]
-            self._update_offsets(annid, start, end)
+        # and adapt all annotation offsets, if necessary, then update the offset indices in bulk
+        oldintvs = []
+        newintvs = []
+        for annid, (start, end) in anns.items():
+            ann = self._annotations[annid]
+            if ann.start != start or ann.end != end:
+                oldintvs.append((ann.start, ann.end, annid))
+                newintvs.append((start, end, annid))
+                ann._update_offsets(start, end)
+        if oldintvs:
+            if self._index_by_offset is not None:
+                self._index_by_offset.replace(oldintvs, newintvs)
+            if self._index_by_ol is not None:
+                self._index_by_ol.replace(oldintvs, newintvs)
@@ -5,7 +5,9 @@ a Document: document features, annotations, annotation features.
 
 from typing import List, Callable, Dict
 import sys
+from array import array
 from gatenlp.offsetmapper import OffsetMapper, OFFSET_TYPE_JAVA, OFFSET_TYPE_PYTHON
+from gatenlp.features import Features
 import importlib
 from gatenlp.changelog_consts import *
 
@@ -15,6 +17,7 @@ from gatenlp.changelog_consts import *
 
 __pdoc__ = {
     "ChangeLog.__len__": True,
+    "CompactChangeLog.__len__": True,
 }
 
 
@@ -70,6 +73,36 @@ class ChangeLog:
         if hndlr:
             hndlr()
 
+    def _log_add_ann(self, setname: str, ann) -> None:
+        """
+        Log adding the annotation to the set with the given name.
+        """
+        self.append({
+            "command": ACTION_ADD_ANN,
+            "set": setname,
+            "start": ann.start,
+            "end": ann.end,
+            "type": ann.type,
+            "features": ann._features_to_dict(),
+            "id": ann.id,
+        })
+
+    def _log_ann_feature(self, command: str, setname: str, annid: int, feature=None, value=None) -> None:
+        """
+        Log a change of the features of the annotation with the given id in the set with the given name.
+        """
+        change = {
+            "command": command,
+            "type": "annotation",
+            "set": setname,
+            "id": annid,
+        }
+        if feature is not None:
+            change["feature"] = feature
+        if value is not None:
+            change["value"] = value
+        self.append(change)
+
     def __len__(self) -> int:
         """
         Returns the number of actions logged in the ChangeLog.
@@ -346,3 +379,213 @@ class ChangeLog:
             del parms["command"]
             print(f"{i}: cmd={cmd} {parms}")
         print(")")
+
+
+# codes for the changes stored by the CompactChangeLog, any other change is stored as is
+_CODE_DICT = 0
+_CODE_ADD_ANN = 1
+_CODE_SET_ANN_FEATURE = 2
+_CODE_DEL_ANN_FEATURE = 3
+_CODE_CLEAR_ANN_FEATURES = 4
+_CODE4ANNFEATURECMD = {
+    ACTION_SET_ANN_FEATURE: _CODE_SET_ANN_FEATURE,
+    ACTION_DEL_ANN_FEATURE: _CODE_DEL_ANN_FEATURE,
+    ACTION_CLEAR_ANN_FEATURES: _CODE_CLEAR_ANN_FEATURES,
+}
+_ANNFEATURECMD4CODE = {v: k for k, v in _CODE4ANNFEATURECMD.items()}
+
+
+class CompactChangeLog(ChangeLog):
+    """
+    A ChangeLog which stores the most frequent changes, adding annotations and changing annotation features,
+    in typed arrays (change code, and set name index, annotation id, start and end offset) and a list of
+    references to the type and features or the feature name and value. The changes are only converted into the
+    usual change dictionaries when they get accessed through `changes` or exported with `to_dict()` or saved.
+
+    The features of an added annotation are stored as a copy-on-write copy, so the feature dictionary only
+    gets copied if the features of the annotation get changed later.
+
+    Setting a feature of an annotation again is coalesced with the previous change which sets that feature
+    of that annotation, if there was no change in between which removes the feature or annotation, so the
+    number of changes logged can be less than for a ChangeLog.
+    """
+    def __init__(self, store=True):
+        """
+        Creates a CompactChangeLog.
+
+        Args:
+            store: if `True`, the change log stores the actions it receives (default). This can be set
+            to false if only callbacks are needed.
+        """
+        self.offset_type = OFFSET_TYPE_PYTHON
+        self._handlers = dict()
+        self._store = store
+        self._codes = array("b")
+        # for each change: set name index, annotation id, start offset, end offset
+        self._vals = array("q")
+        self._refs = []
+        self._setnames = []
+        self._setname2idx = {}
+        # map (set name, annotation id, feature name) -> index of the change which set the feature, this
+        # can only be coalesced with a later change if there was no barrier for the set or annotation after it
+        self._lastset = {}
+        # map set name -> index of the last change which removed all annotations in the set
+        self._setbarriers = {}
+        # map (set name, annotation id) -> index of the last change which added or removed the annotation or
+        # cleared its features
+        self._annbarriers = {}
+
+    def _store_change(self, code, setname, annid, start, end, ref):
+        setidx = self._setname2idx.get(setname)
+        if setidx is None:
+            setidx = len(self._setnames)
+            self._setnames.append(setname)
+            self._setname2idx[setname] = setidx
+        self._codes.append(code)
+        self._vals.extend((setidx, annid, start, end))
+        self._refs.append(ref)
+
+    def _handle(self, action):
+        hndlr = self._handlers.get(action)
+        if hndlr:
+            hndlr()
+
+    def append(self, change: Dict):
+        """
+        Add a change to the change log. The change must be represented as a dictionary which follows the
+        conventions of how to represent changes.
+
+        Args:
+          change: dict describing the action/modification
+        """
+        assert isinstance(change, dict)
+        action = change.get("command", None)
+        if action is None:
+            raise Exception("Odd change, does not have 'command' key")
+        if action == ACTION_ADD_ANN:
+            self._add_ann_change(change["set"], change["id"], change["start"], change["end"], change["type"],
+                                 Features(change.get("features")))
+            return
+        if action in _CODE4ANNFEATURECMD:
+            self._log_ann_feature(action, change["set"], change["id"],
+                                  feature=change.get("feature"), value=change.get("value"))
+            return
+        if self._store:
+            if action == ACTION_DEL_ANN:
+                self._annbarriers[(change.get("set"), change.get("id"))] = len(self._codes)
+            elif action in (ACTION_CLEAR_ANNS, ACTION_REMOVE_ANNSET):
+                self._setbarriers[change.get("set")] = len(self._codes)
+            self._store_change(_CODE_DICT, None, -1, -1, -1, change)
+        self._handle(action)
+
+    def _add_ann_change(self, setname, annid, start, end, anntype, features):
+        if self._store:
+            self._annbarriers[(setname, annid)] = len(self._codes)
+            self._store_change(_CODE_ADD_ANN, setname, annid, start, end, (anntype, features))
+        if self._handlers:
+            self._handle(ACTION_ADD_ANN)
+
+    def _log_add_ann(self, setname: str, ann) -> None:
+        self._add_ann_change(setname, ann.id, ann.start, ann.end, ann.type,
+                             None if ann._features is None else ann._features.copy())
+
+    def _log_ann_feature(self, command: str, setname: str, annid: int, feature=None, value=None) -> None:
+        if self._store:
+            code = _CODE4ANNFEATURECMD[command]
+            if code == _CODE_SET_ANN_FEATURE:
+                key = (setname, annid, feature)
+                idx = self._lastset.get(key)
+                if idx is not None and idx > self._annbarriers.get(key[:2], -1) and \
+                        idx > self._setbarriers.get(setname, -1):
+                    self._refs[idx] = (feature, value)
+                else:
+                    self._lastset[key] = len(self._codes)
+                    self._store_change(code, setname, annid, -1, -1, (feature, value))
+            else:
+                if code == _CODE_DEL_ANN_FEATURE:
+                    self._lastset.pop((setname, annid, feature), None)
+                else:
+                    self._annbarriers[(setname, annid)] = len(self._codes)
+                self._store_change(code, setname, annid, -1, -1, (feature, value))
+        if self._handlers:
+            self._handle(command)
+
+    def _change(self, idx, start=None, end=None) -> Dict:
+        """
+        Create the change dictionary for the change with the given index.
+        """
+        code = self._codes[idx]
+        ref = self._refs[idx]
+        if code == _CODE_DICT:
+            return ref
+        vidx = idx * 4
+        setname = self._setnames[self._vals[vidx]]
+        if code == _CODE_ADD_ANN:
+            return {
+                "command": ACTION_ADD_ANN,
+                "set": setname,
+                "start": self._vals[vidx + 2] if start is None else start,
+                "end": self._vals[vidx + 3] if end is None else end,
+                "type": ref[0],
+                "features": {} if ref[1] is None else ref[1].to_dict(),
+                "id": self._vals[vidx + 1],
+            }
+        change = {
+            "command": _ANNFEATURECMD4CODE[code],
+            "type": "annotation",
+            "set": setname,
+            "id": self._vals[vidx + 1],
+        }
+        if ref[0] is not None:
+            change["feature"] = ref[0]
+        if ref[1] is not None:
+            change["value"] = ref[1]
+        return change
+
+    @property
+    def changes(self) -> List[Dict]:
+        """
+        Returns the list of change dictionaries, created from the compact representation.
+        """
+        return [self._change(idx) for idx in range(len(self._codes))]
+
+    def __len__(self) -> int:
+        """
+        Returns the number of actions logged in the ChangeLog.
+        """
+        return len(self._codes)
+
+    def _fixup_changes(self, method: Callable, replace=False) -> List[Dict]:
+        """
+        Modify the offsets of the changes according to the given method, if replace is True in place,
+        otherwise only in the returned list of changes.
+        """
+        if replace:
+            for idx in range(len(self._codes)):
+                if self._codes[idx] == _CODE_ADD_ANN:
+                    vidx = idx * 4
+                    self._vals[vidx + 2] = method(self._vals[vidx + 2])
+                    self._vals[vidx + 3] = method(self._vals[vidx + 3])
+                elif self._codes[idx] == _CODE_DICT:
+                    change = self._refs[idx]
+                    if "start" in change:
+                        change["start"] = method(change["start"])
+                    if "end" in change:
+                        change["end"] = method(change["end"])
+            return self.changes
+        newchanges = []
+        for idx in range(len(self._codes)):
+            code = self._codes[idx]
+            if code == _CODE_ADD_ANN:
+                vidx = idx * 4
+                chg = self._change(idx, start=method(self._vals[vidx + 2]), end=method(self._vals[vidx + 3]))
+            elif code == _CODE_DICT:
+                chg = dict(self._refs[idx])
+                if "start" in chg:
+                    chg["start"] = method(chg["start"])
+                if "end" in chg:
+                    chg["end"] = method(chg["end"])
+            else:
+                chg = self._change(idx)
+            newchanges.append(chg)
+        return newchanges
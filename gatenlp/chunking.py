@@ -4,7 +4,7 @@ Module for chunking-related methods and annotators.
 import re
 from typing import Union, List, Optional, Dict, Generator, Tuple
 import iobes
-from gatenlp import Document, Span, AnnotationSet
+from gatenlp import Document, AnnotationSet
 
 SPANENCS = dict(
     BIO=iobes.SpanEncoding.BIO,
@@ -71,27 +71,29 @@ def doc_to_ibo(
     spanenc = SPANENCS[scheme]
     if type2code is None:
         type2code = {}
-    if sentence_type is None:
-        spans = [Span(0, len(doc))]
-    else:
-        spans = [a.span for a in doc.annset(annset_name).with_type(sentence_type)]
     all_tokens = doc.annset(annset_name).with_type(token_type)
     if chunk_types is None:
         all_chunks = AnnotationSet()
     else:
         all_chunks = doc.annset(annset_name if chunk_annset_name is None else chunk_annset_name).with_type(chunk_types)
-    for span in spans:
-        tokens = all_tokens.within(span)
+    if sentence_type is None:
+        groups = [(all_tokens.within(0, len(doc)), all_chunks.within(0, len(doc)))]
+    else:
+        sentences = doc.annset(annset_name).with_type(sentence_type)
+        tokens4sentence = all_tokens.group_within(sentences, include_self=True)
+        chunks4sentence = all_chunks.group_within(sentences, include_self=True)
+        groups = [(tokens4sentence[sentence], chunks4sentence[sentence]) for sentence in sentences]
+    for tokens, chunks in groups:
         if len(tokens) == 0:
             continue
         # map token start offsets to token indices
         start2idx = {t.start: idx for idx, t in enumerate(tokens)}
-        chunks = all_chunks.within(span)
         # now we want to know which of all the tokens are covered by chunks. So for each chunk, we check
         # which tokens are contained and append an iobes Span that points to the index of the token
         iobes_spans = []
+        tokens4chunk = tokens.group_within(chunks, include_self=True)
         for chunk in chunks:
-            ctokens = list(tokens.within(chunk))
+            ctokens = list(tokens4chunk[chunk])
             start = start2idx[ctokens[0].start]
             end = start2idx[ctokens[-1].start]+1
             iobes_span = iobes.Span(
@@ -16,5 +16,8 @@ from gatenlp.corpora.base import EveryNthCorpus, EveryNthSource, ShuffledCorpus,
 from gatenlp.corpora.memory import ListCorpus, PandasDfSource
 from gatenlp.corpora.files import BdocjsLinesFileSource, BdocjsLinesFileDestination
 from gatenlp.corpora.files import JsonLinesFileSource, JsonLinesFileDestination
-from gatenlp.corpora.files import TsvFileSource
-from gatenlp.corpora.dirs import DirFilesCorpus, DirFilesSource, DirFilesDestination, NumberedDirFilesCorpus
\ No newline at end of file
+from gatenlp.corpora.files import TsvFileSource, MmapFileCorpus
+from gatenlp.corpora.dirs import DirFilesCorpus, DirFilesSource, DirFilesDestination, NumberedDirFilesCorpus
+from gatenlp.corpora.dirs import PathIndex
+from gatenlp.corpora.parquet import ParquetSource, ParquetDestination
+from gatenlp.corpora.buffered import PrefetchSource, BufferedAsyncDestination
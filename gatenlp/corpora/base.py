@@ -11,6 +11,7 @@ DocumentDestination classes represent collections that can receive Documents one
 """
 import bisect
 import random
+from collections import OrderedDict
 from abc import ABC, abstractmethod
 from typing import Iterable as TypingIterable
 from typing import Iterator as TypingIterator
@@ -532,50 +533,162 @@ class ConcatSource(DocumentSource):
             yield doc
 
 
+def estimate_document_size(doc: Document) -> int:
+    """
+    Return a rough estimate of the memory used by a document in bytes, based on the length of the text and the
+    number of annotations and features.
+    """
+    size = 100 + 2 * len(doc.text or "") + 100 * len(doc.features)
+    for annset in doc._annotation_sets.values():
+        size += 100 + 250 * len(annset)
+    return size
+
+
 class CachedCorpus(Corpus):
     """
-    Wraps two other corpora: the base corpus which may be slow to access, may not be writable etc. and the
-    cache corpus which is meant to be fast. The cache corpus may initially contain only None elements or no
-    files. This wrapper caches documents when they are written to, but this can be changed to caching on read.
+    Wraps a base corpus which may be slow to access (e.g. a corpus of files or a remote corpus) and
+    caches the least recently used documents in memory, limited by the number of documents and/or the
+    estimated size of the documents. Optionally, a second level cache corpus, e.g. a NumberedDirFilesCorpus
+    on a fast local disk, can be used, which must be able to return None for documents not stored in it yet.
+
+    Documents which are set (or stored back) can be handled in one of three ways, depending on write_mode:
+
+    * "through": the document is written to the base corpus (and the second level cache) immediately
+    * "back": the document is only kept in the cache and written to the base corpus (and the second level
+      cache) when it gets evicted from the cache or when `flush()` is called. `flush()` must be called before the
+      corpus gets discarded, otherwise changes get lost!
+    * "cache": the document is only written to the caches, never to the base corpus, e.g. to cache the
+      result of processing the documents of a corpus which cannot or should not get changed.
     """
 
-    def __init__(self, basecorpus, cachecorpus, cacheonread=False):
+    def __init__(
+            self,
+            basecorpus: Corpus,
+            cachecorpus: Union[None, Corpus] = None,
+            cacheonread: bool = False,
+            max_docs: Union[None, int] = 1000,
+            max_bytes: Union[None, int] = None,
+            write_mode: Union[None, str] = None,
+            sizeof=estimate_document_size,
+    ):
         """
-        TODO: this is still work in progress!
-
         Creates a cached corpus.
-        This accesses data from the cachecorpus, if it does not exist in there (entry is,
-        None) will instead fall back to the base corpus.
-
-        This cached corpus can be set up to cache on read or cache on write.
 
         Args:
             basecorpus: any corpus
-            cachecorpus: any corpus that can return None for non-existing elements, e.g. a NumberedDirFilesCorpus
-              or just an in-memory list or array.
-            cacheonread: if True, writes to the cache as soon as an item has been read from the base dataset.
-                Otherwise will only write to the cache dataset when an item is set. This allows to cache the result
-                of processing efficiently.
-        """
-        assert len(cachecorpus) == len(basecorpus)
+            cachecorpus: if not None, a corpus to use as a second level cache, which must allow to get and set
+                all the indices of the base corpus and return None for documents which have not been set yet,
+                e.g. a NumberedDirFilesCorpus or just an in-memory list or array.
+            cacheonread: if True, writes a document to the second level cache as soon as it has been read from the
+                base corpus. Otherwise will only write to the second level cache when a document is set.
+            max_docs: the maximum number of documents to keep in the memory cache, None for no limit (default: 1000)
+            max_bytes: the maximum estimated size of all documents in the memory cache, None for no limit (default)
+            write_mode: one of "through", "back" or "cache", see the class documentation. If None (default), "cache" if
+                a second level cache corpus is specified, otherwise "through".
+            sizeof: a function to estimate the size of a document in bytes.
+        """
+        if write_mode is None:
+            write_mode = "through" if cachecorpus is None else "cache"
+        if write_mode not in ["through", "back", "cache"]:
+            raise Exception(f"Parameter write_mode must be one of 'through', 'back', 'cache', not {write_mode}")
         self.basecorpus = basecorpus
         self.cachecorpus = cachecorpus
         self.cacheonread = cacheonread
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.write_mode = write_mode
+        self.sizeof = sizeof
+        # map index to tuple (doc, size, isdirty), in least recently used order
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.cache2_hits = 0
+        self.evictions = 0
+        self.writes = 0
 
     def __len__(self):
         return len(self.basecorpus)
 
+    def _write(self, index, doc):
+        """
+        Write the document to the base corpus and second level cache, as appropriate for the write mode.
+        """
+        if self.cachecorpus is not None:
+            self.cachecorpus[index] = doc
+        if self.write_mode != "cache":
+            self.basecorpus[index] = doc
+            self.writes += 1
+
+    def _put(self, index, doc, dirty):
+        old = self._cache.pop(index, None)
+        if old is not None:
+            self._bytes -= old[1]
+            dirty = dirty or old[2]
+        size = self.sizeof(doc) if self.max_bytes is not None else 0
+        self._cache[index] = (doc, size, dirty)
+        self._bytes += size
+        while self._cache and (
+                (self.max_docs is not None and len(self._cache) > self.max_docs) or
+                (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            oldidx, (olddoc, oldsize, olddirty) = self._cache.popitem(last=False)
+            self._bytes -= oldsize
+            self.evictions += 1
+            if olddirty:
+                self._write(oldidx, olddoc)
+
     def __getitem__(self, index):
-        tmp = self.cachecorpus[index]
-        if tmp is None:
-            tmp = self.basecorpus[index]
-            if self.cacheonread:
-                self.basecorpus[index] = tmp
-        self.setidxfeature(tmp, index)
-        return tmp
-
-    def __setitem__(self, index, value):
-        self.cachecorpus[index] = value
+        entry = self._cache.get(index)
+        if entry is not None:
+            self.hits += 1
+            self._cache.move_to_end(index)
+            doc = entry[0]
+        else:
+            self.misses += 1
+            doc = None
+            if self.cachecorpus is not None:
+                doc = self.cachecorpus[index]
+                if doc is not None:
+                    self.cache2_hits += 1
+            if doc is None:
+                doc = self.basecorpus[index]
+                if self.cacheonread and self.cachecorpus is not None and doc is not None:
+                    self.cachecorpus[index] = doc
+            if doc is not None:
+                self._put(index, doc, False)
+        self.setidxfeature(doc, index)
+        return doc
+
+    def __setitem__(self, index, doc):
+        if doc is None:
+            self._write(index, doc)
+            entry = self._cache.pop(index, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+            return
+        if self.write_mode == "back":
+            self._put(index, doc, True)
+        else:
+            self._write(index, doc)
+            self._put(index, doc, False)
+
+    def flush(self):
+        """
+        Write all documents which have been changed in the cache to the base corpus and second level cache.
+        Only needed for write mode "back".
+        """
+        for index, (doc, size, dirty) in list(self._cache.items()):
+            if dirty:
+                self._write(index, doc)
+                self._cache[index] = (doc, size, False)
+
+    def stats(self) -> dict:
+        """
+        Return a dictionary with the number of hits and misses of the memory cache, hits of the second level
+        cache, evictions, writes to the base corpus, number of documents and estimated bytes in the memory cache.
+        """
+        return dict(hits=self.hits, misses=self.misses, cache2_hits=self.cache2_hits, evictions=self.evictions,
+                    writes=self.writes, docs=len(self._cache), bytes=self._bytes)
 
 
 class NullDestination(DocumentDestination):
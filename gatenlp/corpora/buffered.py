@@ -0,0 +1,307 @@
+"""
+Module that defines DocumentSource and DocumentDestination wrappers which read ahead or write behind
+on background threads, so that reading, deserializing, serializing and writing documents overlaps with
+the processing of documents.
+"""
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Iterator, Optional
+from gatenlp.document import Document
+from gatenlp.corpora.base import DocumentSource, DocumentDestination
+
+# marks the end of the data put into the queue by a background thread
+_END = object()
+
+
+class _Failure:
+    """
+    Wraps an exception raised in a background thread so it can be re-raised in the consumer thread.
+    """
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def _make_executor(executor, n_workers):
+    if executor == "thread":
+        return ThreadPoolExecutor(max_workers=n_workers)
+    elif executor == "process":
+        return ProcessPoolExecutor(max_workers=n_workers)
+    else:
+        raise Exception(f"Parameter executor must be 'thread' or 'process', not {executor}")
+
+
+class PrefetchSource(DocumentSource):
+    """
+    Wraps a document source so that the raw data is read ahead on a background I/O thread and
+    documents get decoded on a pool of workers, while the documents are still yielded in the original order.
+
+    Sources which implement the methods `_read_raw()` (yield the raw data for each document, e.g. a line
+    or the bytes of a file) and `_raw_decoder()` (return a picklable callable to convert the raw data into a
+    document) get read and decoded separately, e.g. BdocjsLinesFileSource, JsonLinesFileSource and
+    DirFilesSource. For all other sources, the documents are simply read ahead on the background thread.
+
+    Example:
+        `for doc in PrefetchSource(BdocjsLinesFileSource("corpus.jsonl"), n_workers=4): pipeline(doc)`
+    """
+    def __init__(
+            self,
+            source: DocumentSource,
+            n_workers: int = 2,
+            prefetch: int = 100,
+            executor: str = "thread",
+    ):
+        """
+        Create a PrefetchSource.
+
+        Args:
+            source: the document source to wrap
+            n_workers: the number of workers to use for decoding documents (default: 2)
+            prefetch: the maximum number of documents which are read ahead, this is the maximum number
+                of raw items waiting for decoding and also the maximum number of documents being decoded
+                (default: 100)
+            executor: "thread" (default) to decode on a pool of threads or "process" to decode on a pool of
+                processes. Processes are only useful for CPU-bound decoding of large documents, as the raw data
+                and the document have to get pickled.
+        """
+        super().__init__()
+        if prefetch < 1:
+            raise Exception("Parameter prefetch must be >= 1")
+        if n_workers < 1:
+            raise Exception("Parameter n_workers must be >= 1")
+        self.source = source
+        self.n_workers = n_workers
+        self.prefetch = prefetch
+        self.executor = executor
+        # check early so we do not fail only when iterating
+        if executor not in ["thread", "process"]:
+            raise Exception(f"Parameter executor must be 'thread' or 'process', not {executor}")
+
+    @property
+    def nparts(self):
+        return self.source.nparts
+
+    @property
+    def partnr(self):
+        return self.source.partnr
+
+    def _reader(self, items, theq: queue.Queue, stop: threading.Event):
+        """
+        Runs in the I/O thread: put all items into the bounded queue, then the end marker.
+        """
+        try:
+            for item in items:
+                while not stop.is_set():
+                    try:
+                        theq.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+            item = _END
+        except Exception as ex:  # pylint: disable=W0703
+            item = _Failure(ex)
+        while not stop.is_set():
+            try:
+                theq.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def __iter__(self) -> Iterator[Document]:
+        if hasattr(self.source, "_read_raw") and hasattr(self.source, "_raw_decoder"):
+            items = self.source._read_raw()
+            decoder = self.source._raw_decoder()
+        else:
+            items = iter(self.source)
+            decoder = None
+        theq = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        thread = threading.Thread(target=self._reader, args=(items, theq, stop), daemon=True)
+        thread.start()
+        try:
+            if decoder is None:
+                while True:
+                    item = theq.get()
+                    if item is _END:
+                        break
+                    if isinstance(item, _Failure):
+                        raise item.exc
+                    self._n += 1
+                    yield item
+            else:
+                pending = deque()
+                with _make_executor(self.executor, self.n_workers) as pool:
+                    done = False
+                    while not done or pending:
+                        # fill up the decoding pipeline from the queue, without blocking if there is something
+                        # already decoding
+                        while not done and len(pending) < self.prefetch:
+                            try:
+                                item = theq.get(block=len(pending) == 0)
+                            except queue.Empty:
+                                break
+                            if item is _END:
+                                done = True
+                            elif isinstance(item, _Failure):
+                                raise item.exc
+                            else:
+                                pending.append(pool.submit(decoder, item))
+                        if pending:
+                            doc = pending.popleft().result()
+                            self._n += 1
+                            yield doc
+        finally:
+            stop.set()
+            thread.join()
+
+
+# the value of the sync parameter of _write_raw for each fsync setting
+_WRITE_RAW_SYNC = {None: False, "batch": True, "close": "close"}
+
+
+class BufferedAsyncDestination(DocumentDestination):
+    """
+    Wraps a document destination so that documents get serialized on a pool of workers and written in
+    batches on a background thread, so that appending a document does not block on serializing and
+    writing the document.
+
+    Destinations which implement the methods `_raw_encoder()` (return a picklable callable to convert a document into
+    its serialized form) and `_write_raw(items, sync=False)` (write a list of (document, serialized)
+    tuples) get serialized on the workers and written in batches, e.g. BdocjsLinesFileDestination,
+    JsonLinesFileDestination and DirFilesDestination. For all other destinations, the documents get appended
+    to the wrapped destination on the background thread.
+
+    At most `max_pending` documents can be waiting to get written, after that `append` blocks until the
+    writer has caught up.
+
+    IMPORTANT: documents must not get modified after they have been appended! Once an error occurs
+    when serializing or writing, no more documents get written and the error is raised from every later call
+    to `append` and from `close()`, which must always be called (e.g. by using the destination as a context
+    manager). The property `n` is the number of documents which have actually been written.
+    """
+    def __init__(
+            self,
+            destination: DocumentDestination,
+            n_workers: int = 2,
+            batch_size: int = 100,
+            max_pending: int = 1000,
+            fsync: Optional[str] = None,
+            executor: str = "thread",
+    ):
+        """
+        Create a BufferedAsyncDestination.
+
+        Args:
+            destination: the document destination to wrap, this gets closed when this destination is closed.
+            n_workers: the number of workers to use for serializing documents (default: 2)
+            batch_size: the maximum number of documents to write at once (default: 100)
+            max_pending: the maximum number of documents appended but not written yet (default: 1000)
+            fsync: if None (default) leave it to the OS when data is written to disk, if "batch" make sure
+                the data is written to disk after each batch, if "close" make sure the data is written to
+                disk when the destination is closed.
+            executor: "thread" (default) to serialize on a pool of threads or "process" to serialize on
+                a pool of processes.
+        """
+        super().__init__()
+        if fsync not in [None, "batch", "close"]:
+            raise Exception(f"Parameter fsync must be None, 'batch' or 'close', not {fsync}")
+        if batch_size < 1 or max_pending < 1 or n_workers < 1:
+            raise Exception("Parameters batch_size, max_pending and n_workers must be >= 1")
+        self.destination = destination
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self._error = None
+        self._closed = False
+        self._encoder = None
+        self._pool = None
+        if hasattr(destination, "_raw_encoder") and hasattr(destination, "_write_raw"):
+            self._encoder = destination._raw_encoder()
+        if self._encoder is not None:
+            self._pool = _make_executor(executor, n_workers)
+        elif executor not in ["thread", "process"]:
+            raise Exception(f"Parameter executor must be 'thread' or 'process', not {executor}")
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def _write(self, batch):
+        if self._encoder is None:
+            for doc in batch:
+                self.destination.append(doc)
+                self._n += 1
+        else:
+            items = [(doc, fut.result()) for doc, fut in batch]
+            self.destination._write_raw(items, sync=_WRITE_RAW_SYNC[self.fsync])
+            self._n += len(items)
+
+    def _writer(self):
+        """
+        Runs in the writer thread: take batches from the queue and write them, until the end marker is found.
+        """
+        while True:
+            item = self._queue.get()
+            batch = []
+            while item is not _END:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch and self._error is None:
+                try:
+                    self._write(batch)
+                except Exception as ex:  # pylint: disable=W0703
+                    # remember the error and keep draining the queue so that append does not block
+                    self._error = ex
+            if item is _END:
+                return
+
+    def _check_error(self):
+        # the error is kept, so that every later call raises it
+        if self._error is not None:
+            raise self._error
+
+    def append(self, doc: Document) -> None:
+        """
+        Append a document to the destination. This may block if too many documents are waiting to get written.
+
+        Args:
+            doc: the document, if None, no action is performed.
+        """
+        if doc is None:
+            return
+        self._check_error()
+        if self._closed:
+            raise Exception("Cannot append to a closed destination")
+        if self._encoder is None:
+            self._queue.put(doc)
+        else:
+            self._queue.put((doc, self._pool.submit(self._encoder, doc)))
+
+    def close(self) -> None:
+        """
+        Wait until all documents have been written, then close the wrapped destination. Any error which
+        occurred when serializing or writing is raised.
+        """
+        if self._closed:
+            self._check_error()
+            return
+        self._closed = True
+        self._queue.put(_END)
+        self._thread.join()
+        if self._pool is not None:
+            self._pool.shutdown()
+        try:
+            if self._error is None and self.fsync == "close" and self._encoder is not None:
+                self.destination._write_raw([], sync=True)
+        except Exception as ex:  # pylint: disable=W0703
+            self._error = ex
+        finally:
+            self.destination.close()
+        self._check_error()
@@ -4,7 +4,16 @@ as files in a directory.
 """
 
 import os
-from typing import Union, Callable, Iterable, Optional
+import json
+import time
+import mmap
+import bisect
+import hashlib
+from array import array
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Union, Callable, Iterable, Optional, List
 from pathlib import Path
 from urllib.parse import ParseResult
 from gatenlp.urlfileutils import yield_lines_from
@@ -80,6 +89,284 @@ def matching_paths(
                     yield full
 
 
+def _name_matches(fname, exts):
+    if fname.startswith("."):
+        return False
+    if not exts:
+        return True
+    for ext in exts:
+        if fname.endswith(ext):
+            return True
+    return False
+
+
+def _scan_dir(dirpath: str, reldir: str, exts, recursive: bool, since: Optional[float] = None) -> List[str]:
+    """
+    Return the relative paths of all matching files in the directory dirpath/reldir, optionally in all
+    subdirectories, using os.scandir. If since is not None, files are only included from
+    directories which have been modified at or after that time.
+    """
+    paths = []
+    todo = [reldir]
+    while todo:
+        rel = todo.pop()
+        full = os.path.join(dirpath, rel) if rel else dirpath
+        changed = since is None or os.stat(full).st_mtime >= since
+        with os.scandir(full) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    # like os.walk, do not follow symbolic links to directories
+                    if recursive and not entry.is_symlink():
+                        todo.append(os.path.join(rel, entry.name) if rel else entry.name)
+                elif changed and _name_matches(entry.name, exts):
+                    paths.append(os.path.join(rel, entry.name) if rel else entry.name)
+    return paths
+
+
+def _default_index_path(dirpath: str, exts: Optional[List[str]], recursive: bool) -> str:
+    """
+    Return the default path of the index file for a directory, in the user cache directory ($XDG_CACHE_HOME
+    or ~/.cache) so that the indexed directory does not get modified, with a name which depends on the absolute
+    directory path, exts and recursive.
+    """
+    cachedir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    key = hashlib.sha1(json.dumps([os.path.abspath(dirpath), exts, recursive]).encode("utf-8")).hexdigest()
+    return os.path.join(cachedir, "gatenlp", "pathindex", key)
+
+
+class PathIndex(Sequence):
+    """
+    A sorted list of the relative paths of all matching files in a directory tree, stored on disk so that it only
+    needs to get created once and can be reused. The paths are not loaded into memory: the index files are
+    memory mapped and each path is only decoded when accessed, so getting the length or the path for some
+    index is fast and cheap, even for huge directory trees. The index can be shared between processes.
+
+    The index consists of three files: the index file itself, which contains the metadata as JSON,
+    and the files with the paths (index file name plus ".paths") and the offsets of the paths
+    (index file name plus ".offsets").
+
+    The index can be refreshed with `refresh()` to add files which have been added to the directory tree:
+    the new paths get appended in sort order after the already known paths, so the indices of all paths
+    already in the index stay unchanged. To remove paths for files which have been deleted, the index must be
+    rebuilt with `build()`.
+    """
+    def __init__(
+            self,
+            dirpath: str,
+            index_path: Optional[str] = None,
+            exts: Optional[Union[Iterable, str]] = None,
+            recursive: bool = True,
+            n_workers: int = 1,
+            refresh: bool = False,
+    ):
+        """
+        Open or create a path index for a directory.
+
+        Args:
+            dirpath: the directory to index
+            index_path: the path of the index file, if None, a file in the gatenlp subdirectory of the user cache
+                directory ($XDG_CACHE_HOME or ~/.cache) is used whose name depends on the absolute path of the
+                directory, exts and recursive.
+            exts: a single extension of a list of allowed extensions (inluding the dot). If None,
+                all files in the directory not starting with a dot are included
+            recursive: if True (default) include all matching paths from all subdirectories as well
+            n_workers: the number of threads to use for scanning subdirectories in parallel when (re)building
+                or refreshing the index (default: 1)
+            refresh: if True and the index already exists, add any new files to the index
+        """
+        if isinstance(exts, str):
+            exts = [exts]
+        self.dirpath = dirpath
+        self.exts = list(exts) if exts else None
+        self.recursive = recursive
+        self.n_workers = n_workers
+        if index_path is None:
+            index_path = _default_index_path(dirpath, self.exts, recursive)
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        self.index_path = index_path
+        self._meta = None
+        self._offsets = None
+        self._paths = None
+        if os.path.exists(index_path):
+            self._open()
+            if self._meta.get("exts") != self.exts or self._meta.get("recursive") != recursive:
+                self.close()
+                self.build()
+            elif refresh:
+                self.refresh()
+        else:
+            self.build()
+
+    def _scan(self, since=None) -> List[str]:
+        if not self.recursive or self.n_workers < 2:
+            return _scan_dir(self.dirpath, "", self.exts, self.recursive, since=since)
+        # scan the files in the top directory directly and each subdirectory on a worker thread
+        paths = []
+        subdirs = []
+        changed = since is None or os.stat(self.dirpath).st_mtime >= since
+        with os.scandir(self.dirpath) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        subdirs.append(entry.name)
+                elif changed and _name_matches(entry.name, self.exts):
+                    paths.append(entry.name)
+        with ThreadPoolExecutor(max_workers=self.n_workers) as pool:
+            for subpaths in pool.map(
+                    lambda subdir: _scan_dir(self.dirpath, subdir, self.exts, True, since=since), subdirs):
+                paths.extend(subpaths)
+        return paths
+
+    def _write(self, paths: List[str], meta: dict, append: bool = False):
+        """
+        Write (or append) the paths and offsets files, then the metadata.
+        """
+        mode = "ab" if append else "wb"
+        offsets = array("Q")
+        offset = self._meta["size"] if append else 0
+        if not append:
+            offsets.append(0)
+        with open(self.index_path + ".paths", mode) as outfp:
+            for path in paths:
+                data = path.encode("utf-8")
+                outfp.write(data)
+                offset += len(data)
+                offsets.append(offset)
+        with open(self.index_path + ".offsets", mode) as outfp:
+            offsets.tofile(outfp)
+        meta["size"] = offset
+        with open(self.index_path, "wt", encoding="utf-8") as outfp:
+            json.dump(meta, outfp)
+
+    def _open(self):
+        with open(self.index_path, "rt", encoding="utf-8") as infp:
+            self._meta = json.load(infp)
+        self._offsets = None
+        self._paths = None
+        if self._meta["n"] > 0:
+            with open(self.index_path + ".offsets", "rb") as infp:
+                self._offsets_mm = mmap.mmap(infp.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(self.index_path + ".paths", "rb") as infp:
+                self._paths = mmap.mmap(infp.fileno(), 0, access=mmap.ACCESS_READ)
+            self._offsets = memoryview(self._offsets_mm).cast("Q")
+
+    def close(self):
+        """
+        Close the memory mapped index files.
+        """
+        if self._offsets is not None:
+            self._offsets.release()
+            self._offsets_mm.close()
+            self._paths.close()
+        self._offsets = None
+        self._paths = None
+
+    def build(self):
+        """
+        (Re)build the index from scratch.
+        """
+        self.close()
+        built = time.time()
+        paths = self._scan()
+        paths.sort()
+        meta = dict(version=1, exts=self.exts, recursive=self.recursive, n=len(paths), nsorted=len(paths),
+                    built=built)
+        self._write(paths, meta)
+        self._open()
+
+    def refresh(self) -> int:
+        """
+        Add the paths of all matching files in directories which have been modified since the index was last
+        built or refreshed and which are not already in the index. The new paths are added in sort order
+        after all existing paths.
+
+        The index must not get refreshed or rebuilt from several processes at the same time.
+
+        Returns:
+            the number of paths added
+        """
+        built = time.time()
+        # the index may have been changed by another instance since we opened it
+        self.close()
+        self._open()
+        # allow for file systems with a coarse modification time resolution, files which are already known
+        # get ignored anyway
+        candidates = self._scan(since=self._meta["built"] - 2.0)
+        nsorted = self._meta["nsorted"]
+        appended = set(self[i] for i in range(nsorted, len(self)))
+        newpaths = sorted(set(
+            p for p in candidates if p not in appended and not self._in_sorted(p, nsorted)
+        ))
+        meta = dict(self._meta)
+        meta["n"] += len(newpaths)
+        meta["built"] = built
+        self.close()
+        self._write(newpaths, meta, append=True)
+        self._open()
+        return len(newpaths)
+
+    def _in_sorted(self, path, nsorted):
+        idx = bisect.bisect_left(self, path, 0, nsorted)
+        return idx < nsorted and self[idx] == path
+
+    def __len__(self):
+        return self._meta["n"]
+
+    def __getitem__(self, idx):
+        n = self._meta["n"]
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(n))]
+        if idx < 0:
+            idx += n
+        if idx < 0 or idx >= n:
+            raise IndexError(f"Index {idx} out of range for path index of size {n}")
+        return self._paths[self._offsets[idx]:self._offsets[idx+1]].decode("utf-8")
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ["_offsets", "_offsets_mm", "_paths"]:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+
+class _EveryNthPaths(Sequence):
+    """
+    A read-only view of every nparts-th element of a sequence, starting with partnr.
+    """
+    def __init__(self, paths, nparts, partnr):
+        self.paths = paths
+        self.nparts = nparts
+        self.partnr = partnr
+
+    def __len__(self):
+        olen = len(self.paths)
+        return olen // self.nparts + (1 if (olen % self.nparts) > self.partnr else 0)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError(f"Index {idx} out of range")
+        return self.paths[idx * self.nparts + self.partnr]
+
+    def refresh(self) -> int:
+        """
+        Refresh the underlying PathIndex, see `PathIndex.refresh()`.
+
+        Returns:
+            the number of paths added to this view
+        """
+        before = len(self)
+        self.paths.refresh()
+        return len(self) - before
+
+
 def maker_file_path_fromidx(digits=1, levels=1):
     """
     Creates a method that returns a file path for the given number of leading digits and levels.
@@ -147,6 +434,7 @@ class DirFilesSource(DocumentSource, EveryNthBase, MultiProcessingAble):
         docname_from: Optional[str] = None,
         nparts: int = 1,
         partnr: int = 0,
+        path_index: Union[None, bool, str] = None,
     ):
         """
         Create a DirFilesSource.
@@ -168,6 +456,10 @@ class DirFilesSource(DocumentSource, EveryNthBase, MultiProcessingAble):
                 "index" (sequence number of document within this part).
             nparts: only yield every nparts-th document (default 1: every document)
             partnr: start with that index, before yieldieng every nparts-th document (default 0: start at beginning)
+            path_index: if True or the path of an index file, use a PathIndex to get the sorted paths of the
+                matching files, which gets created if it does not exist yet and refreshed otherwise. This avoids
+                keeping all paths in memory for huge directory trees. Cannot be used with paths, paths_from,
+                a sort function or reverse sorting.
         """
         self.dirpath = dirpath
         if paths is not None and paths_from is not None:
@@ -177,6 +469,17 @@ class DirFilesSource(DocumentSource, EveryNthBase, MultiProcessingAble):
         if docname_from is not None:
             assert docname_from in ["basename", "relpath", "index", "stem", "minstem"]
         self.docname_from = docname_from
+        self.fmt = fmt
+        if path_index:
+            if paths is not None or paths_from is not None or callable(sort) or sort_reverse:
+                raise Exception("Parameter path_index cannot be used with paths, paths_from, sort function or "
+                                "sort_reverse")
+            self.paths = PathIndex(
+                dirpath, index_path=path_index if isinstance(path_index, str) else None,
+                exts=exts, recursive=recursive, refresh=True)
+            if nparts > 1:
+                self.paths = _EveryNthPaths(self.paths, nparts, partnr)
+            return
         if paths is not None:
             self.paths = paths
         elif paths_from is not None:
@@ -196,33 +499,89 @@ class DirFilesSource(DocumentSource, EveryNthBase, MultiProcessingAble):
                 for idx, p in enumerate(self.paths)
                 if ((idx - partnr) % nparts) == 0
             ]
-        self.fmt = fmt
+
+    def _read_raw(self):
+        """
+        Yield tuples (n, relpath, loader, data) for the documents to load from the directory, where n is the
+        running number of the document, loader is the document loader if the format can be loaded from
+        in-memory bytes and data is the content of the file in that case. Otherwise, loader and data are None
+        and the document has to be loaded from the file.
+        """
+        for n, p in enumerate(self.paths):
+            fullpath = os.path.join(self.dirpath, p)
+            loader = _bytes_loader(fullpath, self.fmt)
+            if loader is None:
+                yield n, p, None, None
+            else:
+                with open(fullpath, "rb") as infp:
+                    yield n, p, loader, infp.read()
+
+    def _raw_decoder(self):
+        """
+        Return a picklable callable which converts the raw data yielded from `_read_raw` to a document.
+        """
+        return partial(
+            _dirfile2document,
+            dirpath=self.dirpath,
+            fmt=self.fmt,
+            docname_from=self.docname_from,
+            relpathfeatname=self.relpathfeatname(),
+        )
 
     def __iter__(self):
         """
         Yield the next document from the source.
         """
         self._n = 0
-        for p in self.paths:
-            fullpath = os.path.join(self.dirpath, p)
-            doc = Document.load(fullpath, fmt=self.fmt)
-            self.setrelpathfeature(doc, p)
-            if self.docname_from:
-                if self.docname_from == "basename":
-                    docname = os.path.basename(fullpath)
-                elif self.docname_from == "stem":
-                    docname = Path(fullpath).stem
-                elif self.docname_from == "index":
-                    docname = str(self._n)
-                elif self.docname_from == "relpath":
-                    docname = p
-                elif self.docname_from == "minstem":
-                    docname = minstem(fullpath)
-                doc.name = docname
+        decoder = self._raw_decoder()
+        for raw in self._read_raw():
+            doc = decoder(raw)
             self._n += 1
             yield doc
 
 
+def _bytes_loader(path, fmt):
+    """
+    Return the document loader for the file if that loader can create a document from in-memory bytes,
+    otherwise return None.
+    """
+    from gatenlp.serialization.default import get_document_loader, JsonSerializer, MsgPackSerializer
+    from gatenlp.serialization.default import PickleSerializer
+    try:
+        loader = get_document_loader(path, fmt)
+    except Exception:
+        return None
+    if loader in (JsonSerializer.load, JsonSerializer.load_gzip, MsgPackSerializer.load, PickleSerializer.load):
+        return loader
+    return None
+
+
+def _dirfile2document(raw, dirpath=None, fmt=None, docname_from=None, relpathfeatname="_relpath"):
+    """
+    Helper function to create a document from the raw data yielded by DirFilesSource._read_raw.
+    """
+    n, p, loader, data = raw
+    fullpath = os.path.join(dirpath, p)
+    if loader is None:
+        doc = Document.load(fullpath, fmt=fmt)
+    else:
+        doc = Document.load_mem(data, fmt=loader)
+    doc.features[relpathfeatname] = p
+    if docname_from:
+        if docname_from == "basename":
+            docname = os.path.basename(fullpath)
+        elif docname_from == "stem":
+            docname = Path(fullpath).stem
+        elif docname_from == "index":
+            docname = str(n)
+        elif docname_from == "relpath":
+            docname = p
+        elif docname_from == "minstem":
+            docname = minstem(fullpath)
+        doc.name = docname
+    return doc
+
+
 class DirFilesDestination(DocumentDestination):
     """
     A destination where each document is stored in a file in a directory or directory tree in some
@@ -309,6 +668,8 @@ class DirFilesDestination(DocumentDestination):
             ext = "." + ext
         self.ext = ext
         self.fmt = fmt
+        # the paths of the files written by _write_raw which still need to get synced
+        self._unsynced = []
 
     def append(self, doc):
         """
@@ -320,6 +681,15 @@ class DirFilesDestination(DocumentDestination):
         if doc is None:
             return
         assert isinstance(doc, Document)
+        path = self._next_path(doc)
+        Document.save(doc, path, fmt=self.fmt)
+        self.idx += 1
+        self._n += 1
+
+    def _next_path(self, doc):
+        """
+        Return the path of the file for the next document, creating any missing directories.
+        """
         path = self.file_path_maker(doc=doc, idx=self.idx)
         path = os.path.normpath(
             path
@@ -331,14 +701,83 @@ class DirFilesDestination(DocumentDestination):
             dirs = path[: path.rindex(os.path.sep)]
             if not os.path.exists(os.path.normpath(dirs)):
                 os.makedirs(dirs)
-        Document.save(doc, path, fmt=self.fmt)
-        self.idx += 1
-        self._n += 1
+        return path
+
+    def _raw_encoder(self):
+        """
+        Return a picklable callable which converts a document to the raw data expected by `_write_raw`, or
+        None if the format does not support serializing to memory.
+        """
+        from gatenlp.serialization.default import get_document_saver, JsonSerializer, MsgPackSerializer
+        from gatenlp.serialization.default import PickleSerializer
+        try:
+            saver = get_document_saver("doc" + self.ext, self.fmt)
+        except Exception:
+            return None
+        if saver not in (JsonSerializer.save, JsonSerializer.save_gzip, MsgPackSerializer.save, PickleSerializer.save):
+            return None
+        return partial(_document2mem, saver=saver)
+
+    def _write_raw(self, items, sync=False):
+        """
+        Write the raw data for a batch of documents, each to its own file.
+
+        Args:
+            items: a list of tuples (doc, raw) where raw is the data returned by the raw encoder for the document
+            sync: if True, make sure the data of the files written now and of all files written with
+                sync="close" since the last sync is written to disk, together with their directories.
+                If "close", remember the files written so that a later call with sync=True syncs them.
+        """
+        written = []
+        for doc, raw in items:
+            path = self._next_path(doc)
+            if isinstance(raw, str):
+                raw = raw.encode("utf-8")
+            with open(path, "wb") as outfp:
+                outfp.write(raw)
+                if sync is True:
+                    outfp.flush()
+                    os.fsync(outfp.fileno())
+            written.append(path)
+            self.idx += 1
+            self._n += 1
+        if sync == "close":
+            self._unsynced.extend(written)
+        elif sync:
+            for path in self._unsynced:
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            _fsync_dirs(set(os.path.dirname(path) for path in self._unsynced + written))
+            self._unsynced = []
 
     def close(self):
         pass
 
 
+def _fsync_dirs(dirpaths):
+    """
+    Make sure the directory entries of the given directories are written to disk, where the OS supports it.
+    """
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    for dirpath in dirpaths:
+        fd = os.open(dirpath, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _document2mem(doc, saver=None):
+    """
+    Helper function to serialize the document to a string or bytes using the given saver.
+    """
+    return saver(Document, doc, to_mem=True)
+
+
 class DirFilesCorpus(Corpus, MultiProcessingAble):
     """
     A corpus representing all files in a directory that match the given extension.
@@ -352,7 +791,8 @@ class DirFilesCorpus(Corpus, MultiProcessingAble):
                  sort: Union[bool, Callable] = False,
                  sort_reverse: bool = False,
                  nparts: int = 1,
-                 partnr: int = 0
+                 partnr: int = 0,
+                 path_index: Union[None, bool, str] = None,
                  ):
         """
         Creates the DirCorpus.
@@ -366,6 +806,11 @@ class DirFilesCorpus(Corpus, MultiProcessingAble):
             sort_reverse: if sort is not False and this is True, sort in reverse order
             nparts: only yield every nparts-th document (default 1: every document)
             partnr: start with that index, before yieldieng every nparts-th document (default 0: start at beginning)
+            path_index: if True or the path of an index file, use a PathIndex to get the sorted paths of the
+                matching files, which gets created if it does not exist yet. This avoids walking the directory
+                tree and keeping all paths in memory for huge directory trees. Cannot be used with a
+                sort function or reverse sorting. Call `refresh()` on the `paths` to add new files, this
+                also changes the size of the corpus.
         """
         if not ext:
             ext = "bdocjs"
@@ -378,6 +823,15 @@ class DirFilesCorpus(Corpus, MultiProcessingAble):
             raise Exception(f"Directory {dirpath} does not exist")
         if not os.path.isdir(dirpath):
             raise Exception(f"Not a directory: {dirpath}")
+        if path_index:
+            if callable(sort) or sort_reverse:
+                raise Exception("Parameter path_index cannot be used with a sort function or sort_reverse")
+            self.paths = PathIndex(
+                dirpath, index_path=path_index if isinstance(path_index, str) else None,
+                exts=[ext], recursive=recursive)
+            if nparts > 1:
+                self.paths = _EveryNthPaths(self.paths, nparts, partnr)
+            return
         self.paths = list(matching_paths(dirpath, exts=[ext], recursive=recursive))
         if sort or nparts > 1:
             if callable(sort):
@@ -390,10 +844,16 @@ class DirFilesCorpus(Corpus, MultiProcessingAble):
                 for idx, p in enumerate(self.paths)
                 if ((idx - partnr) % nparts) == 0
             ]
-        self.size = len(self.paths)
+
+    @property
+    def size(self):
+        """
+        Returns the number of documents in the corpus, this changes if the path index gets refreshed.
+        """
+        return len(self.paths)
 
     def __len__(self):
-        return self.size
+        return len(self.paths)
 
     def __getitem__(self, idx):
         assert isinstance(idx, int)
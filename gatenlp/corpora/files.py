@@ -3,43 +3,137 @@ Module that defines Corpus and DocumentSource/DocumentDestination classes which
 as lines or parts in a file.
 """
 
-from typing import Optional, Union, List, Dict, IO
+from typing import Optional, Union, List, Dict, IO, Iterable
+import io
+import os
 import json
-from gatenlp.urlfileutils import yield_lines_from
+import mmap
+import struct
+from array import array
+import numbers
+from pathlib import Path
+from functools import partial
+from gatenlp.urlfileutils import yield_lines_from, infer_compression, open_compressed, is_url
+from gatenlp.urlfileutils import yield_block_lines, yield_part_lines, BLOCK_INDEX_EXT
 from gatenlp.document import Document
-from gatenlp.corpora.base import DocumentSource, DocumentDestination
-from gatenlp.corpora.base import MultiProcessingAble
+from gatenlp.corpora.base import DocumentSource, DocumentDestination, Corpus
+from gatenlp.corpora.base import MultiProcessingAble, EveryNthBase
 
 
-class BdocjsLinesFileSource(DocumentSource, MultiProcessingAble):
+class LinesFileSourceBase(EveryNthBase, DocumentSource, MultiProcessingAble):
     """
-    A document source which reads one bdoc json serialization of a document from each line of the given file.
+    Common base class for document sources which read one document from each line of a file,
+    optionally compressed.
     """
-
-    def __init__(self, file):
+    def __init__(
+            self,
+            file: Union[str, Path, IO],
+            compression: Optional[str] = "infer",
+            nparts: int = 1,
+            partnr: int = 0,
+            n_workers: int = 1,
+    ):
         """
-        Create a JsonLinesFileSource.
+        Initialize the base class.
 
         Args:
-            file: the file path (a string) or an open file handle.
+            file: the file path or an open file handle.
+            compression: one of None (not compressed), "gzip", "bz2", "zstd", "blockgzip" (a block gzip compressed
+                file with an index, see `gatenlp.urlfileutils.BlockGzipWriter`) or "infer" (default) to determine the
+                compression from the file extension. A gzip compressed file for which an index file exists is
+                read as a block gzip compressed file.
+            nparts: the number of parts to split the file into for processing in parallel (default: 1). For
+                uncompressed files, each part is a byte range of the file, for block gzip compressed files
+                a range of blocks. Otherwise every nparts-th line is used, but all lines have to be read.
+            partnr: the part to read, 0 <= partnr < nparts
+            n_workers: the number of blocks to decompress in parallel for block gzip compressed files (default: 1)
         """
-        super().__init__()
+        DocumentSource.__init__(self)
+        if (not isinstance(nparts, numbers.Integral)) or (not isinstance(partnr, numbers.Integral)):
+            raise Exception("nparts and partnr must be integers.")
+        if nparts < 1 or partnr < 0 or partnr >= nparts:
+            raise Exception("nparts must be >= 1 and partnr must be >= 0 and < nparts")
+        EveryNthBase.__init__(self, nparts=nparts, partnr=partnr)
         self.file = file
-        self.fh = open(self.file, "rt", encoding="utf-8")
+        self.n_workers = n_workers
+        self.fh = None
+        if isinstance(file, (str, Path)):
+            compression = infer_compression(file, compression)
+            if compression == "gzip" and os.path.exists(str(file) + BLOCK_INDEX_EXT):
+                compression = "blockgzip"
+            self.compression = compression
+            # the file is opened when iterating if we read a byte range or blocks
+            if compression != "blockgzip" and not (compression is None and nparts > 1):
+                self.fh = open_compressed(file, "rt", compression=compression, encoding="utf-8")
+        else:
+            self.compression = None
+            self.fh = file
 
     def __enter__(self):
         return self
 
     def __exit__(self, extype, value, traceback):
-        self.fh.close()
+        self.close()
 
     def close(self):
-        self.fh.close()
+        if self.fh is not None:
+            self.fh.close()
+
+    def _read_raw(self):
+        """
+        Yield the raw serialized documents, one line at a time.
+        """
+        if self.compression == "blockgzip":
+            return yield_block_lines(self.file, nparts=self.nparts, partnr=self.partnr, n_workers=self.n_workers)
+        if self.fh is None:
+            return yield_part_lines(self.file, nparts=self.nparts, partnr=self.partnr)
+        if self.nparts > 1:
+            # cannot seek into a compressed stream or file handle, need to read all lines and use every nth
+            return (line for idx, line in enumerate(self.fh) if idx % self.nparts == self.partnr)
+        return iter(self.fh)
+
+
+class BdocjsLinesFileSource(LinesFileSourceBase):
+    """
+    A document source which reads one bdoc json serialization of a document from each line of the given file.
+    """
+
+    def __init__(
+            self,
+            file: Union[str, Path, IO],
+            compression: Optional[str] = "infer",
+            nparts: int = 1,
+            partnr: int = 0,
+            n_workers: int = 1,
+    ):
+        """
+        Create a BdocjsLinesFileSource.
+
+        Args:
+            file: the file path or an open file handle.
+            compression: one of None (not compressed), "gzip", "bz2", "zstd", "blockgzip" (a block gzip compressed
+                file with an index, see `gatenlp.urlfileutils.BlockGzipWriter`) or "infer" (default) to determine the
+                compression from the file extension. A gzip compressed file for which an index file exists is
+                read as a block gzip compressed file.
+            nparts: the number of parts to split the file into for processing in parallel (default: 1). For
+                uncompressed files, each part is a byte range of the file, for block gzip compressed files
+                a range of blocks. Otherwise every nparts-th line is used, but all lines have to be read.
+            partnr: the part to read, 0 <= partnr < nparts
+            n_workers: the number of blocks to decompress in parallel for block gzip compressed files (default: 1)
+        """
+        super().__init__(file, compression=compression, nparts=nparts, partnr=partnr, n_workers=n_workers)
+
+    def _raw_decoder(self):
+        """
+        Return a picklable callable which converts the raw data yielded from `_read_raw` to a document.
+        """
+        return partial(Document.load_mem, fmt="json")
 
     def __iter__(self):
-        for line in self.fh:
+        decoder = self._raw_decoder()
+        for line in self._read_raw():
             self._n += 1
-            yield Document.load_mem(line, fmt="json")
+            yield decoder(line)
 
 
 class BdocjsLinesFileDestination(DocumentDestination):
@@ -47,16 +141,20 @@ class BdocjsLinesFileDestination(DocumentDestination):
     Writes one line of JSON per document to the a single output file.
     """
 
-    def __init__(self, file):
+    def __init__(self, file, compression: Optional[str] = "infer"):
         """
 
         Args:
             file: the file to write to. If it exists, it gets overwritten without warning.
                Expected to be a string or an open file handle.
+            compression: one of None (not compressed), "gzip", "bz2", "zstd", "blockgzip" (independently gzip
+                compressed blocks of lines plus an index file, see `gatenlp.urlfileutils.BlockGzipWriter`)
+                or "infer" (default) to determine the compression from the file extension. Ignored if file
+                is a file handle.
         """
         super().__init__()
-        if isinstance(file, str):
-            self.fh = open(file, "wt", encoding="utf-8")
+        if isinstance(file, (str, Path)):
+            self.fh = open_compressed(file, "wt", compression=compression, encoding="utf-8")
         else:
             self.fh = file
 
@@ -80,10 +178,48 @@ class BdocjsLinesFileDestination(DocumentDestination):
         self.fh.write("\n")
         self._n += 1
 
+    def _raw_encoder(self):
+        """
+        Return a picklable callable which converts a document to the raw data expected by `_write_raw`.
+        """
+        return partial(_document2line, fmt="json")
+
+    def _write_raw(self, items, sync=False):
+        """
+        Write the raw data for a batch of documents.
+
+        Args:
+            items: a list of tuples (doc, raw) where raw is the data returned by the raw encoder for the document
+            sync: if True, make sure the data is written to disk, if "close", the data only gets written to disk
+                by a later call with sync=True
+        """
+        self.fh.write("".join(raw for _, raw in items))
+        self._n += len(items)
+        if sync is True:
+            _sync(self.fh)
+
     def close(self):
         self.fh.close()
 
 
+def _document2line(doc, fmt="json"):
+    """
+    Helper function to serialize a document as a single line.
+    """
+    return doc.save_mem(fmt=fmt) + "\n"
+
+
+def _sync(fh):
+    """
+    Flush and sync the file handle to disk, if possible.
+    """
+    fh.flush()
+    try:
+        os.fsync(fh.fileno())
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+
+
 def _update_dict_from_dict_4spec(todict, fromdict, spec, exclude_key=None, exclude4underscore=False):
     """
     Helper function for updating the todoct dict-like object from the fromdict dict-like object, according to
@@ -119,7 +255,25 @@ def _update_dict_from_dict_4spec(todict, fromdict, spec, exclude_key=None, exclu
             todict[kto] = fromdict[kfrom]
 
 
-class JsonLinesFileSource(DocumentSource, MultiProcessingAble):
+def _jsonline2document(line, text_field="text", feature_fields=None, data_fields=None, data_feature="__data"):
+    """
+    Helper function to create a document from a json line, see JsonLinesFileSource for the parameters.
+    """
+    data = json.loads(line)
+    text = data.get(text_field, "")
+    doc = Document(text)
+    _update_dict_from_dict_4spec(
+        doc.features, data, feature_fields,
+        exclude_key=text_field, exclude4underscore=feature_fields is True)
+    if data_fields:
+        doc.features[data_feature] = {}
+        _update_dict_from_dict_4spec(
+            doc.features[data_feature], data, data_fields,
+            exclude_key=text_field, exclude4underscore=False)
+    return doc
+
+
+class JsonLinesFileSource(LinesFileSourceBase):
     """
     A document source which reads one json serialization per line, creates a document from one field
     in the json and optionally stores all or a selection of remaining fields as document features or
@@ -132,7 +286,12 @@ class JsonLinesFileSource(DocumentSource, MultiProcessingAble):
             text_field: str = "text",
             feature_fields: Optional[Union[bool, List[str], Dict[str, str]]] = None,
             data_fields: Optional[Union[bool, List[str], Dict[str, str]]] = None,
-            data_feature: Optional[str] = "__data" ):
+            data_feature: Optional[str] = "__data",
+            compression: Optional[str] = "infer",
+            nparts: int = 1,
+            partnr: int = 0,
+            n_workers: int = 1,
+    ):
         """
         Create a JsonLinesFileSource.
 
@@ -150,41 +309,41 @@ class JsonLinesFileSource(DocumentSource, MultiProcessingAble):
                 The data feature should be a transient feature (the name starts with two underscores), the
                 name for that feature is specified through the data_feature parameter
             data_feature:  the name of the data feature if used (if None, "__data" is used)
+            compression: one of None (not compressed), "gzip", "bz2", "zstd", "blockgzip" (a block gzip compressed
+                file with an index, see `gatenlp.urlfileutils.BlockGzipWriter`) or "infer" (default) to determine the
+                compression from the file extension. A gzip compressed file for which an index file exists is
+                read as a block gzip compressed file.
+            nparts: the number of parts to split the file into for processing in parallel (default: 1). For
+                uncompressed files, each part is a byte range of the file, for block gzip compressed files
+                a range of blocks. Otherwise every nparts-th line is used, but all lines have to be read.
+            partnr: the part to read, 0 <= partnr < nparts
+            n_workers: the number of blocks to decompress in parallel for block gzip compressed files (default: 1)
         """
-        super().__init__()
-        self.file = file
+        super().__init__(file, compression=compression, nparts=nparts, partnr=partnr, n_workers=n_workers)
         self.text_field = text_field
         self.feature_fields = feature_fields
         self.data_fields = data_fields
         if data_feature is None:
             data_feature = "__data"
         self.data_feature = data_feature
-        self.fh: IO = open(self.file, "rt", encoding="utf-8")
+
+    def _raw_decoder(self):
+        """
+        Return a picklable callable which converts the raw data yielded from `_read_raw` to a document.
+        """
+        return partial(
+            _jsonline2document,
+            text_field=self.text_field,
+            feature_fields=self.feature_fields,
+            data_fields=self.data_fields,
+            data_feature=self.data_feature,
+        )
 
     def __iter__(self):
-        for line in self.fh:
-            data = json.loads(line)
-            text = data.get(self.text_field, "")
-            doc = Document(text)
-            _update_dict_from_dict_4spec(
-                doc.features, data, self.feature_fields,
-                exclude_key=self.text_field, exclude4underscore=self.feature_fields is True)
-            if self.data_fields:
-                doc.features[self.data_feature] = {}
-                _update_dict_from_dict_4spec(
-                    doc.features[self.data_feature], data, self.data_fields,
-                    exclude_key=self.text_field, exclude4underscore=False)
+        decoder = self._raw_decoder()
+        for line in self._read_raw():
             self._n += 1
-            yield doc
-
-    def __enter__(self):
-        return self
-
-    def __exit__(self, extype, value, traceback):
-        self.fh.close()
-
-    def close(self):
-        self.fh.close()
+            yield decoder(line)
 
 
 class JsonLinesFileDestination(DocumentDestination):
@@ -201,7 +360,8 @@ class JsonLinesFileDestination(DocumentDestination):
             document_bdocjs: bool = False,
             feature_fields: Optional[Union[bool, List[str], Dict[str, str]]] = None,
             data_fields: Optional[Union[bool, List[str], Dict[str, str]]] = None,
-            data_feature="__data"):
+            data_feature="__data",
+            compression: Optional[str] = "infer"):
         """
 
         Args:
@@ -218,10 +378,14 @@ class JsonLinesFileDestination(DocumentDestination):
                 stored as fields with the same name, or a dictionary mapping feature to field names, or True to
                 indiciate that all features (except the one containing the document text) get stored as fields.
             data_feature:  the name of the data feature if used (if None, "__data" is used)
+            compression: one of None (not compressed), "gzip", "bz2", "zstd", "blockgzip" (independently gzip
+                compressed blocks of lines plus an index file, see `gatenlp.urlfileutils.BlockGzipWriter`)
+                or "infer" (default) to determine the compression from the file extension. Ignored if file
+                is a file handle.
         """
         super().__init__()
-        if isinstance(file, str):
-            self.fh = open(file, "wt", encoding="utf-8")
+        if isinstance(file, (str, Path)):
+            self.fh = open_compressed(file, "wt", compression=compression, encoding="utf-8")
         else:
             self.fh = file
         self.text_field = text_field
@@ -248,37 +412,72 @@ class JsonLinesFileDestination(DocumentDestination):
         if doc is None:
             return
         assert isinstance(doc, Document)
-        data = {}
-        _update_dict_from_dict_4spec(
-            data,
-            doc.features,
-            self.feature_fields,
-            exclude_key=self.text_field, exclude4underscore=self.feature_fields is True)
-        _update_dict_from_dict_4spec(
-            data,
-            doc.features.get(self.data_feature, {}), self.data_fields,
-            exclude_key=self.text_field, exclude4underscore=False)
-        # assign the document field last so it overwrites anything that comes from the data feature!
-        if self.document_bdocjs:
-            data[self.text_field] = doc.save_mem(fmt="json")
-        else:
-            data[self.text_field] = doc.text
-        self.fh.write(json.dumps(data))
-        self.fh.write("\n")
+        self.fh.write(self._raw_encoder()(doc))
         self._n += 1
 
+    def _raw_encoder(self):
+        """
+        Return a picklable callable which converts a document to the raw data expected by `_write_raw`.
+        """
+        return partial(
+            _document2jsonline,
+            text_field=self.text_field,
+            document_bdocjs=self.document_bdocjs,
+            feature_fields=self.feature_fields,
+            data_fields=self.data_fields,
+            data_feature=self.data_feature,
+        )
+
+    def _write_raw(self, items, sync=False):
+        """
+        Write the raw data for a batch of documents.
+
+        Args:
+            items: a list of tuples (doc, raw) where raw is the data returned by the raw encoder for the document
+            sync: if True, make sure the data is written to disk, if "close", the data only gets written to disk
+                by a later call with sync=True
+        """
+        self.fh.write("".join(raw for _, raw in items))
+        self._n += len(items)
+        if sync is True:
+            _sync(self.fh)
+
     def close(self):
         self.fh.close()
 
 
-class TsvFileSource(DocumentSource, MultiProcessingAble):
+def _document2jsonline(
+        doc, text_field="text", document_bdocjs=False, feature_fields=None, data_fields=None, data_feature="__data"):
+    """
+    Helper function to create a json line from a document, see JsonLinesFileDestination for the parameters.
+    """
+    data = {}
+    _update_dict_from_dict_4spec(
+        data,
+        doc.features,
+        feature_fields,
+        exclude_key=text_field, exclude4underscore=feature_fields is True)
+    _update_dict_from_dict_4spec(
+        data,
+        doc.features.get(data_feature, {}), data_fields,
+        exclude_key=text_field, exclude4underscore=False)
+    # assign the document field last so it overwrites anything that comes from the data feature!
+    if document_bdocjs:
+        data[text_field] = doc.save_mem(fmt="json")
+    else:
+        data[text_field] = doc.text
+    return json.dumps(data) + "\n"
+
+
+class TsvFileSource(EveryNthBase, DocumentSource, MultiProcessingAble):
     """
     A TsvFileSource is a DocumentSource which is a single TSV file with a fixed number of tab-separated
     values per row. Each document in sequence is created from the text in one of the columns and
     document features can be set from arbitrary columns as well.
     """
     # TODO: better implementation where we make explicit use of the context manager and iterator
-    def __init__(self, source, hdr=True, text_col=None, feature_cols=None, data_cols=None, data_feature="__data"):
+    def __init__(self, source, hdr=True, text_col=None, feature_cols=None, data_cols=None, data_feature="__data",
+                 nparts=1, partnr=0):
         """
         Creates the TsvFileSource.
 
@@ -300,8 +499,17 @@ class TsvFileSource(DocumentSource, MultiProcessingAble):
                 has a header line. The values are stored as a list in the order of the names given or the original
                 order of the values in the TSV file.
             data_feature: the name of the document feature where to store the data, default is "__data"
+            nparts: the number of parts to split the file into for processing in parallel (default: 1). For
+                uncompressed local files, each part is a byte range of the file, otherwise every nparts-th
+                row is used, but all rows have to be read.
+            partnr: the part to read, 0 <= partnr < nparts
         """
-        super().__init__()
+        DocumentSource.__init__(self)
+        if (not isinstance(nparts, numbers.Integral)) or (not isinstance(partnr, numbers.Integral)):
+            raise Exception("nparts and partnr must be integers.")
+        if nparts < 1 or partnr < 0 or partnr >= nparts:
+            raise Exception("nparts must be >= 1 and partnr must be >= 0 and < nparts")
+        EveryNthBase.__init__(self, nparts=nparts, partnr=partnr)
         assert text_col is not None
         self.hdr = hdr
         self.text_col = text_col
@@ -315,10 +523,22 @@ class TsvFileSource(DocumentSource, MultiProcessingAble):
         self.data_feature = data_feature
 
     def __iter__(self):
-        reader = yield_lines_from(self.source)
-        if self.hdr and self.nlines == 0:
-            self.nlines += 1
-            self.hdr = next(reader).rstrip("\n\r").split("\t")
+        isurl, extstr = is_url(self.source)
+        if self.nparts > 1 and not isurl and infer_compression(extstr) is None:
+            # read just the byte range for our part, the header line is always at the start of the file
+            reader = yield_part_lines(extstr, nparts=self.nparts, partnr=self.partnr)
+            if self.hdr and self.nlines == 0:
+                self.nlines += 1
+                self.hdr = next(yield_lines_from(self.source)).rstrip("\n\r").split("\t")
+            if self.hdr and self.partnr == 0:
+                next(reader, None)
+        else:
+            reader = yield_lines_from(self.source)
+            if self.hdr and self.nlines == 0:
+                self.nlines += 1
+                self.hdr = next(reader).rstrip("\n\r").split("\t")
+            if self.nparts > 1:
+                reader = (line for idx, line in enumerate(reader) if idx % self.nparts == self.partnr)
         if self.hdr:
             self.hdr2col = {name: idx for idx, name in enumerate(self.hdr)}
         for line in reader:
@@ -368,3 +588,110 @@ class TsvFileSource(DocumentSource, MultiProcessingAble):
     def close(self):
         pass
 
+
+class MmapFileCorpus(Corpus, MultiProcessingAble):
+    """
+    A read-only corpus of documents stored serialized in a single file together with a table of offsets, which is
+    accessed as a memory mapped file. This allows processes which use the same corpus file to share the
+    pages of the file and only deserialize the documents they actually access, e.g. when the corpus is
+    wrapped in an EveryNthCorpus or ShuffledCorpus and sent to a number of worker processes: pickling the
+    corpus only pickles the file path.
+
+    The file is created with `MmapFileCorpus.create(path, docs)`.
+    """
+
+    MAGIC = b"GNLPMMC1"
+    # magic, number of documents, position of the offsets table, format name
+    HEADER = struct.Struct("<8sQQ16s")
+
+    @classmethod
+    def create(cls, path: Union[str, Path], docs: Iterable[Document], fmt: str = "json"):
+        """
+        Create the corpus file from the given documents and return the corpus.
+
+        Args:
+            path: the path of the file to create, overwritten if it exists.
+            docs: an iterable of documents
+            fmt: the serialization format to use, "json" (default), "msgpack" or "pickle"
+
+        Returns:
+            the MmapFileCorpus for the file
+        """
+        if fmt not in ["json", "msgpack", "pickle"]:
+            raise Exception(f"Format {fmt} not supported, must be one of json, msgpack, pickle")
+        offsets = array("Q")
+        with open(path, "wb") as outfp:
+            outfp.write(b"\0" * cls.HEADER.size)
+            offset = cls.HEADER.size
+            offsets.append(offset)
+            for doc in docs:
+                data = doc.save_mem(fmt=fmt)
+                if isinstance(data, str):
+                    data = data.encode("utf-8")
+                outfp.write(data)
+                offset += len(data)
+                offsets.append(offset)
+            # align the offsets table
+            padding = (8 - offset % 8) % 8
+            outfp.write(b"\0" * padding)
+            offsets.tofile(outfp)
+            outfp.seek(0)
+            outfp.write(cls.HEADER.pack(cls.MAGIC, len(offsets) - 1, offset + padding, fmt.encode("ascii")))
+        return cls(path)
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Open an existing corpus file for reading.
+
+        Args:
+            path: the path of a file created with `MmapFileCorpus.create`
+        """
+        super().__init__()
+        self.path = str(path)
+        self._mm = None
+        self._offsets = None
+        with open(self.path, "rb") as infp:
+            magic, self.size, self._offsets_pos, fmt = self.HEADER.unpack(infp.read(self.HEADER.size))
+        if magic != self.MAGIC:
+            raise Exception(f"Not a MmapFileCorpus file: {self.path}")
+        self.fmt = fmt.rstrip(b"\0").decode("ascii")
+
+    def _open(self):
+        with open(self.path, "rb") as infp:
+            self._mm = mmap.mmap(infp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = memoryview(self._mm)[self._offsets_pos:self._offsets_pos + 8 * (self.size + 1)].cast("Q")
+
+    def close(self):
+        """
+        Close the memory mapped file, it gets re-opened when a document is accessed again.
+        """
+        if self._mm is not None:
+            self._offsets.release()
+            self._mm.close()
+        self._mm = None
+        self._offsets = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_mm"] = None
+        state["_offsets"] = None
+        return state
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, idx):
+        if idx < 0 or idx >= self.size:
+            raise IndexError(f"Index {idx} out of range for corpus of size {self.size}")
+        if self._mm is None:
+            self._open()
+        data = self._mm[self._offsets[idx]:self._offsets[idx + 1]]
+        doc = Document.load_mem(data, fmt=self.fmt)
+        self.setidxfeature(doc, idx)
+        return doc
+
+    def __setitem__(self, idx, doc):
+        raise Exception("MmapFileCorpus is read-only")
+
+    def store(self, doc: Document) -> None:
+        raise Exception("MmapFileCorpus is read-only")
@@ -73,7 +73,8 @@ class PandasDfSource(DocumentSource):
     sets features from arbitrary columns in the row.
     """
 
-    def __init__(self, df, text_col=None, feature_cols=None, data_cols=None, data_feature="__data"):
+    def __init__(self, df, text_col=None, feature_cols=None, data_cols=None, data_feature="__data",
+                 batch_size=10000):
         """
         Creates a PandasDfSource.
 
@@ -84,32 +85,39 @@ class PandasDfSource(DocumentSource):
                feature value from (default: None)
             data_cols: if a list, store those cols in the data feature, if True, store all cols.
             data_feature: the name of the data feature, default is "__data"
+            batch_size: the number of rows for which to convert the column values to Python values at once
         """
         super().__init__()
         assert text_col is not None
         self.text_col = text_col
         self.feature_cols = feature_cols
         self.source = df
-        self.reader = df.iterrows()
         self.data_cols = data_cols
         self.data_feature = data_feature
         self.colnames = list(df.columns)
+        self.batch_size = batch_size
 
     def __iter__(self):
-        for _, row in self.reader:
-            text = row[self.text_col]
-            doc = Document(text)
-            if self.feature_cols:
-                for fname, colname in self.feature_cols.items():
-                    value = row[colname]
-                    doc.features[fname] = value
-            if self.data_cols:
-                if isinstance(self.data_cols, list):
-                    data = {}
-                    for cname in self.data_cols:
-                        data[cname] = row[cname]
-                else:
-                    data = {fname: row[fname] for fname in self.colnames}
-                doc.features[self.data_feature] = data
-            self._n += 1
-            yield doc
+        if self.data_cols:
+            if isinstance(self.data_cols, list):
+                datacols = self.data_cols
+            else:
+                datacols = self.colnames
+        else:
+            datacols = []
+        featcols = self.feature_cols or {}
+        nrows = len(self.source)
+        for start in range(0, nrows, self.batch_size):
+            # access the values column-wise for a batch of rows instead of creating a Series for each row
+            batch = self.source.iloc[start:start+self.batch_size]
+            texts = batch[self.text_col].tolist()
+            featvals = {fname: batch[colname].tolist() for fname, colname in featcols.items()}
+            datavals = {cname: batch[cname].tolist() for cname in datacols}
+            for idx, text in enumerate(texts):
+                doc = Document(text)
+                for fname, vals in featvals.items():
+                    doc.features[fname] = vals[idx]
+                if datacols:
+                    doc.features[self.data_feature] = {cname: vals[idx] for cname, vals in datavals.items()}
+                self._n += 1
+                yield doc
@@ -0,0 +1,206 @@
+"""
+Module that defines DocumentSource/DocumentDestination classes which read documents from and write documents to
+Parquet files, using pyarrow.
+"""
+
+import numbers
+from typing import Optional, Union, List, Dict
+from gatenlp.document import Document
+from gatenlp.corpora.base import DocumentSource, DocumentDestination
+from gatenlp.corpora.base import MultiProcessingAble, EveryNthBase
+
+
+def _colspec2dict(spec: Union[None, List[str], Dict[str, str]]) -> Dict[str, str]:
+    if not spec:
+        return {}
+    if isinstance(spec, dict):
+        return spec
+    return {name: name for name in spec}
+
+
+class ParquetSource(EveryNthBase, DocumentSource, MultiProcessingAble):
+    """
+    A document source which creates a document for each row of a Parquet file, from the text in some column or from
+    the bdocjs serialization of the document in some column, and sets features from arbitrary columns.
+    The rows are read in record batches and only the columns needed are read.
+    """
+
+    def __init__(
+            self,
+            file,
+            text_col: Optional[str] = "text",
+            feature_cols: Union[None, List[str], Dict[str, str]] = None,
+            data_cols: Union[None, bool, List[str]] = None,
+            data_feature: str = "__data",
+            bdocjs_col: Optional[str] = None,
+            batch_size: int = 10000,
+            nparts: int = 1,
+            partnr: int = 0,
+    ):
+        """
+        Create a ParquetSource.
+
+        Args:
+            file: the file path or any file-like object or source supported by `pyarrow.parquet.ParquetFile`
+            text_col: the name of the column that contains the text, ignored if bdocjs_col is specified
+            feature_cols: a dictionary that maps document feature names to column names of where to get the
+                feature value from, or a list of column names to store as features with the same name.
+            data_cols: if a list, store those cols in the data feature, if True, store all cols.
+            data_feature: the name of the data feature, default is "__data"
+            bdocjs_col: if not None, the name of a column which contains the bdocjs serialization of the
+                document, as written by ParquetDestination with bdocjs_col specified.
+            batch_size: the maximum number of rows to read at once (default: 10000)
+            nparts: the number of parts to split the file into for processing in parallel (default: 1), each
+                part reads a share of the row groups of the file.
+            partnr: the part to read, 0 <= partnr < nparts
+        """
+        import pyarrow.parquet as pq
+        DocumentSource.__init__(self)
+        if (not isinstance(nparts, numbers.Integral)) or (not isinstance(partnr, numbers.Integral)):
+            raise Exception("nparts and partnr must be integers.")
+        if nparts < 1 or partnr < 0 or partnr >= nparts:
+            raise Exception("nparts must be >= 1 and partnr must be >= 0 and < nparts")
+        EveryNthBase.__init__(self, nparts=nparts, partnr=partnr)
+        if text_col is None and bdocjs_col is None:
+            raise Exception("Either text_col or bdocjs_col must be specified")
+        self.file = file
+        self.text_col = text_col
+        self.feature_cols = _colspec2dict(feature_cols)
+        self.data_cols = data_cols
+        self.data_feature = data_feature
+        self.bdocjs_col = bdocjs_col
+        self.batch_size = batch_size
+        self.pqfile = pq.ParquetFile(file)
+        self.colnames = list(self.pqfile.schema_arrow.names)
+
+    def __iter__(self):
+        if self.data_cols is True:
+            datacols = self.colnames
+        elif self.data_cols:
+            datacols = list(self.data_cols)
+        else:
+            datacols = []
+        doccol = self.bdocjs_col if self.bdocjs_col is not None else self.text_col
+        columns = []
+        for cname in [doccol] + list(self.feature_cols.values()) + datacols:
+            if cname not in columns:
+                columns.append(cname)
+        ngroups = self.pqfile.num_row_groups
+        row_groups = list(range((self.partnr * ngroups) // self.nparts, ((self.partnr + 1) * ngroups) // self.nparts))
+        if not row_groups:
+            return
+        for batch in self.pqfile.iter_batches(batch_size=self.batch_size, row_groups=row_groups, columns=columns):
+            values = {cname: batch.column(cname).to_pylist() for cname in columns}
+            for idx, docval in enumerate(values[doccol]):
+                if self.bdocjs_col is not None:
+                    doc = Document.load_mem(docval, fmt="json")
+                else:
+                    doc = Document(docval if docval is not None else "")
+                for fname, cname in self.feature_cols.items():
+                    doc.features[fname] = values[cname][idx]
+                if datacols:
+                    doc.features[self.data_feature] = {cname: values[cname][idx] for cname in datacols}
+                self._n += 1
+                yield doc
+
+
+class ParquetDestination(DocumentDestination):
+    """
+    A document destination which writes a row to a Parquet file for each document, with a column for the text,
+    columns for selected document features and optionally a column with the bdocjs serialization of the
+    whole document including all annotations. The rows are written in batches, each batch becomes a row
+    group in the Parquet file.
+    """
+
+    def __init__(
+            self,
+            file,
+            text_col: Optional[str] = "text",
+            feature_cols: Union[None, List[str], Dict[str, str]] = None,
+            bdocjs_col: Optional[str] = None,
+            batch_size: int = 10000,
+            schema=None,
+            **kwargs,
+    ):
+        """
+        Create a ParquetDestination.
+
+        Args:
+            file: the file path or file-like object to write to. If it exists, it gets overwritten without warning.
+            text_col: the name of the column for the document text, if None, the text is not written as a
+                separate column.
+            feature_cols: a dictionary that maps document feature names to column names, or a list of feature
+                names to write as columns with the same name. Features missing from a document are written as null
+                values.
+            bdocjs_col: if not None, the name of a column which receives the bdocjs serialization of the document.
+            batch_size: the number of rows to write at once (default: 10000)
+            schema: a pyarrow schema to use for the file, if None, inferred from the first batch of documents, in
+                which case the first batch must contain at least one non-null value for each column.
+            **kwargs: passed on to `pyarrow.parquet.ParquetWriter`
+        """
+        super().__init__()
+        if text_col is None and bdocjs_col is None:
+            raise Exception("At least one of text_col and bdocjs_col must be specified")
+        self.file = file
+        self.text_col = text_col
+        self.feature_cols = _colspec2dict(feature_cols)
+        self.bdocjs_col = bdocjs_col
+        self.batch_size = batch_size
+        self.schema = schema
+        self.kwargs = kwargs
+        self._writer = None
+        self._closed = False
+        self._columns = []
+        if text_col is not None:
+            self._columns.append(text_col)
+        self._columns.extend(self.feature_cols.values())
+        if bdocjs_col is not None:
+            self._columns.append(bdocjs_col)
+        self._batch = {cname: [] for cname in self._columns}
+        self._nbatch = 0
+
+    def append(self, doc):
+        """
+        Append a document to the destination.
+
+        Args:
+            doc: the document, if None, no action is performed.
+        """
+        if doc is None:
+            return
+        assert isinstance(doc, Document)
+        if self.text_col is not None:
+            self._batch[self.text_col].append(doc.text)
+        for fname, cname in self.feature_cols.items():
+            self._batch[cname].append(doc.features.get(fname))
+        if self.bdocjs_col is not None:
+            self._batch[self.bdocjs_col].append(doc.save_mem(fmt="json"))
+        self._nbatch += 1
+        self._n += 1
+        if self._nbatch >= self.batch_size:
+            self._write_batch()
+
+    def _write_batch(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self._nbatch == 0 and self._writer is not None:
+            return
+        if self._writer is None:
+            if self.schema is None:
+                table = pa.Table.from_pydict(self._batch)
+                self.schema = table.schema
+            else:
+                table = pa.Table.from_pydict(self._batch, schema=self.schema)
+            self._writer = pq.ParquetWriter(self.file, self.schema, **self.kwargs)
+        else:
+            table = pa.Table.from_pydict(self._batch, schema=self.schema)
+        self._writer.write_table(table)
+        self._batch = {cname: [] for cname in self._columns}
+        self._nbatch = 0
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._write_batch()
+        self._writer.close()
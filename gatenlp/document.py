@@ -39,6 +39,16 @@ logging.basicConfig()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# feature values of these types are immutable and can get shared between a document and its clone
+_IMMUTABLE_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+def _clone_features(fdict):
+    """
+    Return a copy of the feature dictionary where all mutable values are deep-copied.
+    """
+    return {k: v if isinstance(v, _IMMUTABLE_TYPES) else lib_copy.deepcopy(v) for k, v in fdict.items()}
+
 
 class Document:
     """
@@ -187,99 +197,156 @@ class Document:
             changes = [changes]
         elif isinstance(changes, ChangeLog):
             changes = changes.changes
+        # the annotation sets by name, so we only need to look up each set once
+        annsets = {}
+
+        def get_annset(sname):
+            anns = annsets.get(sname)
+            if anns is None:
+                anns = annsets[sname] = self.annset(sname)
+            return anns
+
+        # annotations to add for consecutive annotation:add changes for the same set, as tuples
+        # (start, end, type, features, annid) for AnnotationSet.add_many: the indices only get updated once
+        # all annotations of the batch have been added.
+        batch = []
+        batchset = None
+        batchids = set()
         for change in changes:
             cmd = change.get("command")
-            fname = change.get("feature")
-            fvalue = change.get("value")
-            features = change.get("features")
-            sname = change.get("set")
-            annid = change.get("id")
             if cmd is None:
                 raise Exception("Change without field 'command'")
-            if cmd == ACTION_ADD_ANNSET:
-                assert sname is not None
-                self.annset(sname)
-            elif cmd == ACTION_ADD_ANN:
-                assert sname is not None
-                assert annid is not None
-                anns = self.annset(sname)
-                ann = anns.get(annid)
-                start = change.get("start")
-                end = change.get("end")
-                anntype = change.get("type")
-
-                if ann is None:
-                    anns.add(start, end, anntype, annid=annid, features=features)
-                else:
-                    if handle_existing_anns == ADDANN_IGNORE:
-                        pass
-                    elif handle_existing_anns == ADDANN_ADD_WITH_NEW_ID:
-                        anns.add(start, end, anntype)
-                    elif handle_existing_anns == ADDANN_REPLACE_ANNOTATION:
-                        anns.remove(annid)
-                        anns.add(start, end, anntype, annid)
-                    elif handle_existing_anns == ADDANN_UPDATE_FEATURES:
-                        ann.features.update(features)
-                    elif handle_existing_anns == ADDANN_REPLACE_FEATURES:
-                        ann.features.clear()
-                        ann.features.update(features)
-                    elif handle_existing_anns == ADDANN_ADD_NEW_FEATURES:
-                        fns = ann.features.names()
-                        for f in features.keys():
-                            if f not in fns:
-                                ann.features[f] = features[f]
-                    elif handle_existing_anns == ADDANN_IGNORE:
-                        pass
-
-            elif cmd == ACTION_CLEAR_ANNS:
-                assert sname is not None
-                anns = self.annset(sname)
-                anns.clear()
-            elif cmd == ACTION_CLEAR_ANN_FEATURES:
-                assert sname is not None
-                assert annid is not None
-                anns = self.annset(sname)
-                ann = anns.get(annid)
-                if ann is not None:
-                    ann.features.clear()
-                else:
-                    pass  # ignore, could happen with a detached annotation
-            elif cmd == ACTION_CLEAR_DOC_FEATURES:
-                self.features.clear()
-            elif cmd == ACTION_SET_ANN_FEATURE:
-                assert fname is not None
-                assert sname is not None
-                assert annid is not None
-                ann = self.annset(sname).get(annid)
-                ann.features[fname] = fvalue
-            elif cmd == ACTION_DEL_ANN_FEATURE:
-                assert sname is not None
-                assert annid is not None
-                anns = self.annset(sname)
-                ann = anns.get(annid)
-                if ann is not None:
-                    if fname is not None:
-                        ann.features.pop(fname, None)
-                else:
-                    pass  # ignore, could happen with a detached annotation
-            elif cmd == ACTION_DEL_DOC_FEATURE:
-                assert fname is not None
-                self.features.pop(fname, None)
-            elif cmd == ACTION_DEL_ANN:
+            if cmd == ACTION_ADD_ANN:
+                sname = change.get("set")
+                annid = change.get("id")
                 assert sname is not None
                 assert annid is not None
-                anns = self.annset(sname)
-                anns.remove(annid)
-            elif cmd == ACTION_SET_DOC_FEATURE:
-                assert fname is not None
-                self.features[fname] = fvalue
-            elif cmd == ACTION_CLEAR_DOC_FEATURES:
-                self._features.clear()
-            elif cmd == ACTION_DEL_DOC_FEATURE:
-                assert fname is not None
-                del self._features[fname]
-            else:
+                anns = get_annset(sname)
+                if batch and anns is not batchset:
+                    batchset.add_many(batch)
+                    batch = []
+                    batchids = set()
+                if annid not in batchids and anns.get(annid) is None:
+                    batchset = anns
+                    batchids.add(annid)
+                    batch.append((change.get("start"), change.get("end"), change.get("type"),
+                                  change.get("features"), annid))
+                    continue
+                if batch:
+                    batchset.add_many(batch)
+                    batch = []
+                    batchids = set()
+                self._apply_add_existing_ann(change, anns, anns.get(annid), handle_existing_anns)
+                continue
+            if batch:
+                batchset.add_many(batch)
+                batch = []
+                batchids = set()
+            handler = self._CHANGE_HANDLERS.get(cmd)
+            if handler is None:
                 raise Exception("Unknown ChangeLog action: ", cmd)
+            handler(self, change, get_annset)
+        if batch:
+            batchset.add_many(batch)
+
+    @staticmethod
+    def _apply_add_existing_ann(change, anns, ann, handle_existing_anns):
+        """
+        Apply an annotation:add change for an annotation id which already exists in the set.
+        """
+        start = change.get("start")
+        end = change.get("end")
+        anntype = change.get("type")
+        features = change.get("features")
+        if handle_existing_anns == ADDANN_IGNORE:
+            pass
+        elif handle_existing_anns == ADDANN_ADD_WITH_NEW_ID:
+            anns.add(start, end, anntype, features=features)
+        elif handle_existing_anns == ADDANN_REPLACE_ANNOTATION:
+            anns.remove(ann.id)
+            anns.add(start, end, anntype, features=features, annid=ann.id)
+        elif handle_existing_anns == ADDANN_UPDATE_FEATURES:
+            ann.features.update(features)
+        elif handle_existing_anns == ADDANN_REPLACE_FEATURES:
+            ann.features.clear()
+            ann.features.update(features)
+        elif handle_existing_anns == ADDANN_ADD_NEW_FEATURES:
+            fns = ann.features.names()
+            for f in features.keys():
+                if f not in fns:
+                    ann.features[f] = features[f]
+
+    def _apply_add_annset(self, change, get_annset):
+        assert change.get("set") is not None
+        get_annset(change.get("set"))
+
+    def _apply_clear_anns(self, change, get_annset):
+        assert change.get("set") is not None
+        get_annset(change.get("set")).clear()
+
+    def _apply_clear_ann_features(self, change, get_annset):
+        sname = change.get("set")
+        annid = change.get("id")
+        assert sname is not None
+        assert annid is not None
+        ann = get_annset(sname).get(annid)
+        if ann is not None:
+            ann.features.clear()
+        # otherwise ignore, could happen with a detached annotation
+
+    def _apply_set_ann_feature(self, change, get_annset):
+        fname = change.get("feature")
+        sname = change.get("set")
+        annid = change.get("id")
+        assert fname is not None
+        assert sname is not None
+        assert annid is not None
+        get_annset(sname).get(annid).features[fname] = change.get("value")
+
+    def _apply_del_ann_feature(self, change, get_annset):
+        sname = change.get("set")
+        annid = change.get("id")
+        assert sname is not None
+        assert annid is not None
+        ann = get_annset(sname).get(annid)
+        if ann is not None:
+            fname = change.get("feature")
+            if fname is not None:
+                ann.features.pop(fname, None)
+        # otherwise ignore, could happen with a detached annotation
+
+    def _apply_del_ann(self, change, get_annset):
+        sname = change.get("set")
+        annid = change.get("id")
+        assert sname is not None
+        assert annid is not None
+        get_annset(sname).remove(annid)
+
+    def _apply_clear_doc_features(self, change, get_annset):
+        self.features.clear()
+
+    def _apply_set_doc_feature(self, change, get_annset):
+        fname = change.get("feature")
+        assert fname is not None
+        self.features[fname] = change.get("value")
+
+    def _apply_del_doc_feature(self, change, get_annset):
+        fname = change.get("feature")
+        assert fname is not None
+        self.features.pop(fname, None)
+
+    # the methods which apply each kind of change, except annotation:add
+    _CHANGE_HANDLERS = {
+        ACTION_ADD_ANNSET: _apply_add_annset,
+        ACTION_CLEAR_ANNS: _apply_clear_anns,
+        ACTION_CLEAR_ANN_FEATURES: _apply_clear_ann_features,
+        ACTION_CLEAR_DOC_FEATURES: _apply_clear_doc_features,
+        ACTION_SET_ANN_FEATURE: _apply_set_ann_feature,
+        ACTION_DEL_ANN_FEATURE: _apply_del_ann_feature,
+        ACTION_DEL_DOC_FEATURE: _apply_del_doc_feature,
+        ACTION_DEL_ANN: _apply_del_ann,
+        ACTION_SET_DOC_FEATURE: _apply_set_doc_feature,
+    }
 
     @property
     def features(self):
@@ -380,6 +447,8 @@ class Document:
         if command == "doc-feature:set":
             ch["feature"] = feature
             ch["value"] = value
+        elif command == "doc-feature:remove":
+            ch["feature"] = feature
         self._changelog.append(ch)
 
     def __len__(self) -> int:
@@ -801,6 +870,9 @@ class Document:
         feature values of copied features are objects, they are shared between the copies.
         Annotation sets are separate but the features of shared annotations are shared.
 
+        Creating the copy only takes time proportional to the number of annotation sets: the feature map and
+        the annotation sets share their data with the original until they get modified for the first time.
+
         Returns:
             shallow copy of the document
         """
@@ -809,6 +881,7 @@ class Document:
         for name, aset in self._annotation_sets.items():
             doc._annotation_sets[name] = aset.copy()
             doc._annotation_sets[name]._owner_doc = doc
+            doc._annotation_sets[name]._name = name
         doc.offset_type = self.offset_type
         doc._features = self._features.copy()
         return doc
@@ -840,17 +913,18 @@ class Document:
                 if tmpset is not None:
                     doc._annotation_sets[spec] = self._annotation_sets[spec].copy()
                     doc._annotation_sets[spec]._owner_doc = doc
+                    doc._annotation_sets[spec]._name = spec
             else:
                 setname, types = spec
                 if isinstance(types, str):
                     types = [types]
                 tmpset = self._annotation_sets.get(setname)
                 if tmpset is not None:
-                    # annset = AnnotationSet(owner_doc=doc, name=setname)
-                    annset = AnnotationSet._create(owner_doc=doc, name=setname)
-                    anns = self.annset(setname).with_type(types)
-                    for ann in anns:
-                        annset.add_ann(ann)
+                    # share the annotations of the given types with the original set, like for a whole set
+                    annset = tmpset.detach(restrict_to=[ann.id for ann in tmpset.with_type(types)])
+                    annset._is_immutable = False
+                    annset._name = setname
+                    annset._owner_doc = doc
                     doc._annotation_sets[setname] = annset
         return doc
 
@@ -875,6 +949,9 @@ class Document:
         doc.offset_type = self.offset_type
         if annspec is None:
             doc._annotation_sets = lib_copy.deepcopy(self._annotation_sets, memo)
+            for name, annset in doc._annotation_sets.items():
+                annset._owner_doc = doc
+                annset._name = name
         else:
             doc._annotation_sets = dict()
             for spec in annspec:
@@ -883,6 +960,7 @@ class Document:
                     if tmpset is not None:
                         doc._annotation_sets[spec] = lib_copy.deepcopy(tmpset, memo)
                         doc._annotation_sets[spec]._owner_doc = doc
+                        doc._annotation_sets[spec]._name = spec
                 else:
                     setname, types = spec
                     if isinstance(types, str):
@@ -907,7 +985,7 @@ class Document:
         Returns:
             a deep copy of the document.
         """
-        return lib_copy.deepcopy(self, memo=memo)
+        return self.deepcopy(memo=memo)
 
     def _repr_html_(self):
         """
@@ -1075,7 +1153,7 @@ class Document:
         assert affected_strategy in ["delete_all", "adapt", "keepadapt"]
         if isinstance(edits, tuple) and not isinstance(edits[0], Iterable):
             edits = [edits]
-        edits.sort(key=lambda x: x[0])
+        edits = sorted(edits, key=lambda x: x[0])
         self._text = Document._edit_text(self._text, edits)
         for annset in self._annotation_sets.values():
             annset._edit(edits, affected_strategy=affected_strategy)
@@ -1083,11 +1161,29 @@ class Document:
     def clone(self):
         """
         Create a clone of the current document, no data is shared between the clone and the original.
+        The clone does not have a changelog.
 
         Returns:
             A copy of the current document
         """
-        return Document.load_mem(self.save_mem())
+        doc = Document(self._text)
+        doc._features.data = _clone_features(self._features.data)
+        doc.offset_type = self.offset_type
+        doc._name = self._name
+        for name, annset in self._annotation_sets.items():
+            newset = AnnotationSet._create(owner_doc=doc, name=name)
+            anns = {}
+            for annid, ann in annset._annotations.items():
+                newann = Annotation(ann._start, ann._end, ann._type, annid=annid)
+                if ann._features:
+                    newann.features.data = _clone_features(ann._features.data)
+                newann._owner_set = newset
+                anns[annid] = newann
+            newset._annotations = anns
+            newset._annset.update(anns.values())
+            newset._next_annid = annset._next_annid
+            doc._annotation_sets[name] = newset
+        return doc
 
 # class MultiDocument(Document):
 #     """
@@ -29,7 +29,12 @@ class Features(UserDict):
 
     Like a dict, a Features object compares equal to another Features object if they have the
     same keys and values and is not hashable.
+
+    A shallow copy shares the wrapped dictionary with the original (copy-on-write): the dictionary only gets
+    copied when the copy or the original is modified for the first time.
     """
+    # True if the wrapped dictionary may be shared with a copy and must be copied before modifying it
+    _shared = False
 
     def __init__(self, *args, _change_logger=None, _deepcopy=False, **kwargs):
         """
@@ -47,6 +52,17 @@ class Features(UserDict):
             **kwargs: any number of additional keyword arguments which are used to set features.
         """
         self._logger = _change_logger
+        self._shared = False
+        if not kwargs and not _deepcopy and len(args) == 1 and type(args[0]) is dict:
+            # fast path for the most common case, avoid calling __setitem__ for each feature
+            posarg = args[0]
+            for fname in posarg:
+                if not isinstance(fname, str):
+                    raise Exception(
+                        "A feature name must be a string, not {}".format(type(fname))
+                    )
+            self.data = posarg.copy()
+            return
         if _deepcopy:
             kws = lib_copy.deepcopy(kwargs)
         else:
@@ -78,6 +94,8 @@ class Features(UserDict):
         """
         if self._logger:
             self._logger("feature:remove", feature=featurename)
+        if self._shared:
+            self._unshare()
         del self.data[featurename]
 
     def __repr__(self):
@@ -100,6 +118,8 @@ class Features(UserDict):
             )
         if self._logger:
             self._logger("feature:set", feature=featurename, value=featurevalue)
+        if self._shared:
+            self._unshare()
         self.data[featurename] = featurevalue
 
     def clear(self):
@@ -108,7 +128,23 @@ class Features(UserDict):
         """
         if self._logger:
             self._logger("features:clear")
-        self.data.clear()
+        if self._shared:
+            self.data = {}
+            self._shared = False
+        else:
+            self.data.clear()
+
+    def __ior__(self, other):
+        # go through __setitem__ so that the changes get logged and a shared dictionary gets copied
+        self.update(other)
+        return self
+
+    def _unshare(self):
+        """
+        Make sure the wrapped dictionary is not shared with any copy, so it can get modified.
+        """
+        self.data = self.data.copy()
+        self._shared = False
 
     def copy(self, deep=False):
         """
@@ -116,7 +152,8 @@ class Features(UserDict):
         instance of Features which is detached from the owner and which does not log
         the changes. However, if the copy is shallow and feature values are references
         to mutable objects, they can still get modified in the original set (without
-        any logging!).
+        any logging!). A shallow copy is cheap: the feature dictionary only gets copied once either the
+        copy or the original gets modified.
 
         Args:
           deep: if True return a deep instead of a shallow copy of the features. (Default value = False)
@@ -124,11 +161,15 @@ class Features(UserDict):
         Returns:
           a dictionary with the features
         """
-        ret = Features()
+        # avoid the overhead of __init__, this gets used for every annotation added to a compact changelog
+        ret = Features.__new__(Features)
         if deep:
-            ret.data = deep(self.data)
+            ret.data = lib_copy.deepcopy(self.data)
+            ret._shared = False
         else:
-            ret.data = self.data.copy()
+            ret.data = self.data
+            ret._shared = True
+            self._shared = True
         ret._logger = None
         return ret
 
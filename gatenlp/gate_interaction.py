@@ -12,7 +12,7 @@ import traceback
 from argparse import ArgumentParser
 import inspect
 import logging
-from gatenlp.changelog import ChangeLog
+from gatenlp.changelog import CompactChangeLog
 from gatenlp.document import Document
 from gatenlp.offsetmapper import OFFSET_TYPE_JAVA, OFFSET_TYPE_PYTHON
 from gatenlp.utils import init_logger
@@ -360,7 +360,7 @@ def interact(args=None, annotator=None):
                 if cmd == "execute":
                     doc = Document.from_dict(request.get("data"))
                     om = doc.to_offset_type(OFFSET_TYPE_PYTHON)
-                    doc.changelog = ChangeLog()
+                    doc.changelog = CompactChangeLog()
                     pr.execute(doc)
                     # NOTE: for now we just discard what the method returns and always return
                     # the changelog instead!
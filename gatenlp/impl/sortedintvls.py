@@ -55,6 +55,17 @@ class SortedIntvls:
         self._key_end = _KeyEndAnnid()
         self._by_end = SortedKeyList(key=self._key_end)
 
+    def copy(self):
+        """
+        Returns a copy of the interval index which can be modified independently of the original.
+        """
+        ret = SortedIntvls.__new__(SortedIntvls)
+        ret._key_start = self._key_start
+        ret._by_start = self._by_start.copy()
+        ret._key_end = self._key_end
+        ret._by_end = self._by_end.copy()
+        return ret
+
     def add(self, start, end, data):
         """
         Adds an interval.
@@ -69,6 +80,26 @@ class SortedIntvls:
         self._by_start.update(tupleiterable)
         self._by_end.update(tupleiterable)
 
+    def replace(self, oldtuples, newtuples):
+        """
+        Replaces the intervals in oldtuples, which must all exist, by the intervals in newtuples.
+        If many intervals get replaced, the sorted lists get rebuilt in one go, which is much faster than
+        removing and adding each interval.
+        """
+        if len(oldtuples) * 4 > len(self._by_start):
+            oldset = set(oldtuples)
+            tuples = [intvl for intvl in self._by_start if intvl not in oldset]
+            tuples.extend(newtuples)
+            self._by_start.clear()
+            self._by_start.update(tuples)
+            self._by_end.clear()
+            self._by_end.update(tuples)
+        else:
+            for intvl in oldtuples:
+                self._by_start.remove(intvl)
+                self._by_end.remove(intvl)
+            self.update(newtuples)
+
     def remove(self, start, end, data):
         """
         Removes an interval, exception if the interval does not exist.
@@ -5,6 +5,7 @@ Support for using spacy: convert from spacy to gatenlp documents and annotations
 from gatenlp import Document, AnnotationSet
 from gatenlp.processing.annotator import Annotator
 import spacy
+from spacy import attrs as spacy_attrs
 
 if int(spacy.__version__.split(".")[0]) < 3:
     SPACY_IS_PARSED = lambda doc: doc.is_parsed   # noqa: E731
@@ -38,6 +39,9 @@ class AnnSpacy(Annotator):
         add_nounchunks=True,
         add_deps=True,
         ent_prefix=None,
+        containing_anns_desc=None,
+        batchsize=1000,
+        n_process=1,
         **kwargs
     ):
         """
@@ -56,6 +60,11 @@ class AnnSpacy(Annotator):
             add_nounchunks: if nounchunks should be added
             add_deps: if dependencies should be added
             ent_prefix: the prefix to add to all entity annotation types
+            containing_anns_desc: if not None, a tuple (setname, type) of the annotations for which to process the
+                covered text with spacy instead of the whole document text.
+            batchsize: for the pipe() method, the number of texts (documents or containing annotations) to pass to
+                spacy in one batch (default: 1000)
+            n_process: for the pipe() method, the number of processes to use with spacy (default: 1)
             kwargs: if no pipeline is specified, pass these arguments to the spacy.load method,
                 use name= to specify the model name
         """
@@ -71,13 +80,22 @@ class AnnSpacy(Annotator):
         self.add_sentences = add_sentences
         self.add_nounchunks = add_nounchunks
         self.add_deps = add_deps
+        self.containing_anns_desc = containing_anns_desc
+        self.batchsize = batchsize
+        self.n_process = n_process
         if pipeline:
             self.pipeline = pipeline
         else:
             self.pipeline = spacy.load("en_core_web_sm")
 
-    def __call__(self, doc, **kwargs):
-        spacy_doc = self.pipeline(doc.text)
+    def _spans(self, doc):
+        """Return the list of (start, end) offset ranges of the document to process with spacy"""
+        if self.containing_anns_desc is None:
+            return [(0, len(doc.text))]
+        setname, anntype = self.containing_anns_desc
+        return [(ann.start, ann.end) for ann in doc.annset(setname).with_type(anntype)]
+
+    def _convert(self, spacy_doc, doc, start_offset=0):
         spacy2gatenlp(
             spacy_doc,
             doc,
@@ -92,9 +110,59 @@ class AnnSpacy(Annotator):
             add_sents=self.add_sentences,
             add_dep=self.add_deps,
             ent_prefix=self.ent_prefix,
+            start_offset=start_offset,
         )
+
+    def __call__(self, doc, **kwargs):
+        for start, end in self._spans(doc):
+            self._convert(self.pipeline(doc.text[start:end]), doc, start_offset=start)
         return doc
 
+    def _pipe_texts(self, documents, contexts):
+        # Generate tuples (text, key) and store the context for the key as a tuple (doc, start offset, islast).
+        # The start offset is None for a dummy text for a document which has nothing to process.
+        # Only the integer key gets passed to spacy, because with several processes, spacy passes the
+        # contexts to the processes and back, which would give us copies of the documents.
+        key = 0
+        for doc in documents:
+            if doc is None:
+                continue
+            spans = self._spans(doc)
+            if len(spans) == 0:
+                contexts[key] = (doc, None, True)
+                yield "", key
+                key += 1
+                continue
+            for idx, (start, end) in enumerate(spans):
+                contexts[key] = (doc, start, idx == len(spans) - 1)
+                yield doc.text[start:end], key
+                key += 1
+
+    def pipe(self, documents, **kwargs):
+        """
+        Process an iterable of documents, passing the document texts (or the texts covered by the containing
+        annotations) in batches to the spacy `nlp.pipe` method. The documents are yielded in the original order.
+
+        Args:
+            documents: an iterable over documents
+            **kwargs: ignored
+
+        Yields:
+            processed documents
+        """
+        contexts = {}
+        for spacy_doc, key in self.pipeline.pipe(
+            self._pipe_texts(documents, contexts),
+            as_tuples=True,
+            batch_size=self.batchsize,
+            n_process=self.n_process,
+        ):
+            doc, start, islast = contexts.pop(key)
+            if start is not None:
+                self._convert(spacy_doc, doc, start_offset=start)
+            if islast:
+                yield doc
+
 
 def apply_spacy(nlp, gatenlpdoc, setname="", containing_anns=None,
                 component_cfg=None, retrieve_spans=None):
@@ -137,6 +205,112 @@ def apply_spacy(nlp, gatenlpdoc, setname="", containing_anns=None,
         return spacy2gatenlp(spacydoc, gatenlpdoc=gatenlpdoc, setname=setname)
 
 
+# The token features which can get added by spacy2gatenlp, organized in groups. For each feature name, the
+# spacy attribute id and how to convert the attribute value is given: "bool", "int", "str" (look up the
+# hash in the string store) or "sent" (1, -1, 0 to True, False, None). The features in group "lexeme"
+# are not available as token attributes in a spacy array and are retrieved from the vocabulary lexemes.
+SPACY_TOKEN_FEATURE_GROUPS = {
+    "flags": {
+        "is_alpha": (spacy_attrs.IS_ALPHA, "bool"),
+        "is_bracket": (spacy_attrs.IS_BRACKET, "bool"),
+        "is_currency": (spacy_attrs.IS_CURRENCY, "bool"),
+        "is_digit": (spacy_attrs.IS_DIGIT, "bool"),
+        "is_left_punct": (spacy_attrs.IS_LEFT_PUNCT, "bool"),
+        "is_lower": (spacy_attrs.IS_LOWER, "bool"),
+        "is_punct": (spacy_attrs.IS_PUNCT, "bool"),
+        "is_quote": (spacy_attrs.IS_QUOTE, "bool"),
+        "is_right_punct": (spacy_attrs.IS_RIGHT_PUNCT, "bool"),
+        "is_sent_start": (spacy_attrs.SENT_START, "sent"),
+        "is_space": (spacy_attrs.IS_SPACE, "bool"),
+        "is_stop": (spacy_attrs.IS_STOP, "bool"),
+        "is_title": (spacy_attrs.IS_TITLE, "bool"),
+        "is_upper": (spacy_attrs.IS_UPPER, "bool"),
+        "like_email": (spacy_attrs.LIKE_EMAIL, "bool"),
+        "like_num": (spacy_attrs.LIKE_NUM, "bool"),
+        "like_url": (spacy_attrs.LIKE_URL, "bool"),
+    },
+    "lexical": {
+        "lang": (spacy_attrs.LANG, "str"),
+        "lemma": (spacy_attrs.LEMMA, "str"),
+        "orth": (spacy_attrs.ORTH, "int"),
+        "prefix": (spacy_attrs.PREFIX, "str"),
+        "shape": (spacy_attrs.SHAPE, "str"),
+        "suffix": (spacy_attrs.SUFFIX, "str"),
+    },
+    "tags": {
+        "pos": (spacy_attrs.POS, "str"),
+        "tag": (spacy_attrs.TAG, "str"),
+    },
+    "lexeme": {
+        "is_oov": None,
+        "prob": None,
+        "rank": None,
+        "sentiment": None,
+    },
+}
+
+
+def _spacy_token_features(spacydoc, groups, add_ents, add_dep):
+    """
+    Create the list of feature dictionaries for all tokens of the spacy document, retrieving the
+    token attributes in bulk as a numpy array.
+    """
+    names = []
+    attrs = []
+    kinds = []
+    for group in groups:
+        for fname, spec in SPACY_TOKEN_FEATURE_GROUPS[group].items():
+            if spec is not None:
+                names.append(fname)
+                attrs.append(spec[0])
+                kinds.append(spec[1])
+    if add_ents:
+        names.append("ent_type")
+        attrs.append(spacy_attrs.ENT_TYPE)
+        kinds.append("str")
+    if add_dep:
+        names.append("dep")
+        attrs.append(spacy_attrs.DEP)
+        kinds.append("str")
+    columns = [list(range(len(spacydoc)))]
+    names.insert(0, "_i")
+    if attrs:
+        arr = spacydoc.to_array(attrs).reshape(len(spacydoc), len(attrs))
+        strings = spacydoc.vocab.strings
+        str4hash = {}
+        for idx, kind in enumerate(kinds):
+            col = arr[:, idx]
+            if kind == "bool":
+                columns.append((col != 0).tolist())
+            elif kind == "int":
+                columns.append(col.tolist())
+            elif kind == "sent":
+                columns.append([None if v == 0 else v > 0 for v in col.view("int64").tolist()])
+            else:
+                vals = []
+                for hashval in col.tolist():
+                    val = str4hash.get(hashval)
+                    if val is None:
+                        val = strings[hashval]
+                        str4hash[hashval] = val
+                    vals.append(val)
+                columns.append(vals)
+    if "lexeme" in groups:
+        vocab = spacydoc.vocab
+        lexinfo4orth = {}
+        lexinfos = []
+        for orth in spacydoc.to_array(spacy_attrs.ORTH).tolist():
+            lexinfo = lexinfo4orth.get(orth)
+            if lexinfo is None:
+                lex = vocab[orth]
+                lexinfo = (lex.is_oov, lex.prob, lex.rank, lex.sentiment)
+                lexinfo4orth[orth] = lexinfo
+            lexinfos.append(lexinfo)
+        names.extend(["is_oov", "prob", "rank", "sentiment"])
+        columns.extend(zip(*lexinfos) if lexinfos else [[], [], [], []])
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
 def spacy2gatenlp(
     spacydoc,
     gatenlpdoc=None,
@@ -153,7 +327,8 @@ def spacy2gatenlp(
     add_dep=True,
     ent_prefix=None,
     start_offset=0,
-    retrieve_spans=None
+    retrieve_spans=None,
+    token_features=None,
 ):
     """Convert a spacy document to a gatenlp document. If a gatenlp document is already
     provided, add the annotations from the spacy document to it. In this case the
@@ -181,6 +356,10 @@ def spacy2gatenlp(
             This allows a part of a document with spacy and then include the annotations back to the document,
             in the corresponding possition
         retrieve_spans: if not None, a list of additional Spacy span types to retrieve
+        token_features: if not None, a list of the names of the token feature groups to add, see
+            SPACY_TOKEN_FEATURE_GROUPS: "flags", "lexical", "tags", "lexeme". If None, add all groups.
+            The "_i" feature and the features from entity and dependency information are always added
+            if enabled.
 
     Returns:
       the new or modified Document
@@ -191,84 +370,65 @@ def spacy2gatenlp(
 
     if retrieve_spans is None:
         retrieve_spans = []
+    if token_features is None:
+        token_features = list(SPACY_TOKEN_FEATURE_GROUPS.keys())
+    for group in token_features:
+        if group not in SPACY_TOKEN_FEATURE_GROUPS:
+            raise Exception(f"Not a known token feature group: {group}")
     if gatenlpdoc is None:
         retdoc = Document(spacydoc.text)
         start_offset = 0
     else:
         retdoc = gatenlpdoc
-    toki2annid = {}
     annset = retdoc.annset(setname)
-    for tok in spacydoc:
-        from_off = tok.idx
-        to_off = tok.idx + len(tok)
-        # is_space = tok.is_space
-        fm = {
-            "_i": tok.i,
-            "is_alpha": tok.is_alpha,
-            "is_bracket": tok.is_bracket,
-            "is_currency": tok.is_currency,
-            "is_digit": tok.is_digit,
-            "is_left_punct": tok.is_left_punct,
-            "is_lower": tok.is_lower,
-            "is_oov": tok.is_oov,
-            "is_punct": tok.is_punct,
-            "is_quote": tok.is_quote,
-            "is_right_punct": tok.is_right_punct,
-            "is_sent_start": tok.is_sent_start,
-            "is_space": tok.is_space,
-            "is_stop": tok.is_stop,
-            "is_title": tok.is_title,
-            "is_upper": tok.is_upper,
-            "lang": tok.lang_,
-            "lemma": tok.lemma_,
-            "like_email": tok.like_email,
-            "like_num": tok.like_num,
-            "like_url": tok.like_url,
-            "orth": tok.orth,
-            "pos": tok.pos_,
-            "prefix": tok.prefix_,
-            "prob": tok.prob,
-            "rank": tok.rank,
-            "sentiment": tok.sentiment,
-            "tag": tok.tag_,
-            "shape": tok.shape_,
-            "suffix": tok.suffix_,
-        }
-        if SPACY_IS_NERED(spacydoc) and add_ents:
-            fm["ent_type"] = tok.ent_type_
-        if SPACY_IS_PARSED(spacydoc) and add_dep:
-            fm["dep"] = tok.dep_
-        if tok.is_space:
-            anntype = space_token_type
-        else:
-            anntype = token_type
-        annid = annset.add(from_off + start_offset, to_off + start_offset, anntype, fm).id
-        toki2annid[tok.i] = annid
-        # print("Added annotation with id: {} for token {}".format(annid, tok.i))
-        ws = tok.whitespace_
-        if len(ws) > 0:
-            annset.add(to_off + start_offset, to_off + len(ws) + start_offset, space_token_type, {"is_space": True})
-    # if we have a dependency parse, now also add the parse edges
-    if SPACY_IS_PARSED(spacydoc) and add_tokens and add_dep:
-        for tok in spacydoc:
-            ann = annset.get(toki2annid[tok.i])
-            ann.features["head"] = toki2annid[tok.head.i]
-            ann.features["left_edge"] = toki2annid[tok.left_edge.i]
-            ann.features["right_edge"] = toki2annid[tok.right_edge.i]
+    is_nered = SPACY_IS_NERED(spacydoc) and add_ents
+    is_parsed = SPACY_IS_PARSED(spacydoc) and add_dep
+    ntoks = len(spacydoc)
+    if ntoks > 0:
+        fms = _spacy_token_features(spacydoc, token_features, is_nered, is_parsed)
+        offs = spacydoc.to_array([spacy_attrs.IDX, spacy_attrs.LENGTH, spacy_attrs.SPACY, spacy_attrs.IS_SPACE])
+        offs = offs.reshape(ntoks, 4).tolist()
+        # the token annotations are interleaved with the annotations for trailing whitespace and
+        # get consecutive annotation ids, so we know the annotation id of each token in advance
+        annsdata = []
+        toki2annid = []
+        next_annid = annset._next_annid
+        for (idx, length, hasspace, is_space), fm in zip(offs, fms):
+            from_off = idx + start_offset
+            to_off = from_off + length
+            toki2annid.append(next_annid + len(annsdata))
+            annsdata.append((from_off, to_off, space_token_type if is_space else token_type, fm))
+            if hasspace:
+                annsdata.append((to_off, to_off + 1, space_token_type, {"is_space": True}))
+        # if we have a dependency parse, now also add the parse edges
+        if is_parsed and add_tokens:
+            heads = spacydoc.to_array(spacy_attrs.HEAD).view("int64").tolist()
+            for i, (fm, tok) in enumerate(zip(fms, spacydoc)):
+                fm["head"] = toki2annid[i + heads[i]]
+                fm["left_edge"] = toki2annid[tok.left_edge.i]
+                fm["right_edge"] = toki2annid[tok.right_edge.i]
+        annset.add_many(annsdata)
     if spacydoc.ents and add_ents:
+        annsdata = []
         for ent in spacydoc.ents:
             if ent_prefix:
                 entname = ent_prefix + ent.label_
             else:
                 entname = ent.label_
-            annset.add(ent.start_char + start_offset, ent.end_char + start_offset, entname, {"lemma": ent.lemma_})
+            annsdata.append((ent.start_char + start_offset, ent.end_char + start_offset, entname, {"lemma": ent.lemma_}))
+        annset.add_many(annsdata)
     if spacydoc.sents and add_sents:
-        for sent in spacydoc.sents:
-            annset.add(sent.start_char + start_offset, sent.end_char + start_offset, sentence_type, {})
+        annset.add_many(
+            (sent.start_char + start_offset, sent.end_char + start_offset, sentence_type) for sent in spacydoc.sents
+        )
     if spacydoc.noun_chunks and add_nounchunks:
-        for chunk in spacydoc.noun_chunks:
-            annset.add(chunk.start_char + start_offset, chunk.end_char + start_offset, nounchunk_type, {})
+        annset.add_many(
+            (chunk.start_char + start_offset, chunk.end_char + start_offset, nounchunk_type)
+            for chunk in spacydoc.noun_chunks
+        )
     for span_type in retrieve_spans:
-        for span in spacydoc.spans[span_type]:
-            annset.add(span.start_char + start_offset, span.end_char + start_offset, span_type, {})
+        annset.add_many(
+            (span.start_char + start_offset, span.end_char + start_offset, span_type)
+            for span in spacydoc.spans[span_type]
+        )
     return retdoc
@@ -48,6 +48,8 @@ class AnnStanza(Annotator):
         add_entities=True,
         ent_prefix=None,
         batchsize=1000,
+        batch_chars=1000000,
+        chunk_chars=None,
         **kwargs,
     ):
         """
@@ -67,6 +69,12 @@ class AnnStanza(Annotator):
             batchsize: for the pipe() method, batches from the input generator are created to speed up processing
                 with Stanza, this defines the number of documents per batch (default: 1000). Note that Stanza
                 internally re-batches those batches again, depending on the size of the documents in the sequence.
+            batch_chars: for the pipe() method, the maximum total number of characters of the texts in a batch
+                (default: 1000000). A batch always contains at least one text.
+            chunk_chars: if not None, documents longer than this number of characters get split into chunks
+                of at most that size, preferably at paragraph or line boundaries, which get processed as separate
+                texts, so that batches from long documents stay small. Note that Stanza cannot detect a
+                sentence which crosses a chunk boundary. If None (default), each document is one text.
             kwargs: if no preconfigured pipeline is specified, pass these arguments to
                 the stanza.Pipeline() constructor see https://stanfordnlp.github.io/stanza/pipeline.html#pipeline
                 use lang= to specify the default pipeline for a language.
@@ -78,6 +86,8 @@ class AnnStanza(Annotator):
         self.ent_prefix = ent_prefix
         self.mwt_type = mwt_type
         self.batchsize = batchsize
+        self.batch_chars = batch_chars
+        self.chunk_chars = chunk_chars
         self.space_token_type = space_token_type
         [
             kwargs.pop(a, None)
@@ -89,8 +99,7 @@ class AnnStanza(Annotator):
         else:
             self.pipeline = stanza.Pipeline(**kwargs)
 
-    def __call__(self, doc, **kwargs):
-        stanza_doc = self.pipeline(doc.text)
+    def _convert(self, stanza_doc, doc, start_offset=0):
         stanza2gatenlp(
             stanza_doc,
             doc,
@@ -101,43 +110,116 @@ class AnnStanza(Annotator):
             sentence_type=self.sentence_type,
             add_entities=self.add_entities,
             ent_prefix=self.ent_prefix,
+            start_offset=start_offset,
         )
+
+    def __call__(self, doc, **kwargs):
+        if self.chunk_chars is not None and len(doc.text) > self.chunk_chars:
+            return next(self.pipe([doc]))
+        stanza_doc = self.pipeline(doc.text)
+        self._convert(stanza_doc, doc)
         return doc
 
-    def _pipe_batch(self, gatenlp_docs, stanza_docs):
-        stanza_out = self.pipeline(stanza_docs)
-        assert len(stanza_out) == len(gatenlp_docs)
-        for doc_stanza, doc in zip(stanza_out, gatenlp_docs):
-            try:
-                stanza2gatenlp(doc_stanza, doc,
-                               setname=self.outsetname,
-                               token_type=self.token_type,
-                               mwt_type=self.mwt_type,
-                               space_token_type=self.space_token_type,
-                               sentence_type=self.sentence_type,
-                               add_entities=self.add_entities,
-                               ent_prefix=self.ent_prefix)
-                yield doc
-            except:
-                # TODO: this should be configurable: should we terminate, log, silently return None, silently
-                #   return the unprocessed document?
-                yield None
+    def _pipe_batch(self, chunks, failed):
+        # chunks is a list of (doc, start, end, islast) tuples, returns a list with the documents which are
+        # finished or None for a document where conversion failed, in order. failed is the set of ids of documents
+        # for which converting a chunk failed, which is needed if a document spans more than one batch.
+        stanza_out = self.pipeline([StanzaDocument([], text=doc.text[start:end]) for doc, start, end, _ in chunks])
+        assert len(stanza_out) == len(chunks)
+        finished = []
+        for doc_stanza, (doc, start, end, islast) in zip(stanza_out, chunks):
+            if id(doc) not in failed:
+                try:
+                    self._convert(doc_stanza, doc, start_offset=start)
+                except Exception as ex:  # pylint: disable=W0703
+                    logger.warning(f"Converting the Stanza result failed for document {doc.name}, yielding None: {ex}")
+                    failed.add(id(doc))
+            if islast:
+                if id(doc) in failed:
+                    failed.remove(id(doc))
+                    finished.append(None)
+                else:
+                    finished.append(doc)
+        return finished
 
-    def pipe(self, documents, **kwargs):
-        docs = []
-        stanza_in = []
-        idx = 0
+    def _chunks(self, documents):
+        # generate tuples (doc, start, end, islast) for the texts to process
         for doc in documents:
-            docs.append(doc)
-            stanza_in.append(StanzaDocument([], text=doc.text))
-            idx += 1
-            if idx >= self.batchsize:
-                yield from self._pipe_batch(docs, stanza_in)
-                idx = 0
-                docs = []
-                stanza_in = []
-        if len(docs) > 0:
-            yield from self._pipe_batch(docs, stanza_in)
+            if doc is None:
+                continue
+            text = doc.text
+            if self.chunk_chars is None or len(text) <= self.chunk_chars:
+                yield doc, 0, len(text), True
+            else:
+                spans = text_chunks(text, self.chunk_chars)
+                for idx, (start, end) in enumerate(spans):
+                    yield doc, start, end, idx == len(spans) - 1
+
+    def pipe(self, documents, **kwargs):
+        """
+        Process an iterable of documents, passing batches of texts to the Stanza pipeline. Batches contain at most
+        batchsize texts and, unless a single text is larger, at most batch_chars characters. If chunk_chars is set,
+        long documents get split into several texts, so a batch can contain part of a document, and a document
+        can get processed over several batches. Documents are yielded in the original order, if processing
+        a document fails, None is yielded instead.
+
+        Args:
+            documents: an iterable over documents
+            **kwargs: ignored
+
+        Yields:
+            processed documents or None
+        """
+        batch = []
+        nchars = 0
+        failed = set()
+        for chunk in self._chunks(documents):
+            size = chunk[2] - chunk[1]
+            if batch and (len(batch) >= self.batchsize or nchars + size > self.batch_chars):
+                yield from self._pipe_batch(batch, failed)
+                batch = []
+                nchars = 0
+            batch.append(chunk)
+            nchars += size
+        if len(batch) > 0:
+            yield from self._pipe_batch(batch, failed)
+
+
+def text_chunks(text, maxchars):
+    """
+    Split the text into chunks of at most maxchars characters and return the list of (start, end) offset
+    tuples of the chunks. Chunks end after a blank line, if possible, otherwise after a newline,
+    otherwise after whitespace and are only split at an arbitrary position if there is no whitespace.
+
+    Args:
+        text: the text to split
+        maxchars: the maximum number of characters in a chunk
+
+    Returns:
+        a list of (start, end) tuples which cover the whole text
+    """
+    spans = []
+    start = 0
+    textlen = len(text)
+    while textlen - start > maxchars:
+        limit = start + maxchars
+        cut = text.rfind("\n\n", start, limit)
+        if cut > start:
+            cut += 2
+        else:
+            cut = text.rfind("\n", start, limit)
+            if cut > start:
+                cut += 1
+            else:
+                cut = max(text.rfind(" ", start, limit), text.rfind("\t", start, limit))
+                if cut > start:
+                    cut += 1
+                else:
+                    cut = limit
+        spans.append((start, cut))
+        start = cut
+    spans.append((start, textlen))
+    return spans
 
 
 def apply_stanza(nlp, gatenlpdoc, setname=""):
@@ -208,6 +290,56 @@ def tok2tok(tok):
     return newtok
 
 
+# the word attributes which get stored as token features, in this order, if they are not None
+STANZA_WORD_FIELDS = ["text", "lemma", "upos", "xpos", "feats", "head", "deprel", "deps", "misc"]
+
+# word attributes which are only set by some processors and which get stored as token features
+# as converted by the word to_dict method, if they are set
+STANZA_WORD_DICT_FIELDS = ["coref_chains", "morphemes"]
+
+# the token attributes which get stored as features for tokens which consist of a single word, if they are not None
+STANZA_TOKEN_FIELDS = ["ner", "multi_ner", "mexp"]
+
+
+def _word_features(word):
+    """
+    Create the feature dictionary for a stanza word directly from the word attributes and return a tuple
+    (features, start, end) where start and end are the original offsets if specified in the misc field or None.
+    """
+    fm = {}
+    start = None
+    end = None
+    for fname in STANZA_WORD_FIELDS:
+        val = getattr(word, fname, None)
+        if val is None:
+            continue
+        if fname == "feats":
+            for feat in val.split("|"):
+                k, v = feat.split("=", 1)
+                fm[k] = v
+        elif fname == "misc":
+            for setting in val.split("|"):
+                if "=" not in setting:
+                    continue
+                k, v = setting.split("=", 1)
+                if k == "start_char":
+                    start = int(v)
+                elif k == "end_char":
+                    end = int(v)
+                else:
+                    fm[k] = v
+        else:
+            fm[fname] = val
+    worddict = None
+    for fname in STANZA_WORD_DICT_FIELDS:
+        if getattr(word, fname, None):
+            if worddict is None:
+                worddict = word.to_dict()
+            if fname in worddict:
+                fm[fname] = worddict[fname]
+    return fm, start, end
+
+
 def stanza2gatenlp(
     stanzadoc,
     gatenlpdoc=None,
@@ -218,6 +350,7 @@ def stanza2gatenlp(
     sentence_type="Sentence",
     add_entities=True,
     ent_prefix=None,
+    start_offset=0,
 ):
     """
     Convert a Stanford Stanza document to a gatenlp document. If a gatenlp document is already
@@ -238,6 +371,9 @@ def stanza2gatenlp(
         add_entities: if True, add any entities as well (Default value = True)
         ent_prefix: if None, use the original entity type as annotation type, otherwise add the given string
             to the annotation type as a prefix. (Default value = None)
+        start_offset: if a gatenlp document is specified, the offset in that document where the text
+            processed by Stanza starts. This allows to process parts of a document with Stanza and add the
+            annotations to the corresponding positions of the document.
 
     Returns:
       the new or modified gatenlp document
@@ -245,83 +381,75 @@ def stanza2gatenlp(
     """
     if gatenlpdoc is None:
         retdoc = Document(stanzadoc.text)
+        start_offset = 0
     else:
         retdoc = gatenlpdoc
     annset = retdoc.annset(setname)
-    # stanford nlp processes text in sentence chunks, so we do everything per sentence
-    prev_end = 0
+    # all annotations are collected as tuples (start, end, type, features) and added at once, the
+    # annotation ids are consecutive so the id of each annotation is known from its position in the list
+    annsdata = []
+    first_annid = annset._next_annid
+    prev_end = start_offset
     for sent in stanzadoc.sentences:
-        # go through the tokens: in stanza, each token is a list of dicts, normally there is one dict
-        # which also has the offset information in "misc", but for multiword tokens, there seems to be
-        # one "header" dict for the range of words which has the offset info and NER label and then
-        # one additional element per word which has all the rest.
-        # For our purposes we create a list of dicts where for normal tokens we just copy the element, but for
-        # multiword tokens we copy over something that has fake offsets and all the features
-        newtokens = []
+        # For normal tokens we use the word of the token, which has all the features, for multiword tokens
+        # the token has the offsets and NER label and there is one word per part, for those we create
+        # annotations which squeeze the words into the span of the token.
+        idx2pos = {}  # map stanza word id to position in annsdata
+        heads = []  # the features dicts which contain a head which must get mapped to an annotation id
         mwtokens = []
-        for t in sent.tokens:
-            t = t.to_dict()
-            if len(t) == 1:
-                # normal token
-                newtokens.append(tok2tok(t[0]))
+        sentstart = None
+        sentend = None
+        for token in sent.tokens:
+            words = token.words
+            tstart = token.start_char + start_offset
+            tend = token.end_char + start_offset
+            if len(words) == 1:
+                fm, start, end = _word_features(words[0])
+                start = tstart if start is None else start + start_offset
+                end = tend if end is None else end + start_offset
+                for fname in STANZA_TOKEN_FIELDS:
+                    val = getattr(token, fname, None)
+                    if val is not None:
+                        fm[fname] = val
+                spans = [(start, end)]
             else:
-                # multiword token
-                tokinfo = tok2tok(t[0])  # a dict with field "id" that contains a list of indices of words
-                words = t[1:]   # the rest of the list is words
-                fm = tokinfo.get("fm")
-                ner = fm.get("ner")
-                text = fm.get("text")
-                start = tokinfo["start"]
-                end = tokinfo["end"]
-                mwtokens.append(dict(start=start, end=end, ids=t[0]["id"]))
-                # create the spans for the annotations
-                spans = Span.squeeze(start, end, len(words))
-                for i, w in enumerate(words):
-                    tok = tok2tok(w)
-                    tok["fm"]["ner"] = ner
-                    tok["fm"]["token_text"] = text
-                    span = spans[i]
-                    tok["start"] = span.start
-                    tok["end"] = span.end
-                    newtokens.append(tok)
-        # print(f"\n!!!!!!DEBUG: newtokens={newtokens}")
-        # now go through the new token list and create annotations
-        idx2annid = {}  # map stanza word id to annotation id
-        starts = []
-        ends = []
-        # offset of any previous token ann, used to insert space tokens between token annotations
-        for t in newtokens:
-            start = t["start"]
-            end = t["end"]
-            stanzaid = t["id"]
-            starts.append(start)
-            ends.append(end)
-            if space_token_type is not None and prev_end < start:
-                annset.add(prev_end, start, space_token_type)
-            annid = annset.add(start, end, token_type, features=t["fm"]).id
-            prev_end = end
-            idx2annid[str(stanzaid)] = annid
-        for mwtinfo in mwtokens:
-            annids = [idx2annid[str(sid)] for sid in mwtinfo["ids"]]
-            annset.add(mwtinfo["start"], mwtinfo["end"], mwt_type, dict(word_ids=annids))
-        # print(f"\n!!!!!!DEBUG: idx2annid={idx2annid}")
+                spans = [(span.start, span.end) for span in Span.squeeze(tstart, tend, len(words))]
+                mwtokens.append((tstart, tend, [w.id for w in words]))
+            for word, (start, end) in zip(words, spans):
+                if len(words) > 1:
+                    fm, _, _ = _word_features(word)
+                    fm["ner"] = token.ner
+                    fm["token_text"] = token.text
+                if space_token_type is not None and prev_end < start:
+                    annsdata.append((prev_end, start, space_token_type, None))
+                if "head" in fm:
+                    heads.append(fm)
+                idx2pos[word.id] = len(annsdata)
+                annsdata.append((start, end, token_type, fm))
+                prev_end = end
+                if sentstart is None:
+                    sentstart = start
+                sentend = end
+        for start, end, wordids in mwtokens:
+            annids = [first_annid + idx2pos[wid] for wid in wordids]
+            annsdata.append((start, end, mwt_type, dict(word_ids=annids)))
         # create a sentence annotation from beginning of first word to end of last
-        sentid = annset.add(starts[0], ends[-1], sentence_type).id
-        # now replace the head index with the corresponding annid, the head index "0" is
+        # and replace the head index with the corresponding annid, the head index 0 is
         # mapped to the sentence annotation
-        idx2annid["0"] = sentid
-        for annid in list(idx2annid.values()):
-            ann = annset.get(annid)
-            hd = ann.features.get("head")
-            if hd is not None:
-                head_id = idx2annid.get(str(hd))
-                if head_id is None:
-                    logger.error(f"Could not find head id: {hd} for {ann} in document {gatenlpdoc.name}")
-                else:
-                    ann.features["head"] = head_id
+        if sentstart is not None:
+            idx2pos[0] = len(annsdata)
+            annsdata.append((sentstart, sentend, sentence_type, None))
+        for fm in heads:
+            hd = fm["head"]
+            pos = idx2pos.get(hd)
+            if pos is None:
+                logger.error(f"Could not find head id: {hd} for {fm} in document {retdoc.name}")
+            else:
+                fm["head"] = first_annid + pos
     # if necessary add a final space token
-    if space_token_type is not None and prev_end < len(retdoc.text):
-        annset.add(prev_end, len(retdoc.text), space_token_type)
+    text_end = start_offset + len(stanzadoc.text)
+    if space_token_type is not None and prev_end < text_end:
+        annsdata.append((prev_end, text_end, space_token_type, None))
     # add the entities
     if add_entities:
         for e in stanzadoc.entities:
@@ -329,5 +457,6 @@ def stanza2gatenlp(
                 anntype = ent_prefix + e.type
             else:
                 anntype = e.type
-            annset.add(e.start_char, e.end_char, anntype)
+            annsdata.append((e.start_char + start_offset, e.end_char + start_offset, anntype, None))
+    annset.add_many(annsdata)
     return retdoc
@@ -132,6 +132,41 @@ class FeatureMatcher:
                     return False
         return True
 
+    def select(self, annset, anntype):
+        """
+        Return the annotations of the given type in the annotation set whose features match.
+
+        If the set has a feature index (see `AnnotationSet.create_feature_index`) for the type and a feature
+        which is matched against a literal value, only the annotations found through the index get checked.
+
+        Args:
+            annset: the annotation set
+            anntype: the annotation type
+
+        Returns:
+            an immutable detached annotation set with the matching annotations
+        """
+        from gatenlp.annotation_set import UNHASHABLE_VALUES
+        candidates = None
+        for fmn, fmv in self.featurematches.items():
+            if callable(fmv) or isinstance(fmv, (CLASS_RE_PATTERN, CLASS_REGEX_PATTERN)):
+                continue
+            if not annset.has_feature_index(anntype, fmn):
+                continue
+            # literal values match by their string representation, so collect the ids of all indexed
+            # values with the same one
+            fstr = str(fmv)
+            annids = set()
+            for val, valids in annset._feature_indices[(anntype, fmn)].items():
+                if val is UNHASHABLE_VALUES or str(val) == fstr:
+                    annids.update(valids)
+            candidates = annids if candidates is None else candidates & annids
+        if candidates is None:
+            anns = annset.with_type(anntype)
+        else:
+            anns = [annset.get(annid) for annid in candidates]
+        return annset.detach(restrict_to=[ann.id for ann in anns if self(ann._features_data())])
+
 
 class FeatureEqMatcher:
     """
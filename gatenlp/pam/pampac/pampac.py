@@ -98,11 +98,9 @@ class Pampac:
             # in order to be able to get the contained annotations, we need to make sure the `annotations`
             # are in a set
             if not isinstance(annotations, AnnotationSet):
-                containing_anns = AnnotationSet.create_from(containing_anns)
-            for ann in containing_anns:
-                if ann.length == 0:
-                    continue
-                span_anns = annotations.within(ann)
+                annotations = AnnotationSet.create_from(annotations, name="")
+            containing_anns = [ann for ann in containing_anns if ann.length > 0]
+            for ann, span_anns in annotations.group_within(containing_anns).items():
                 ctx = Context(doc=doc, anns=span_anns, outset=outset, start=ann.start, end=ann.end)
                 returntuples.extend(self._run4span(logger, ctx, location))
             return returntuples
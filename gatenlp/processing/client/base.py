@@ -0,0 +1,285 @@
+"""
+Module with the base class shared by all annotators which act as clients to REST (or other remote)
+annotation services, and the rate limiter used by them.
+"""
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Union
+
+from gatenlp.processing.annotator import Annotator
+from gatenlp.processing.client.cache import ResponseCache
+
+# HTTP status codes for which a request is retried
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket rate limiter: tokens get added at a rate of `rate` per second up to
+    a maximum of `capacity` tokens and each request consumes one token, blocking until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock=time.monotonic, sleep=time.sleep):
+        """
+        Create a token bucket.
+
+        Args:
+            rate: number of tokens added per second, if None or <= 0, the bucket never blocks
+            capacity: maximum number of tokens, i.e. the maximum burst size (default: 1)
+            clock: function returning the current time in seconds
+            sleep: function to sleep for the given number of seconds
+        """
+        self.rate = rate
+        self.capacity = max(float(capacity), 1.0)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: float = 1.0):
+        """
+        Consume n tokens, block until enough tokens are available.
+
+        Args:
+            n: the number of tokens to consume (default: 1)
+        """
+        if not self.rate or self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                # allow for rounding errors, otherwise we could end up waiting for a tiny fraction forever
+                if self._tokens >= n - 1e-9:
+                    self._tokens = max(self._tokens - n, 0.0)
+                    return
+                wait = (n - self._tokens) / self.rate
+            self._sleep(wait)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class RestClientAnnotator(Annotator):
+    """
+    Base class for annotators which send (part of) the document to a remote service and use the result to
+    annotate the document.
+
+    Subclasses implement `_request(doc, **kwargs)`, which sends the request(s) for a document and returns
+    the result data and which must not modify the document, and `_annotate(doc, data, **kwargs)` which
+    uses the result data to annotate the document.
+
+    Requests are sent through a shared `requests.Session` (keep-alive, connection pooling), go through a
+    token bucket rate limiter and get retried with exponential backoff for connection errors and for
+    the status codes in RETRY_STATUS_CODES. The `pipe` method sends the requests for up to `n_workers` documents
+    concurrently but yields the annotated documents in the original order.
+
+    If a ResponseCache is used, the result data returned from `_request` is cached, keyed by the
+    class, endpoint URL, the parameters returned from `_cache_params()` and the text(s) returned from `_cache_text(doc)`.
+    """
+
+    def _init_client(
+        self,
+        min_delay_ms: int = 0,
+        max_rate: Optional[float] = None,
+        burst: int = 1,
+        n_workers: int = 1,
+        max_retries: int = 3,
+        backoff_s: float = 0.5,
+        timeout: Optional[float] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        cache: Union[None, str, ResponseCache] = None,
+    ):
+        """
+        Initialize the settings for sending requests, must get called from the subclass init method.
+
+        Args:
+            min_delay_ms: minimum average time between requests in milliseconds, ignored if max_rate is specified
+            max_rate: maximum number of requests per second, if None, derived from min_delay_ms
+            burst: number of requests which can be sent at once before the rate limit applies (default: 1)
+            n_workers: number of requests to send concurrently in `pipe` (default: 1)
+            max_retries: maximum number of retries for a failed request (default: 3)
+            backoff_s: delay before the first retry in seconds, doubled for each further retry (default: 0.5)
+            timeout: timeout for each request in seconds or None
+            rate_limiter: a TokenBucket instance to use, e.g. to share the rate limit between annotators.
+                If specified, min_delay_ms, max_rate and burst are ignored.
+            cache: if not None, a ResponseCache instance or the path of a cache database file to use for
+                caching the responses from the service.
+        """
+        if rate_limiter is None:
+            if max_rate is None and min_delay_ms:
+                max_rate = 1000.0 / min_delay_ms
+            rate_limiter = TokenBucket(max_rate, capacity=burst)
+        self.rate_limiter = rate_limiter
+        self.n_workers = max(int(n_workers), 1)
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.timeout = timeout
+        self._session = None
+        if isinstance(cache, (str, os.PathLike)):
+            cache = ResponseCache(cache)
+        self.cache = cache
+
+    @property
+    def session(self):
+        """
+        The requests Session used for all requests by this annotator, created when first needed.
+        """
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.n_workers, pool_maxsize=self.n_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_session"] = None
+        return state
+
+    def _send(self, func, *args, **kwargs):
+        """
+        Call func with the given arguments, respecting the rate limit and retrying with
+        exponential backoff if a connection error occurs or the result is a response with a status
+        code in RETRY_STATUS_CODES.
+
+        Returns:
+            whatever func returns, after the last retry this may be a response with an error status
+        """
+        import requests
+
+        delay = self.backoff_s
+        for trynr in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                ret = func(*args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if trynr == self.max_retries:
+                    raise
+            else:
+                status = getattr(ret, "status_code", None)
+                if status not in RETRY_STATUS_CODES or trynr == self.max_retries:
+                    return ret
+            time.sleep(delay)
+            delay *= 2
+
+    def _post(self, url, **kwargs):
+        """
+        Send a POST request using the session, with rate limiting and retries.
+
+        Args:
+            url: the URL
+            **kwargs: passed on to `requests.Session.post`
+
+        Returns:
+            the response
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self._send(self.session.post, url, **kwargs)
+
+    def _get(self, url, **kwargs):
+        """
+        Send a GET request using the session, with rate limiting and retries.
+
+        Args:
+            url: the URL
+            **kwargs: passed on to `requests.Session.get`
+
+        Returns:
+            the response
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self._send(self.session.get, url, **kwargs)
+
+    def _request(self, doc, **kwargs):
+        """
+        Send the request(s) for the document and return the result data. This may get invoked concurrently
+        from several threads and must not modify the document or the annotator.
+        """
+        raise NotImplementedError()
+
+    def _annotate(self, doc, data, **kwargs):
+        """
+        Annotate the document using the data returned from `_request` and return the document.
+        """
+        raise NotImplementedError()
+
+    def _cache_params(self, **kwargs) -> dict:
+        """
+        Return the parameters which influence the response of the service, used for the cache key.
+        The kwargs are the keyword arguments passed on when processing the document.
+        """
+        return {}
+
+    def _cache_text(self, doc):
+        """
+        Return the text or JSON-serializable object with texts sent to the service for the document,
+        used for the cache key.
+        """
+        return doc.text
+
+    def _cached_request(self, doc, **kwargs):
+        """
+        Return the result data for the document from the cache, if possible, otherwise invoke
+        `_request` and store the result in the cache.
+        """
+        if self.cache is None:
+            return self._request(doc, **kwargs)
+        key = ResponseCache.make_key(
+            [self.__class__.__name__, getattr(self, "url", None)],
+            self._cache_params(**kwargs),
+            self._cache_text(doc),
+        )
+        data = self.cache.get(key, self)
+        if data is self:
+            data = self._request(doc, **kwargs)
+            self.cache.put(key, data)
+        return data
+
+    def __call__(self, doc, **kwargs):
+        data = self._cached_request(doc, **kwargs)
+        return self._annotate(doc, data, **kwargs)
+
+    def pipe(self, documents: Iterable, **kwargs):
+        """
+        Process an iterable of documents, sending the requests for up to `n_workers` documents concurrently.
+        The documents are annotated and yielded in the original order. None elements are skipped.
+
+        Args:
+            documents: an iterable over documents
+            **kwargs: passed on to the methods which send the requests and annotate the document
+
+        Yields:
+            processed documents
+        """
+        if self.n_workers == 1:
+            yield from super().pipe(documents, **kwargs)
+            return
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.n_workers) as pool:
+            for doc in documents:
+                if doc is None:
+                    continue
+                pending.append((doc, pool.submit(self._cached_request, doc, **kwargs)))
+                # limit the number of documents in flight to bound memory
+                if len(pending) >= 2 * self.n_workers:
+                    doc, fut = pending.popleft()
+                    yield self._annotate(doc, fut.result(), **kwargs)
+            while pending:
+                doc, fut = pending.popleft()
+                yield self._annotate(doc, fut.result(), **kwargs)
@@ -0,0 +1,167 @@
+"""
+Module that provides a persistent cache for the responses of REST client annotators.
+"""
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+from typing import Optional
+
+
+class ResponseCache:
+    """
+    A size-bounded LRU cache for responses from annotation services, stored in an sqlite database so it
+    can be shared between runs and between all client annotators. Keys are created from the service endpoint,
+    the request parameters and the text sent, values are arbitrary picklable objects.
+
+    The cache keeps hit and miss statistics for the lifetime of the instance, see `stats()`.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        """
+        Create or open a response cache.
+
+        Args:
+            path: the path of the sqlite database file, created if it does not exist. If None, the cache is
+                only kept in memory.
+            max_entries: if not None, the maximum number of responses to keep, the least recently used ones
+                get evicted when this is exceeded
+            max_bytes: if not None, the maximum total size of the stored (pickled) responses in bytes, the least
+                recently used ones get evicted when this is exceeded
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._open()
+
+    def _open(self):
+        self._lock = threading.Lock()
+        if self.path is None:
+            dbpath = ":memory:"
+        else:
+            dbpath = os.fspath(self.path)
+        self._conn = sqlite3.connect(dbpath, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value BLOB, size INTEGER, atime INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_atime ON responses (atime)")
+        self._conn.commit()
+        row = self._conn.execute("SELECT MAX(atime) FROM responses").fetchone()
+        self._clock = row[0] or 0
+
+    def __getstate__(self):
+        if self.path is None:
+            raise Exception("An in-memory ResponseCache cannot be pickled")
+        state = self.__dict__.copy()
+        del state["_conn"]
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    @staticmethod
+    def make_key(endpoint, params, text) -> str:
+        """
+        Create the cache key for a request.
+
+        Args:
+            endpoint: the endpoint, e.g. URL, or other identification of the service
+            params: a JSON-serializable object (e.g. dict) with the parameters which influence the response
+            text: the text (or JSON-serializable object containing the texts) sent to the service
+
+        Returns:
+            the key string
+        """
+        data = json.dumps([endpoint, params, text], sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, default=None):
+        """
+        Return the cached response for the key or the default value if not in the cache.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._clock += 1
+            self._conn.execute("UPDATE responses SET atime = ? WHERE key = ?", (self._clock, key))
+            self._conn.commit()
+        return pickle.loads(row[0])
+
+    def put(self, key: str, value):
+        """
+        Store the response for the key, evicting the least recently used responses if necessary.
+        """
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._clock += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, atime) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), self._clock),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        n, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        while n > 0 and (
+            (self.max_entries is not None and n > self.max_entries)
+            or (self.max_bytes is not None and size > self.max_bytes)
+        ):
+            key, esize = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY atime LIMIT 1"
+            ).fetchone()
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            n -= 1
+            size -= esize
+            self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        """
+        Remove all responses from the cache.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Return a dictionary with the number of hits, misses, evictions, stored entries and the total
+        size of the stored entries in bytes.
+        """
+        with self._lock:
+            n, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions, entries=n, bytes=size)
+
+    def close(self):
+        """
+        Close the underlying database.
+        """
+        with self._lock:
+            self._conn.close()
@@ -3,15 +3,14 @@ ELG client.
 """
 import json
 import time
-import requests
 import logging
 
-from gatenlp.processing.annotator import Annotator
+from gatenlp.processing.client.base import RestClientAnnotator
 from gatenlp.utils import init_logger
 from gatenlp import Span
 
 
-class ElgTextAnnotator(Annotator):
+class ElgTextAnnotator(RestClientAnnotator):
     # NOTE: maybe we should eventually always use the elg package and the elg Service class!
     #   however, currently their way how handling auth is done is too limiting see issues #8, #9
 
@@ -49,6 +48,9 @@ class ElgTextAnnotator(Annotator):
         min_delay_ms=501,
         anntypes_map=None,
         debug=False,
+        n_workers=1,
+        max_retries=3,
+        cache=None,
     ):
         """
         Create an ElgTextAnnotator.
@@ -85,6 +87,11 @@ class ElgTextAnnotator(Annotator):
             min_delay_ms: the minimum delay time between requests in milliseconds (default: 501 ms)
             anntypes_map: a map for renaming the annotation type names from the service to the ones to use in
                the annotated document.
+            n_workers: number of requests to send concurrently when processing documents with `pipe`
+            max_retries: maximum number of retries if a request fails with a connection error or
+                a status code indicating a temporary problem
+            cache: if not None, a ResponseCache instance or the path of a cache database file to use for
+                caching the responses from the service
         """
         from elg import Authentication
         from elg.utils import get_domain, get_metadatarecord
@@ -102,7 +109,6 @@ class ElgTextAnnotator(Annotator):
         self.service_meta = None
         self.refresh_access = refresh_access
         self.sync_mode = sync_mode
-        self.timeout = timeout
         self.debug = debug
         # first check if we need to import the elg package
         if access_token:
@@ -124,22 +130,21 @@ class ElgTextAnnotator(Annotator):
             self.auth = Authentication.from_json(auth_file)
         if self.auth:
             self.access_token = self.auth.access_token
-        self.min_delay_s = min_delay_ms / 1000.0
+        self._init_client(
+            min_delay_ms=min_delay_ms, n_workers=n_workers, max_retries=max_retries, timeout=timeout,
+            cache=cache,
+        )
         self.anntypes_map = anntypes_map
         self.outset_name = outset_name
         self.logger = init_logger(__name__)
         self.response_json = None
         if debug:
             self.logger.setLevel(logging.DEBUG)
-        self._last_call_time = 0
 
-    def __call__(self, doc, **kwargs):
+    def _request(self, doc, **kwargs):
         # if necessary and possible, refresh the access token
         if self.refresh_access and self.auth:
             self.auth.refresh_if_needed()
-        delay = time.time() - self._last_call_time
-        if delay < self.min_delay_s:
-            time.sleep(self.min_delay_s - delay)
         request_json = json.dumps(
             {"type": "text", "content": doc.text, "mimeType": "text/plain"}
         )
@@ -153,7 +158,9 @@ class ElgTextAnnotator(Annotator):
 
         assert response.encoding.lower() == "utf-8"
         assert response.status_code == 200
-        response_json = response.json()
+        return response.json()
+
+    def _annotate(self, doc, response_json, **kwargs):
         if self.debug:
             self.logger.debug(f"Response JSON: {response_json}")
         self.response_data = response_json
@@ -173,7 +180,7 @@ class ElgTextAnnotator(Annotator):
         return doc
 
     def _call_sync(self, request_json, hdrs):
-        response = requests.post(self.url, data=request_json, headers=hdrs, timeout=self.timeout)
+        response = self._post(self.url, data=request_json, headers=hdrs)
         if response.status_code != 200:
             raise Exception(
                 f"Something went wrong, received status code/text {response.status_code} / {response.text}"
@@ -182,10 +189,10 @@ class ElgTextAnnotator(Annotator):
 
     def _call_async(self, request_json, hdrs):
         # see https://gitlab.com/european-language-grid/platform/python-client/-/blob/master/elg/service.py
-        response = requests.post(
+        response = self._post(
             self.url,
             data=request_json,
-            headers=hdrs, timeout=self.timeout)
+            headers=hdrs)
         if response.status_code >= 400:
             raise Exception(
                 f"Something went wrong, received status code/text {response.status_code} / {response.text}"
@@ -194,13 +201,13 @@ class ElgTextAnnotator(Annotator):
         assert response["type"] == "stored"
         hdrs.pop("Content-Type")
         uri = response["uri"]
-        response = requests.get(uri, headers=hdrs)
+        response = self._get(uri, headers=hdrs)
         jresp = response.json()
         waiting_time = time.time()
         while response.ok and "progress" in response.json().keys():
             percent = jresp["progress"]["percent"]
             time.sleep(1)
-            response = requests.get(uri, headers=hdrs, timeout=self.timeout)
+            response = self._get(uri, headers=hdrs)
             jresp = response.json()
             if time.time() - waiting_time > (self.timeout if self.timeout is not None else float("inf")):
                 raise Exception("No async result returned within timeout")
@@ -2,15 +2,13 @@
 GATE Cloud annotator client.
 """
 import logging
-import time
-import requests
 from requests.auth import HTTPBasicAuth
 
-from gatenlp.processing.annotator import Annotator
+from gatenlp.processing.client.base import RestClientAnnotator
 from gatenlp.utils import init_logger
 
 
-class GateCloudAnnotator(Annotator):
+class GateCloudAnnotator(RestClientAnnotator):
     """
     This annotator sends the text of a document to a GATE Cloud (https://cloud.gate.ac.uk/) endpoint and uses the
     returned result to create annotations.
@@ -25,6 +23,10 @@ class GateCloudAnnotator(Annotator):
         map_types=None,
         outset_name="",
         min_delay_ms=501,
+        n_workers=1,
+        max_retries=3,
+        timeout=None,
+        cache=None,
     ):
         """
         Create a GateCloudAnnotator.
@@ -43,12 +45,21 @@ class GateCloudAnnotator(Annotator):
                any type name not in the map will remain unchanged.
             outset_name: the annotation set in which to store the annotations
             min_delay_ms: minimum time in milliseconds between two subsequent requests to the server
+            n_workers: number of requests to send concurrently when processing documents with `pipe`
+            max_retries: maximum number of retries if a request fails with a connection error or
+                a status code indicating a temporary problem
+            timeout: timeout for a request in seconds or None
+            cache: if not None, a ResponseCache instance or the path of a cache database file to use for
+                caching the responses from the service
         """
         self.api_key = api_key
         self.api_password = api_password
         self.url = url
         self.map_types = map_types
-        self.min_delay_s = min_delay_ms / 1000.0
+        self._init_client(
+            min_delay_ms=min_delay_ms, n_workers=n_workers, max_retries=max_retries, timeout=timeout,
+            cache=cache,
+        )
         self.outset_name = outset_name
         if ann_types:
             if isinstance(ann_types, str):
@@ -65,12 +76,11 @@ class GateCloudAnnotator(Annotator):
             self.ann_types = None
         self.logger = init_logger()
         self.logger.setLevel(logging.DEBUG)
-        self._last_call_time = 0
 
-    def __call__(self, doc, **kwargs):
-        delay = time.time() - self._last_call_time
-        if delay < self.min_delay_s:
-            time.sleep(self.min_delay_s - delay)
+    def _cache_params(self, **kwargs):
+        return dict(url=kwargs.get("url", self.url), ann_types=self.ann_types)
+
+    def _request(self, doc, **kwargs):
         if "url" in kwargs:
             url = kwargs["url"]
         else:
@@ -88,7 +98,7 @@ class GateCloudAnnotator(Annotator):
         # params["nextAnnotationId"] = str(next_annid)
         # self.logger.debug(f"Sending text={text}, params={params}")
         if self.api_key:
-            response = requests.post(
+            response = self._post(
                 url,
                 data=text.encode("utf-8"),
                 headers=hdrs,
@@ -96,13 +106,15 @@ class GateCloudAnnotator(Annotator):
                 auth=HTTPBasicAuth(self.api_key, self.api_password),
             )
         else:
-            response = requests.post(
+            response = self._post(
                 url, data=text.encode("utf-8"), headers=hdrs, params=params
             )
         scode = response.status_code
         if scode != 200:
             raise Exception(f"Something went wrong, received status code {scode}")
-        json = response.json()
+        return response.json()
+
+    def _annotate(self, doc, json, **kwargs):
         ents = json.get("entities", {})
         annset = doc.annset(self.outset_name)
         for typename, anns in ents.items():
@@ -8,7 +8,8 @@ import logging
 from google.cloud import language_v1
 
 from gatenlp.features import Features
-from gatenlp.processing.annotator import Annotator
+from gatenlp.processing.client.base import RestClientAnnotator
+from gatenlp.processing.client.cache import ResponseCache
 from gatenlp.utils import init_logger
 
 # See:
@@ -31,7 +32,7 @@ def set_if_not_none(thedict, thekey, thevalue, suf=None):
         thedict[thekey] = thevalue
 
 
-class GoogleNlpAnnotator(Annotator):
+class GoogleNlpAnnotator(RestClientAnnotator):
 
     def __init__(
         self,
@@ -39,6 +40,9 @@ class GoogleNlpAnnotator(Annotator):
         lang: Optional[str] = None,
         outset_name: str = "",
         debug: bool = False,
+        min_delay_ms: int = 0,
+        n_workers: int = 1,
+        cache: Optional[Union[str, ResponseCache]] = None,
     ):
         """
         Create an IbmNluAnnotator.
@@ -52,10 +56,15 @@ class GoogleNlpAnnotator(Annotator):
                 See supported: https://cloud.google.com/natural-language/docs/languages
             outset_name: the name of the annotation set where to create the annotations (default: "")
             debug: if True, enable debugging logging
+            min_delay_ms: minimum time in ms to wait between requests to the server (default: 0)
+            n_workers: number of requests to send concurrently when processing documents with `pipe`
+            cache: if not None, a ResponseCache instance or the path of a cache database file to use for
+                caching the responses from the service
         """
         self.outset_name = outset_name
         self.lang = lang
         self.debug = debug
+        self._init_client(min_delay_ms=min_delay_ms, n_workers=n_workers, cache=cache)
         self.logger = init_logger(__name__)
         if debug:
             self.logger.setLevel(logging.DEBUG)
@@ -83,14 +92,21 @@ class GoogleNlpAnnotator(Annotator):
         self.which_features = which_features
         self.client = language_v1.LanguageServiceClient()
 
-    def __call__(self, doc, **kwargs):
+    def _cache_params(self, **kwargs):
+        return dict(features=self.which_features, lang=self.lang)
+
+    def _request(self, doc, **kwargs):
         goodoc = language_v1.Document(
             content=doc.text,
             type_="PLAIN_TEXT",
             language=self.lang,
         )
+        return self._send(
+            self.client.annotate_text, document=goodoc, encoding_type="UTF32", features=self.ibm_features
+        )
+
+    def _annotate(self, doc, resp, **kwargs):
         outset = doc.annset(self.outset_name)
-        resp = self.client.annotate_text(document=goodoc, encoding_type="UTF32", features=self.ibm_features)
         if self.debug:
             self.logger.debug(f"Response: {resp}")
         set_if_not_none(doc.features, "language", resp.language)
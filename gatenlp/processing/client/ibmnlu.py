@@ -11,7 +11,8 @@ from ibm_watson.natural_language_understanding_v1 import EmotionOptions, Entitie
 from ibm_watson.natural_language_understanding_v1 import RelationsOptions, SemanticRolesOptions, SentimentOptions
 from ibm_watson.natural_language_understanding_v1 import SyntaxOptions, SyntaxOptionsTokens
 
-from gatenlp.processing.annotator import Annotator
+from gatenlp.processing.client.base import RestClientAnnotator
+from gatenlp.processing.client.cache import ResponseCache
 from gatenlp.utils import init_logger
 
 
@@ -79,7 +80,7 @@ def get_nested(thedict, thekey, sep="_"):
     return cur
 
 
-class IbmNluAnnotator(Annotator):
+class IbmNluAnnotator(RestClientAnnotator):
 
     def __init__(
         self,
@@ -92,6 +93,9 @@ class IbmNluAnnotator(Annotator):
         doc_feature_map: Optional[dict] = None,
         entity_type_map: Optional[dict] = None,
         debug: bool = False,
+        min_delay_ms: int = 0,
+        n_workers: int = 1,
+        cache: Optional[Union[str, ResponseCache]] = None,
     ):
         """
         Create an IbmNluAnnotator.
@@ -118,6 +122,11 @@ class IbmNluAnnotator(Annotator):
                 to None, that feature is not stored. Supported mapping keys are: language
             entity_type_map: a map that maps original entity types to annotation types. Only the types in the map
                 are affected, others are used unchanged.
+            debug: if True, enable debugging logging
+            min_delay_ms: minimum time in ms to wait between requests to the server (default: 0)
+            n_workers: number of requests to send concurrently when processing documents with `pipe`
+            cache: if not None, a ResponseCache instance or the path of a cache database file to use for
+                caching the responses from the service
         """
         # See https://cloud.ibm.com/apidocs/natural-language-understanding?code=python
         if not url or not apikey:
@@ -137,6 +146,7 @@ class IbmNluAnnotator(Annotator):
         self.outset_name = outset_name
 
         self.debug = debug
+        self._init_client(min_delay_ms=min_delay_ms, n_workers=n_workers, cache=cache)
         self.logger = init_logger(__name__)
         if debug:
             self.logger.setLevel(logging.DEBUG)
@@ -148,12 +158,18 @@ class IbmNluAnnotator(Annotator):
             fparms = which2ibm_features(which_features)
             self.ibm_features = Features(**fparms)
 
-    def __call__(self, doc, **kwargs):
-        resp = self.nlu.analyze(
+    def _cache_params(self, **kwargs):
+        return dict(features=str(self.ibm_features), lang=self.lang)
+
+    def _request(self, doc, **kwargs):
+        return self._send(
+            self.nlu.analyze,
             text=doc.text,
             features=self.ibm_features,
             language=self.lang
         ).get_result()
+
+    def _annotate(self, doc, resp, **kwargs):
         outset = doc.annset(self.outset_name)
         if self.debug:
             tmp = json.dumps(resp, indent=2)
@@ -1,14 +1,15 @@
 """
 Perspective client.
 """
-import time
+import threading
 
 from typing import Optional, Union, List, Dict
-from gatenlp.processing.annotator import Annotator
+from gatenlp.processing.client.base import RestClientAnnotator
+from gatenlp.processing.client.cache import ResponseCache
 from gatenlp.utils import init_logger
 
 
-class PerspectiveAnnotator(Annotator):
+class PerspectiveAnnotator(RestClientAnnotator):
     """
     An annotator that sends text to the Perspective classification service
     (see https://perspectiveapi.com/)
@@ -29,6 +30,8 @@ class PerspectiveAnnotator(Annotator):
         ann_feature: Optional[str] = None,
         attr2feature: Optional[Dict[str, str]] = None,
         min_delay_ms: int = 1000,
+        n_workers: int = 1,
+        cache: Optional[Union[str, ResponseCache]] = None,
     ):
         """
         Create a Perspective annotator.
@@ -56,6 +59,9 @@ class PerspectiveAnnotator(Annotator):
                 made of the actual attribute (e.g. "TOXICITY") with the score type appended after an underscore,
                 e.g. "_PROBABILITY", giving "TOXICITY_PROBABILITY". Only the summary scores are used.
             min_delay_ms: minimum time in ms to wait between requests to the server (1000)
+            n_workers: number of requests to send concurrently when processing documents with `pipe`
+            cache: if not None, a ResponseCache instance or the path of a cache database file to use for
+                caching the responses from the service
         """
         try:
             from googleapiclient import discovery
@@ -65,10 +71,9 @@ class PerspectiveAnnotator(Annotator):
         assert requested_attributes
         self.auth_token = auth_token
         self.url = url
-        self.min_delay_s = min_delay_ms / 1000.0
+        self._init_client(min_delay_ms=min_delay_ms, n_workers=n_workers, cache=cache)
         self.logger = init_logger()
         # self.logger.setLevel(logging.DEBUG)
-        self._last_call_time = 0
         self.ann_type = ann_type
         self.ann_feature = ann_feature
         self.langs = langs
@@ -78,7 +83,13 @@ class PerspectiveAnnotator(Annotator):
         self.do_not_store = do_not_store
         self.requested_attributes = requested_attributes
         self.requested_attributes_feature = requested_attributes_feature
-        self.client = discovery.build(
+        self.client = self._build_client()
+        self._client_thread = threading.get_ident()
+        self._local = threading.local()
+
+    def _build_client(self):
+        from googleapiclient import discovery
+        return discovery.build(
             "commentanalyzer",
             "v1alpha1",
             developerKey=self.auth_token,
@@ -86,11 +97,18 @@ class PerspectiveAnnotator(Annotator):
             static_discovery=False,
         )
 
+    def _get_client(self):
+        """Return the client to use in the current thread, the client object is not thread-safe"""
+        if threading.get_ident() == self._client_thread:
+            return self.client
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._build_client()
+            self._local.client = client
+        return client
+
     def _call_api(self, text, langs=None, requested_attributes=None, attr2feature=None):
-        """Send text to API respecting min delay and get back dict"""
-        delay = time.time() - self._last_call_time
-        if delay < self.min_delay_s:
-            time.sleep(self.min_delay_s - delay)
+        """Send text to API respecting the rate limit and get back dict"""
         request = {
             "comment": {"text": text},
             "requestedAttributes": {n: {} for n in requested_attributes},
@@ -103,7 +121,7 @@ class PerspectiveAnnotator(Annotator):
         # pylint complains about this claiming that self.client does not have an attribute
         # comments but this is not true.
         # disabling that error message
-        response = self.client.comments().analyze(body=request).execute()  # pylint: disable=E1101
+        response = self._send(self._get_client().comments().analyze(body=request).execute)  # pylint: disable=E1101
         ret = {}
         scoredata = response["attributeScores"]
         for name, data in scoredata.items():
@@ -118,9 +136,14 @@ class PerspectiveAnnotator(Annotator):
         ret[name] = response["languages"]
         return ret
 
-    def __call__(self, doc, **kwargs):
+    def _queries(self, doc):
+        """
+        Return the list of (text, langs, requested_attributes) tuples to send, one for each annotation,
+        or a single tuple for the document.
+        """
         if self.ann_type is not None:
             annset = doc.annset(self.annset_name).with_type(self.ann_type)
+            queries = []
             for ann in annset:
                 if self.ann_feature:
                     txt = ann.features.get(self.ann_feature, "")
@@ -132,10 +155,8 @@ class PerspectiveAnnotator(Annotator):
                 requested_attributes = self.requested_attributes
                 if self.requested_attributes_feature:
                     requested_attributes = ann.features.get(self.requested_attributes_feature, requested_attributes)
-                ret = self._call_api(txt, langs=langs,
-                                     attr2feature=self.attr2feature, requested_attributes=requested_attributes)
-                if isinstance(ret, dict):
-                    ann.features.update(ret)
+                queries.append((txt, langs, requested_attributes))
+            return queries
         else:
             langs = self.langs
             if self.langs_feature:
@@ -143,8 +164,33 @@ class PerspectiveAnnotator(Annotator):
             requested_attributes = self.requested_attributes
             if self.requested_attributes_feature:
                 requested_attributes = doc.features.get(self.requested_attributes_feature, requested_attributes)
-            ret = self._call_api(doc.text, langs=langs,
-                                 attr2feature=self.attr2feature, requested_attributes=requested_attributes)
-            if isinstance(ret, dict):
-                doc.features.update(ret)
+            return (doc.text, langs, requested_attributes)
+
+    def _cache_params(self, **kwargs):
+        return dict(do_not_store=self.do_not_store, attr2feature=self.attr2feature)
+
+    def _cache_text(self, doc):
+        return self._queries(doc)
+
+    def _request(self, doc, **kwargs):
+        if self.ann_type is not None:
+            return [
+                self._call_api(txt, langs=langs, attr2feature=self.attr2feature,
+                               requested_attributes=requested_attributes)
+                for txt, langs, requested_attributes in self._queries(doc)
+            ]
+        else:
+            txt, langs, requested_attributes = self._queries(doc)
+            return self._call_api(txt, langs=langs,
+                                  attr2feature=self.attr2feature, requested_attributes=requested_attributes)
+
+    def _annotate(self, doc, data, **kwargs):
+        if self.ann_type is not None:
+            annset = doc.annset(self.annset_name).with_type(self.ann_type)
+            for ann, ret in zip(annset, data):
+                if isinstance(ret, dict):
+                    ann.features.update(ret)
+        else:
+            if isinstance(data, dict):
+                doc.features.update(data)
         return doc
@@ -1,15 +1,12 @@
 """
 Rewire client.
 """
-import time
-import requests
-
 from typing import Optional, Dict
-from gatenlp.processing.annotator import Annotator
+from gatenlp.processing.client.base import RestClientAnnotator
 from gatenlp.utils import init_logger
 
 
-class RewireAnnotator(Annotator):
+class RewireAnnotator(RestClientAnnotator):
     """
     An annotator that sends text to the Rewire classification service
     (see https://rewire.online/rewire-api-access/)
@@ -26,6 +23,10 @@ class RewireAnnotator(Annotator):
         ann_feature: Optional[str] = None,
         attr2feature: Optional[Dict[str,str]] = None,
         min_delay_ms=0,
+        n_workers=1,
+        max_retries=3,
+        timeout=None,
+        cache=None,
     ):
         """
         Create a Rewire annotator. The annotator stores the scores returned from the
@@ -44,27 +45,32 @@ class RewireAnnotator(Annotator):
             attr2feature: a dictionary mapping the attributes (score names) returned from the
                 service to feature names. Currently attributes "hate" and "abuse" are returned.
             min_delay_ms: minimum time in ms to wait between requests to the server
+            n_workers: number of requests to send concurrently when processing documents with `pipe`
+            max_retries: maximum number of retries if a request fails with a connection error or
+                a status code indicating a temporary problem
+            timeout: timeout for a request in seconds or None
+            cache: if not None, a ResponseCache instance or the path of a cache database file to use for
+                caching the responses from the service
         """
         if url is None:
             url = "https://api.rewire.online/classify"
         assert auth_token
         self.auth_token = auth_token
         self.url = url
-        self.min_delay_s = min_delay_ms / 1000.0
+        self._init_client(
+            min_delay_ms=min_delay_ms, n_workers=n_workers, max_retries=max_retries, timeout=timeout,
+            cache=cache,
+        )
         self.logger = init_logger()
         # self.logger.setLevel(logging.DEBUG)
-        self._last_call_time = 0
         self.ann_type = ann_type
         self.ann_feature = ann_feature
         self.attr2feature = attr2feature
         self.annset_name = annset_name
 
     def _call_api(self, text, attr2feature=None):
-        """Send text to API respecting min delay and get back dict"""
-        delay = time.time() - self._last_call_time
-        if delay < self.min_delay_s:
-            time.sleep(self.min_delay_s - delay)
-        response = requests.post(
+        """Send text to API respecting the rate limit and get back dict"""
+        response = self._post(
             self.url,
             json=dict(text=text),
             headers={"x-api-key": self.auth_token})
@@ -80,19 +86,38 @@ class RewireAnnotator(Annotator):
             ret = retnew
         return ret
 
-    def __call__(self, doc, **kwargs):
+    def _cache_params(self, **kwargs):
+        return dict(attr2feature=self.attr2feature)
+
+    def _texts(self, doc):
+        """Return the list of texts to classify, one for each annotation, or the document text"""
         if self.ann_type is not None:
-            annset = doc.annset(self.annset_name).with_type(self.ann_type)
-            for ann in annset:
+            texts = []
+            for ann in doc.annset(self.annset_name).with_type(self.ann_type):
                 if self.ann_feature:
-                    txt = ann.features.get(self.ann_feature, "")
+                    texts.append(ann.features.get(self.ann_feature, ""))
                 else:
-                    txt = doc[ann]
-                ret = self._call_api(txt, attr2feature=self.attr2feature)
+                    texts.append(doc[ann])
+            return texts
+        else:
+            return doc.text
+
+    def _cache_text(self, doc):
+        return self._texts(doc)
+
+    def _request(self, doc, **kwargs):
+        if self.ann_type is not None:
+            return [self._call_api(txt, attr2feature=self.attr2feature) for txt in self._texts(doc)]
+        else:
+            return self._call_api(doc.text, attr2feature=self.attr2feature)
+
+    def _annotate(self, doc, data, **kwargs):
+        if self.ann_type is not None:
+            annset = doc.annset(self.annset_name).with_type(self.ann_type)
+            for ann, ret in zip(annset, data):
                 if isinstance(ret, dict):
                     ann.features.update(ret)
         else:
-            ret = self._call_api(doc.text, attr2feature=self.attr2feature)
-            if isinstance(ret, dict):
-                doc.features.update(ret)
+            if isinstance(data, dict):
+                doc.features.update(data)
         return doc
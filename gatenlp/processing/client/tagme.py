@@ -1,15 +1,12 @@
 """
 TagMe client.
 """
-import time
-import requests
-
-from gatenlp.processing.annotator import Annotator
+from gatenlp.processing.client.base import RestClientAnnotator
 from gatenlp.utils import init_logger
 from gatenlp.offsetmapper import OffsetMapper
 
 
-class TagMeAnnotator(Annotator):
+class TagMeAnnotator(RestClientAnnotator):
     """
     An annotator that sends text to the TagMe Annotation service
     (https://sobigdata.d4science.org/group/tagme/tagme)
@@ -30,6 +27,10 @@ class TagMeAnnotator(Annotator):
         long_text=None,
         epsilon=None,
         link_pattern="https://{0}.wikipedia.org/wiki/{1}",
+        n_workers=1,
+        max_retries=3,
+        timeout=None,
+        cache=None,
     ):
         """
         Create a TagMeAnnotator.
@@ -49,6 +50,12 @@ class TagMeAnnotator(Annotator):
             link_pattern: the URL pattern to use to turn the "title" returned from TagMe into an actual link. The
                default is "https://{0}.wikipedia.org/wiki/{1}" where {0} gets replaced with the language code and
                {1} gets replaced with the title.
+            n_workers: number of requests to send concurrently when processing documents with `pipe`
+            max_retries: maximum number of retries if a request fails with a connection error or
+                a status code indicating a temporary problem
+            timeout: timeout for a request in seconds or None
+            cache: if not None, a ResponseCache instance or the path of a cache database file to use for
+                caching the responses from the service
         """
         if url is None:
             if task == "tag":
@@ -70,21 +77,29 @@ class TagMeAnnotator(Annotator):
         self.tweet = tweet
         self.include_all_spots = include_all_spots
         self.outset_name = outset_name
-        self.min_delay_s = min_delay_ms / 1000.0
+        self._init_client(
+            min_delay_ms=min_delay_ms, n_workers=n_workers, max_retries=max_retries, timeout=timeout,
+            cache=cache,
+        )
         self.logger = init_logger()
         # self.logger.setLevel(logging.DEBUG)
-        self._last_call_time = 0
         self.ann_type = ann_type
         self.link_pattern = link_pattern
 
-    def __call__(self, doc, **kwargs):
+    def _cache_params(self, **kwargs):
+        return dict(
+            lang=self.lang,
+            tweet=kwargs.get("tweet", self.tweet),
+            include_all_spots=self.include_all_spots,
+            long_text=self.long_text,
+            epsilon=self.epsilon,
+        )
+
+    def _request(self, doc, **kwargs):
         if "tweet" in kwargs:
             tweet = kwargs["tweet"]
         else:
             tweet = self.tweet
-        delay = time.time() - self._last_call_time
-        if delay < self.min_delay_s:
-            time.sleep(self.min_delay_s - delay)
         text = doc.text
         hdrs = {
             "Content-Type": "text/plain; charset=UTF-8",
@@ -103,15 +118,17 @@ class TagMeAnnotator(Annotator):
             params["long_text"] = self.long_text
         if self.epsilon is not None:
             params["epsilon"] = self.epsilon
-        response = requests.post(self.url, params=params, headers=hdrs)
+        response = self._post(self.url, params=params, headers=hdrs)
         scode = response.status_code
         if scode != 200:
             raise Exception(f"Something went wrong, received status code {scode}")
-        json = response.json()
+        return response.json()
+
+    def _annotate(self, doc, json, **kwargs):
         # self.logger.debug(f"Response JSON: {json}")
         ents = json.get("annotations", {})
         annset = doc.annset(self.outset_name)
-        om = OffsetMapper(text)
+        om = OffsetMapper(doc.text)
         for ent in ents:
             start = ent["start"]
             end = ent["end"]
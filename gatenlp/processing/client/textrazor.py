@@ -2,14 +2,12 @@
 TextRazor client.
 """
 import logging
-import time
-import requests
 
-from gatenlp.processing.annotator import Annotator
+from gatenlp.processing.client.base import RestClientAnnotator
 from gatenlp.utils import init_logger
 
 
-class TextRazorTextAnnotator(Annotator):
+class TextRazorTextAnnotator(RestClientAnnotator):
     """
     An annotator that sends document text to the TextRazor Annotation service (https://www.textrazor.com/)
     and uses the result to annotate the document.
@@ -25,6 +23,10 @@ class TextRazorTextAnnotator(Annotator):
         extractors=None,
         outset_name="",
         min_delay_ms=501,
+        n_workers=1,
+        max_retries=3,
+        timeout=None,
+        cache=None,
     ):
         """
         Create a TextRazorTextAnnotator.
@@ -38,6 +40,12 @@ class TextRazorTextAnnotator(Annotator):
                NOTE: currently only words, sentences, entities is supported.!
             outset_name: the annotationset to put the new annotations in
             min_delay_ms: minimum time in ms to wait between requests to the server
+            n_workers: number of requests to send concurrently when processing documents with `pipe`
+            max_retries: maximum number of retries if a request fails with a connection error or
+                a status code indicating a temporary problem
+            timeout: timeout for a request in seconds or None
+            cache: if not None, a ResponseCache instance or the path of a cache database file to use for
+                caching the responses from the service
         """
         if url is None:
             url = "https://api.textrazor.com"
@@ -45,10 +53,12 @@ class TextRazorTextAnnotator(Annotator):
         self.lang = lang
         self.outset_name = outset_name
         self.auth_token = auth_token
-        self.min_delay_s = min_delay_ms / 1000.0
+        self._init_client(
+            min_delay_ms=min_delay_ms, n_workers=n_workers, max_retries=max_retries, timeout=timeout,
+            cache=cache,
+        )
         self.logger = init_logger()
         # self.logger.setLevel(logging.DEBUG)
-        self._last_call_time = 0
         if extractors is not None:
             if isinstance(extractors, str):
                 extractors = extractors.split(",")
@@ -62,10 +72,10 @@ class TextRazorTextAnnotator(Annotator):
         else:
             self.extractors = "words,sentences,entities"
 
-    def __call__(self, doc, **kwargs):
-        delay = time.time() - self._last_call_time
-        if delay < self.min_delay_s:
-            time.sleep(self.min_delay_s - delay)
+    def _cache_params(self, **kwargs):
+        return dict(lang=self.lang, extractors=self.extractors)
+
+    def _request(self, doc, **kwargs):
         text = doc.text
         hdrs = {
             # 'Content-Type': 'text/plain; charset=UTF-8',
@@ -79,7 +89,7 @@ class TextRazorTextAnnotator(Annotator):
         if self.lang:
             data["languageOverride"] = self.lang
         self.logger.debug(f"Sending request to {self.url}, data={data}, headers={hdrs}")
-        response = requests.post(
+        response = self._post(
             self.url,
             # params=params,
             data=data,
@@ -92,6 +102,9 @@ class TextRazorTextAnnotator(Annotator):
         ok = json.get("ok", False)
         if not ok:
             raise Exception(f"Something went wrong, did not get OK, json: {json}")
+        return json
+
+    def _annotate(self, doc, json, **kwargs):
         self.logger.debug(f"Response JSON: {json}")
         resp = json.get("response", {})
         entities = resp.get("entities", [])
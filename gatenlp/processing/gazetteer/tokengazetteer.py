@@ -644,21 +644,18 @@ class TokenGazetteer(GazetteerBase):
         # create the token lists from the document: if withintype is None we only have one token list,
         # otherwise we have one list for each withingtype
         # We create a list of segments which are identified by start and end offsets
-        if self.withintype is None:
-            segment_offs = [(0, len(doc.text))]
-        else:
-            withinanns = doc.annset(self.withintype)
-            segment_offs = []
-            for wann in withinanns:
-                segment_offs.append((wann.start, wann.end))
         anntypes = [self.tokentype]
         if self.splittype is not None:
             anntypes.append(self.splittype)
         anns = doc.annset(self.annset).with_type(anntypes)
+        if self.withintype is None:
+            segments = [anns.within(0, len(doc.text))]
+        else:
+            segments = anns.group_within(doc.annset(self.withintype), include_self=True).values()
         # now do the annotation process for each segment
         outset = doc.annset(self.outset)
-        for segment_start, segment_end in segment_offs:
-            tokens = list(anns.within(segment_start, segment_end))
+        for segment in segments:
+            tokens = list(segment)
             for matches in self.find_all(tokens, doc=doc):
                 for match in matches:
                     starttoken = tokens[match.start]
@@ -1,15 +1,95 @@
 """
 Module that provides classes for normalizers. Normalizers are annotators which change the text of selected
  annotations or the entire text of the document.
-Since the text of a document is immutable, such Normalizers return a new document with the modified text.
+By default, normalizers return a new document with the modified text.
 Since the text is modified any annotations present in the document may be invalid, therefore all annotations
 are removed when the new document is returned. Document features are preserved. Any changelog is preserved but
 the normalization is not logged.
+
+Alternatively, normalizers can edit the text of the document in place, using `Document.edit`, which
+adapts the offsets of all annotations to the changed text.
 """
-from unicodedata import normalize
+import re
+from unicodedata import normalize, is_normalized, combining
 from gatenlp import Document
 from gatenlp.processing.annotator import Annotator
 
+# a run of non-ASCII characters, together with the ASCII character before it which may get combined
+# with the following characters. Normalization never changes ASCII characters and
+# never combines anything with a following ASCII character, so runs can get normalized separately.
+_PAT_NONASCII = re.compile(r"[\x00-\x7f]?[^\x00-\x7f]+")
+
+
+def _split_starters(text):
+    """
+    Split the text into parts which each start with a character with combining class 0.
+    """
+    parts = []
+    last = 0
+    for idx in range(1, len(text)):
+        if combining(text[idx]) == 0:
+            parts.append((last, idx))
+            last = idx
+    parts.append((last, len(text)))
+    return parts
+
+
+def _changed_part(old, new):
+    """
+    Return the offsets of the changed part in old and the replacing part of new, after removing the common
+    prefix and suffix.
+    """
+    maxlen = min(len(old), len(new))
+    pre = 0
+    while pre < maxlen and old[pre] == new[pre]:
+        pre += 1
+    suf = 0
+    while suf < maxlen - pre and old[-1 - suf] == new[-1 - suf]:
+        suf += 1
+    return pre, len(old) - suf, new[pre:len(new) - suf]
+
+
+def normalization_edits(text, form="NFKC"):
+    """
+    Return the edits which change the text into its unicode-normalized form. The edits only cover the
+    characters which actually change, so that as few annotation offsets as possible are affected when
+    the edits are carried out with `Document.edit`.
+
+    Args:
+        text: the text to normalize
+        form: the unicode normal form to use. Possible values are "NFC", "NFKC", "NFD" and "NFKD"
+
+    Returns:
+        a list of edits (start, end, newtext), sorted by offset
+    """
+    edits = []
+    if is_normalized(form, text):
+        return edits
+    for match in _PAT_NONASCII.finditer(text):
+        run = match.group()
+        newrun = normalize(form, run)
+        if newrun == run:
+            continue
+        offset = match.start()
+        # normalize the parts starting with a non-combining character separately, and use those
+        # edits if they give the same result as normalizing the whole run, which is almost always the case.
+        # Otherwise (e.g. for composing Hangul jamo), replace the changed part of the run as a whole.
+        runedits = []
+        newparts = []
+        for start, end in _split_starters(run):
+            part = run[start:end]
+            newpart = normalize(form, part)
+            newparts.append(newpart)
+            if newpart != part:
+                pstart, pend, repl = _changed_part(part, newpart)
+                runedits.append((offset + start + pstart, offset + start + pend, repl))
+        if "".join(newparts) == newrun:
+            edits.extend(runedits)
+        else:
+            pstart, pend, repl = _changed_part(run, newrun)
+            edits.append((offset + pstart, offset + pend, repl))
+    return edits
+
 
 class Normalizer(Annotator):
     """
@@ -20,18 +100,31 @@ class Normalizer(Annotator):
 
 class TextNormalizer(Normalizer):
     """
-    Annotator which creates a new, unicode-normalized document from an existing document.
+    Annotator which creates a new, unicode-normalized document from an existing document, or
+    unicode-normalizes the text of an existing document in place.
     """
-    def __init__(self, form="NFKC"):
+    def __init__(self, form="NFKC", edit=False, affected_strategy="keepadapt"):
         """
         Create a TextNormalizer.
 
         Args:
             form: the unicode normal form to use. Possible values are "NFC", "NCKC", "NFD" and "NFKD"
+            edit: if True, change the text of the document passed in place with `Document.edit`, only for the
+                characters which change, so that all annotations are kept and their offsets adapted. If False
+                (default), return a new document without any annotations.
+            affected_strategy: if edit is True, how to adapt annotations which start or end within
+                changed text, see `Document.edit`
         """
         self.form = form
+        self.edit = edit
+        self.affected_strategy = affected_strategy
 
     def __call__(self, doc, **kwargs):
+        if self.edit:
+            edits = normalization_edits(doc.text, form=self.form)
+            if edits:
+                doc.edit(edits, affected_strategy=self.affected_strategy)
+            return doc
         newtext = normalize(self.form, doc.text)
         newdoc = Document(newtext)
         newdoc.features.update(doc.features)
@@ -165,13 +165,78 @@ class GateXmlLoader:
         tree = ET.fromstring(xmlstr)
         return GateXmlLoader.xstream2python(tree, options, context)
 
+    @staticmethod
+    def parse_features(feats, options, ftype="Unknown", atype="Unknown", aset="Unknown", offset=None):
+        """
+        Parse the nodes for a feature map.
+
+        Args:
+            feats: iterable of Feature nodes
+            options: options dictionary to influence error/warning behavior
+            ftype: "doc" or "ann", for error messages
+            atype: annotation type, for error messages
+            aset: annotation set name, for error messages
+            offset: the annotation start offset, for error messages
+
+        Returns:
+            The features
+        """
+        features = {}
+        context = dict(
+            ftype=ftype,
+            atype=atype,
+            aset=aset,
+            offset=offset,
+            fname=None,
+            node=None
+        )
+        for feat in feats:
+            name = None
+            value = None
+            for el in feat:
+                context["node"] = el
+                context["fname"] = name
+                if el.tag == "Name":
+                    if el.get("className") == "java.lang.String":
+                        name = el.text
+                    else:
+                        raise Exception(
+                            "Odd Feature Name type: " + el.get("className")
+                        )
+                elif el.tag == "Value":
+                    cls_name = el.get("className")
+                    if cls_name == "java.lang.String":
+                        value = el.text
+                    elif cls_name == "java.lang.Integer":
+                        value = int(el.text)
+                    elif cls_name == "java.lang.Long":
+                        value = int(el.text)
+                    elif cls_name == "java.math.BigDecimal":
+                        value = float(el.text)
+                    elif cls_name == "java.lang.Boolean":
+                        value = bool(el.text)
+                    elif cls_name == "gate.corpora.ObjectWrapper":
+                        value = GateXmlLoader.value4objectwrapper(el.text, options, context)
+                    else:
+                        GateXmlLoader.error(f"Feature with unknown serialization type: {cls_name}",
+                                            options, context)
+                        value = None
+            if name is not None and value is not None:
+                features[name] = value
+        return features
+
     @staticmethod
     def load(clazz,
              from_ext=None,
              ignore_errors=True,
              show_warnings=True,
-             debug=False):
+             debug=False,
+             skip_sets=None,
+             skip_types=None):
         """
+        Load a document from a GATE XML file. The file is parsed incrementally: annotations are created
+        as soon as their element has been parsed and the parsed elements are discarded, so the whole XML
+        tree is never held in memory.
 
         Args:
             clazz:
@@ -181,6 +246,8 @@ class GateXmlLoader:
             show_warnings: (default: True) If an error occurs but ignore_errors is True, or if some conversion
                 is carried out, show a warning.
             debug: if True, output detailed information about unsupported elements in the input to stderr
+            skip_sets: if not None, an iterable of names of annotation sets to skip, "" is the default set
+            skip_types: if not None, an iterable of annotation types to skip in all annotation sets
 
         Returns:
             Loaded document
@@ -190,141 +257,89 @@ class GateXmlLoader:
             show_warnings=show_warnings,
             debug=debug
         )
+        skip_sets = set(skip_sets) if skip_sets else set()
+        skip_types = set(skip_types) if skip_types else set()
 
         isurl, extstr = is_url(from_ext)
         if isurl:
-            # xmlstring = get_str_from_url(extstr, encoding="utf-8")
-            # root = ET.fromstring(xmlstring)
             infp = stream_from(extstr, encoding=None)
-            root = ET.fromstring(infp.read())
-            infp.close()
         else:
-            with open(extstr, "rb") as infp:
-                # tree = ET.parse(extstr)
-                # root = tree.getroot()
-                root = ET.fromstring(infp.read())
-
-        # or: root = ET.fromstring(xmlstring)
+            infp = open(extstr, "rb")
 
-        # check we do have a GATE document
-
-        assert root.tag == "GateDocument"
         # NOTE: there are docs around where version is less than 3 and
         # also where encoding="windows-1252" !!!
-        # assert root.attrib == {"version": "3"}
-
-        def parsefeatures(feats, ftype="Unknown", atype="Unknown", aset="Unknown", offset=None):
-            """
-            Parse the node for a feature map.
-
-            Args:
-              feats: iterable of Feature nodes
-
-            Returns:
-                The features
-            """
-            features = {}
-            context = dict(
-                ftype=ftype,
-                atype=atype,
-                aset=aset,
-                offset=offset,
-                fname=None,
-                node=None
-            )
-            for feat in list(feats):
-                name = None
-                value = None
-                for el in list(feat):
-                    context["node"] = el
-                    context["fname"] = name
-                    if el.tag == "Name":
-                        if el.get("className") == "java.lang.String":
-                            name = el.text
-                        else:
-                            raise Exception(
-                                "Odd Feature Name type: " + el.get("className")
-                            )
-                    elif el.tag == "Value":
-                        cls_name = el.get("className")
-                        if cls_name == "java.lang.String":
-                            value = el.text
-                        elif cls_name == "java.lang.Integer":
-                            value = int(el.text)
-                        elif cls_name == "java.lang.Long":
-                            value = int(el.text)
-                        elif cls_name == "java.math.BigDecimal":
-                            value = float(el.text)
-                        elif cls_name == "java.lang.Boolean":
-                            value = bool(el.text)
-                        elif cls_name == "gate.corpora.ObjectWrapper":
-                            value = GateXmlLoader.value4objectwrapper(el.text, options, context)
-                        else:
-                            GateXmlLoader.error(f"Feature with unknown serialization type: {cls_name}",
-                                                options, context)
-                            value = None
-                if name is not None and value is not None:
-                    features[name] = value
-            return features
-
-        # get the document features
         docfeatures = {}
-        feats = root.findall("./GateDocumentFeatures/Feature")
-
-        docfeatures = parsefeatures(feats, ftype="doc")
-
-        textwithnodes = root.findall("./TextWithNodes")
         text = ""
         node2offset = {}
-        curoff = 0
-        for item in textwithnodes:
-            if item.text:
-                text += item.text
-                curoff += len(item.text)
-            for node in item:
-                nodeid = node.get("id")
-                node2offset[nodeid] = curoff
-                if node.tail:
-                    text += node.tail
-                    curoff += len(node.tail)
-
-        annsets = root.findall("./AnnotationSet")
-
         annotation_sets = {}  # map name - set
-        for annset in annsets:
-            if annset.get("Name"):
-                setname = annset.get("Name")
-            else:
-                setname = ""
-            annots = annset.findall("./Annotation")
-            annotations = []
-            maxannid = 0
-            for ann in annots:
-                annid = int(ann.attrib["Id"])
-                maxannid = max(maxannid, annid)
-                anntype = ann.attrib["Type"]
-                startnode = ann.attrib["StartNode"]
-                endnode = ann.attrib["EndNode"]
-                startoff = node2offset[startnode]
-                endoff = node2offset[endnode]
-                feats = ann.findall("./Feature")
-                features = parsefeatures(feats, ftype="ann", atype=anntype, aset=setname, offset=startoff)
-                if len(features) == 0:
-                    features = None
-                annotation = {
-                    "id": annid,
-                    "type": anntype,
-                    "start": startoff,
-                    "end": endoff,
-                    "features": features,
-                }
-                annotations.append(annotation)
-            annset = {
-                "name": setname,
-                "annotations": annotations,
-                "next_annid": maxannid + 1,
-            }
-            annotation_sets[setname] = annset
+        setname = None
+        setelem = None
+        annotations = None
+        maxannid = 0
+        try:
+            events = ET.iterparse(infp, events=("start", "end"))
+            _, root = next(events)
+            # check we do have a GATE document
+            assert root.tag == "GateDocument"
+            for event, elem in events:
+                tag = elem.tag
+                if event == "start":
+                    if tag == "AnnotationSet":
+                        setname = elem.get("Name") or ""
+                        setelem = elem
+                        annotations = []
+                        maxannid = 0
+                    continue
+                # end events: process the completely parsed element, then discard it
+                if tag == "Annotation":
+                    if setname in skip_sets:
+                        setelem.clear()
+                        continue
+                    anntype = elem.attrib["Type"]
+                    annid = int(elem.attrib["Id"])
+                    maxannid = max(maxannid, annid)
+                    if anntype not in skip_types:
+                        startoff = node2offset[elem.attrib["StartNode"]]
+                        endoff = node2offset[elem.attrib["EndNode"]]
+                        features = GateXmlLoader.parse_features(
+                            elem.iterfind("Feature"), options,
+                            ftype="ann", atype=anntype, aset=setname, offset=startoff)
+                        annotations.append({
+                            "id": annid,
+                            "type": anntype,
+                            "start": startoff,
+                            "end": endoff,
+                            "features": features if features else None,
+                        })
+                    # remove all processed annotation elements from the set element
+                    setelem.clear()
+                elif tag == "AnnotationSet":
+                    if setname not in skip_sets:
+                        annotation_sets[setname] = {
+                            "name": setname,
+                            "annotations": annotations,
+                            "next_annid": maxannid + 1,
+                        }
+                    root.clear()
+                    setelem = None
+                elif tag == "TextWithNodes":
+                    parts = []
+                    curoff = 0
+                    if elem.text:
+                        parts.append(elem.text)
+                        curoff += len(elem.text)
+                    for node in elem:
+                        node2offset[node.get("id")] = curoff
+                        if node.tail:
+                            parts.append(node.tail)
+                            curoff += len(node.tail)
+                    text = "".join(parts)
+                    root.clear()
+                elif tag == "GateDocumentFeatures":
+                    docfeatures = GateXmlLoader.parse_features(elem.iterfind("Feature"), options, ftype="doc")
+                    root.clear()
+        finally:
+            infp.close()
 
         docmap = {
             "text": text,
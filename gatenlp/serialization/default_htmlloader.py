@@ -1,9 +1,246 @@
 """
 Module that implements the default  HTML loader
 """
+from html.parser import HTMLParser
 from gatenlp.document import Document
 from gatenlp.urlfileutils import is_url, get_str_from_url
 
+# elements before and after which a newline is added to the text, unless there is already one
+NEWLINE_ELEMENTS = {
+    "pre",
+    "br",
+    "p",
+    "div",
+    "tr",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "li",
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "del",
+    "figure",
+    "figcaption",
+    "footer",
+    "header",
+    "hr",
+    "ins",
+    "main",
+    "nav",
+    "section",
+    "summary",
+    "input",
+    "legend",
+    "option",
+    "textarea",
+    "bdi",
+    "bdo",
+    "center",
+    "code",
+    "dfn",
+    "menu",
+    "dir",
+    "caption",
+}
+
+# elements which are ignored completely, together with their content
+IGNORED_ELEMENTS = {"script", "style"}
+
+# elements in which whitespace-only text is kept as it is
+PRESERVE_WHITESPACE_ELEMENTS = {"pre", "textarea"}
+
+# the characters BeautifulSoup considers whitespace when collapsing whitespace-only text
+_ASCII_SPACES = str.maketrans("", "", "\x20\x0a\x09\x0c\x0d")
+
+# elements which never have content and an end tag
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+    "source", "track", "wbr",
+}
+
+
+class _HtmlSpanBuilder:
+    """
+    Builds the document text and the markup annotation spans in a single pass from the start tag, end tag and
+    text events of a streaming HTML parser, using the same rules as the BeautifulSoup based loader.
+    """
+    def __init__(self):
+        self.parts = []
+        self.curoffset = 0
+        self.endsnl = False
+        self.pending = []
+        # list of [start, end, type, features], in the order of the start tags
+        self.anninfos = []
+        # stack of (name, index into anninfos) for the open elements
+        self.stack = []
+        self.ignoring = 0
+        # like the BeautifulSoup loader, annotate the whole document
+        self._open("[document]", {})
+
+    def _flush(self):
+        if not self.pending:
+            return
+        text = "".join(self.pending)
+        self.pending = []
+        # like BeautifulSoup, collapse whitespace-only text unless it is inside an element which preserves it
+        if text.translate(_ASCII_SPACES) == "" and \
+                not any(name in PRESERVE_WHITESPACE_ELEMENTS for name, _ in self.stack):
+            text = "\n" if "\n" in text else (" " if text else "")
+        if text == "" or (text == "\n" and self.endsnl):
+            return
+        self.parts.append(text)
+        self.curoffset += len(text)
+        self.endsnl = text.endswith("\n")
+
+    def _newline(self):
+        if not self.endsnl:
+            self.parts.append("\n")
+            self.curoffset += 1
+            self.endsnl = True
+
+    def _open(self, name, attrs):
+        self.stack.append((name, len(self.anninfos)))
+        self.anninfos.append([self.curoffset, None, name, attrs])
+
+    def _close_top(self):
+        name, idx = self.stack.pop()
+        if name in NEWLINE_ELEMENTS:
+            self._newline()
+        self.anninfos[idx][1] = self.curoffset
+
+    def start(self, name, attrs):
+        """Process a start tag, attrs is a dict or a list of name/value tuples."""
+        if self.ignoring:
+            if name in IGNORED_ELEMENTS:
+                self.ignoring += 1
+            return
+        if name in IGNORED_ELEMENTS:
+            self._flush()
+            self.ignoring += 1
+            return
+        self._flush()
+        if name in NEWLINE_ELEMENTS:
+            self._newline()
+        self._open(name, {k: (v if v is not None else "") for k, v in (attrs.items() if isinstance(attrs, dict) else attrs)})
+
+    def end(self, name):
+        """Process an end tag, closing all elements which are still open inside the element."""
+        if self.ignoring:
+            if name in IGNORED_ELEMENTS:
+                self.ignoring -= 1
+            return
+        for pos in range(len(self.stack) - 1, 0, -1):
+            if self.stack[pos][0] == name:
+                break
+        else:
+            # no matching open element, ignore
+            return
+        self._flush()
+        while len(self.stack) > pos:
+            self._close_top()
+
+    def boundary(self):
+        """Process something which is not text and not an element, e.g. a comment, which separates texts."""
+        if not self.ignoring:
+            self._flush()
+
+    def data(self, text):
+        """Process text."""
+        if not self.ignoring:
+            self.pending.append(text)
+
+    def close(self):
+        """Finish processing, close all open elements and return the text and the annotation spans."""
+        self._flush()
+        while self.stack:
+            self._close_top()
+        return "".join(self.parts), self.anninfos
+
+
+class _StreamHtmlParser(HTMLParser):
+    """
+    Stdlib HTML parser which passes its events on to a _HtmlSpanBuilder.
+    """
+    def __init__(self, builder):
+        super().__init__(convert_charrefs=True)
+        self.builder = builder
+
+    def handle_starttag(self, tag, attrs):
+        self.builder.start(tag, attrs)
+        if tag in VOID_ELEMENTS:
+            self.builder.end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.builder.start(tag, attrs)
+        self.builder.end(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in VOID_ELEMENTS:
+            self.builder.end(tag)
+
+    def handle_data(self, data):
+        self.builder.data(data)
+
+    def handle_comment(self, data):
+        self.builder.boundary()
+
+    def handle_decl(self, decl):
+        self.builder.boundary()
+
+    def handle_pi(self, data):
+        self.builder.boundary()
+
+
+class _LxmlTarget:
+    """
+    Parser target for lxml which passes the parser events on to a _HtmlSpanBuilder.
+    """
+    def __init__(self, builder):
+        self.builder = builder
+        self.start = builder.start
+        self.end = builder.end
+        self.data = builder.data
+
+    def comment(self, text):
+        self.builder.boundary()
+
+    def pi(self, target, data=None):
+        self.builder.boundary()
+
+    def close(self):
+        return None
+
+
+def _load_html_stream(from_ext, from_mem, parser, encoding, chunk_size=1024 * 1024):
+    """
+    Parse HTML from the file/URL or string with a streaming parser and return the text and annotation spans.
+    """
+    builder = _HtmlSpanBuilder()
+    if parser == "stream":
+        htmlparser = _StreamHtmlParser(builder)
+    else:
+        from lxml import etree
+        htmlparser = etree.HTMLParser(target=_LxmlTarget(builder))
+    isurl, extstr = is_url(from_ext)
+    if from_ext is not None and isurl:
+        from_mem = get_str_from_url(extstr, encoding=encoding)
+    if from_mem:
+        htmlparser.feed(from_mem)
+    else:
+        with open(extstr, encoding=encoding) as infp:
+            while True:
+                chunk = infp.read(chunk_size)
+                if not chunk:
+                    break
+                htmlparser.feed(chunk)
+    htmlparser.close()
+    return builder.close()
+
 
 class HtmlLoader:
     """ """
@@ -52,11 +289,19 @@ class HtmlLoader:
             clazz: param from_ext:
             from_ext: file our URL source
             from_mem:  string source
-            parser: one of "html.parser", "lxml", "lxml-xml", "html5lib" (default is "html.parser")
+            parser: one of "html.parser", "lxml", "lxml-xml", "html5lib" (default is "html.parser") to
+                parse with BeautifulSoup, or "stream" or "lxml-stream" to create the text and annotations in a
+                single pass over the events of the stdlib HTML parser or the lxml HTML parser, without building
+                a tree. The streaming parsers are much faster and use less memory, "lxml-stream" requires lxml.
             markup_set_name: the annotation set name for the set to contain the HTML
                 annotations (Default value = "Original markups")
             encoding: the encoding to use for reading the file
         """
+        if parser in ["stream", "lxml-stream"]:
+            text, anninfos = _load_html_stream(from_ext, from_mem, parser, encoding)
+            doc = Document(text)
+            doc.annset(markup_set_name).add_many(anninfos)
+            return doc
         # NOTE: for now we have a simple heuristic for adding newlines to the text:
         # before and after a block element, a newline is added unless there is already one
         # NOTE: for now we use  multi_valued_attributes=None which prevents attributes of the
@@ -76,48 +321,6 @@ class HtmlLoader:
         # we recursively iterate the tree depth first, going through the children
         # and adding to a list that either contains the text or a dict with the information
         # about annotations we want to add
-        nlels = {
-            "pre",
-            "br",
-            "p",
-            "div",
-            "tr",
-            "h1",
-            "h2",
-            "h3",
-            "h4",
-            "h5",
-            "h6",
-            "li",
-            "address",
-            "article",
-            "aside",
-            "blockquote",
-            "del",
-            "figure",
-            "figcaption",
-            "footer",
-            "header",
-            "hr",
-            "ins",
-            "main",
-            "nav",
-            "section",
-            "summary",
-            "input",
-            "legend",
-            "option",
-            "textarea",
-            "bdi",
-            "bdo",
-            "center",
-            "code",
-            "dfn",
-            "menu",
-            "dir",
-            "caption",
-        }
-        ignoreels = {"script", "style"}
         docinfo = {"anninfos": [], "curoffset": 0, "curid": 0, "text": ""}
 
         def walktree(el):
@@ -142,10 +345,10 @@ class HtmlLoader:
             elif isinstance(el, bs4.element.Tag):
                 # print("DEBUG: got tag: ", type(el), " name=",el.name)
                 # some tags we ignore completely:
-                if el.name in ignoreels:
+                if el.name in IGNORED_ELEMENTS:
                     return
                 # for some tags we insert a new line before, but only if we do not already have one
-                if not docinfo["text"].endswith("\n") and el.name in nlels:
+                if not docinfo["text"].endswith("\n") and el.name in NEWLINE_ELEMENTS:
                     docinfo["text"] += "\n"
                     # print("DEBUG: adding newline before at ", docinfo["curoffset"])
                     docinfo["curoffset"] += 1
@@ -162,7 +365,7 @@ class HtmlLoader:
                 for child in el.children:
                     walktree(child)
                 # for some tags we insert a new line after
-                if not docinfo["text"].endswith("\n") and el.name in nlels:
+                if not docinfo["text"].endswith("\n") and el.name in NEWLINE_ELEMENTS:
                     docinfo["text"] += "\n"
                     # print("DEBUG: adding newline after at ", docinfo["curoffset"])
                     docinfo["curoffset"] += 1
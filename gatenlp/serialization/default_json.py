@@ -93,7 +93,7 @@ class JsonSerializer:
         d = inst.to_dict(offset_type=offset_type, offset_mapper=offset_mapper, annspec=annspec, **kwargs)
         if to_mem:
             if gzip:
-                compress(json.dumps(d).encode("UTF-8"))
+                return compress(json.dumps(d).encode("UTF-8"))
             else:
                 return json.dumps(d)
         else:
@@ -109,7 +109,7 @@ class JsonSerializer:
         """
         Invokes the save method with gzip=True
         """
-        JsonSerializer.save(clazz, inst, gzip=True, **kwargs)
+        return JsonSerializer.save(clazz, inst, gzip=True, **kwargs)
 
     @staticmethod
     def load(
@@ -8,6 +8,7 @@ from gatenlp.annotation import Annotation
 from gatenlp.changelog import ChangeLog
 from gatenlp.features import Features
 from gatenlp.urlfileutils import is_url, get_bytes_from_url
+from gatenlp.utils import intern_name, intern_feature_names
 
 
 MSGPACK_VERSION_HDR = "sm2"
@@ -45,7 +46,7 @@ class MsgPackSerializer:
                 pack(ann.start, stream)
                 pack(ann.end, stream)
                 pack(ann.id, stream)
-                pack(ann.features.to_dict(), stream)
+                pack(ann._features_to_dict(), stream)
 
     @staticmethod
     def stream2document(stream):
@@ -85,7 +86,8 @@ class MsgPackSerializer:
                 aend = u.unpack()
                 aid = u.unpack()
                 afeatures = u.unpack()
-                ann = Annotation(astart, aend, atype, annid=aid, features=afeatures)
+                ann = Annotation(astart, aend, intern_name(atype), annid=aid,
+                                 features=intern_feature_names(afeatures))
                 annset._annotations[aid] = ann
             annset._annset.update(annset._annotations.values())
             setsdict[sname] = annset
@@ -65,7 +65,7 @@ class PlainTextSerializer:
         Returns:
 
         """
-        PlainTextSerializer.save(clazz, inst, gzip=True, **kwargs)
+        return PlainTextSerializer.save(clazz, inst, gzip=True, **kwargs)
 
     @staticmethod
     def load(
@@ -46,7 +46,7 @@ class YamlSerializer:
         d = inst.to_dict(offset_type=offset_type, offset_mapper=offset_mapper, annspec=annspec, **kwargs)
         if to_mem:
             if gzip:
-                compress(yaml.dump(d, Dumper=yaml_dumper).encode("UTF-8"))
+                return compress(yaml.dump(d, Dumper=yaml_dumper).encode("UTF-8"))
             else:
                 return yaml.dump(d, Dumper=yaml_dumper)
         else:
@@ -69,7 +69,7 @@ class YamlSerializer:
         Returns:
 
         """
-        YamlSerializer.save(clazz, inst, gzip=True, **kwargs)
+        return YamlSerializer.save(clazz, inst, gzip=True, **kwargs)
 
     @staticmethod
     def load(
@@ -2,11 +2,18 @@
 Module for functions that help reading binary and textual data from either URLs or local files.
 """
 
-from typing import Optional, Union
+from typing import Optional, Union, List, Tuple
 from io import TextIOWrapper
 from pathlib import Path
+import os
+import io
+import gzip
+import bz2
+import zlib
 import asyncio
-from urllib.parse import ParseResult
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import ParseResult, urlparse
 from urllib.request import urlopen
 have_pyodide = False
 try:
@@ -111,7 +118,103 @@ def get_bytes_from_url(url):  # pragma: no cover
     return req.content
 
 
-def yield_lines_from(url_or_file: Union[str, Path, ParseResult], encoding: str = "utf-8"):  # pragma: no cover
+# map file extensions to compression methods
+COMPRESSION_EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".zst": "zstd"}
+
+# the extension of the index file for a block compressed file
+BLOCK_INDEX_EXT = ".idx"
+BLOCK_INDEX_HEADER = "gatenlp-blockgzip\t1"
+
+
+def infer_compression(path: Union[str, Path], compression: Optional[str] = "infer") -> Optional[str]:
+    """
+    Determine the compression method to use for a file.
+
+    Args:
+        path: the file path or URL
+        compression: if "infer", determine the compression from the file extension (".gz", ".bz2", ".zst"),
+            otherwise return the given compression unchanged.
+
+    Returns:
+        None, "gzip", "bz2", "zstd" or whatever other compression method was specified
+    """
+    if compression != "infer":
+        return compression
+    if not isinstance(path, (str, Path)):
+        return None
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(str(path))[1].lower())
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise Exception("Package zstandard must be installed for zstd compression, e.g. pip install gatenlp[zstd]")
+    return zstandard
+
+
+def open_compressed(
+        path: Union[str, Path],
+        mode: str = "rt",
+        compression: Optional[str] = "infer",
+        encoding: Optional[str] = "utf-8",
+        block_size: int = 1024 * 1024):
+    """
+    Open a local file for reading or writing, transparently compressing or decompressing the data.
+
+    Args:
+        path: the file path
+        mode: the mode, one of "rt", "wt", "at", "rb", "wb", "ab"
+        compression: one of None, "gzip", "bz2", "zstd", "blockgzip" (writing only, see BlockGzipWriter)
+            or "infer" (default) to determine the compression from the file extension.
+        encoding: the encoding to use for text mode
+        block_size: the minimum uncompressed block size for block gzip compression
+
+    Returns:
+        the open file object
+    """
+    if isinstance(path, Path):
+        path = str(path)
+    compression = infer_compression(path, compression)
+    if "b" in mode:
+        encoding = None
+    if compression is None:
+        return open(path, mode, encoding=encoding)
+    elif compression == "gzip":
+        return gzip.open(path, mode, encoding=encoding)
+    elif compression == "bz2":
+        return bz2.open(path, mode, encoding=encoding)
+    elif compression == "zstd":
+        return _zstandard().open(path, mode, encoding=encoding)
+    elif compression == "blockgzip":
+        if not mode.startswith("w"):
+            raise Exception("Block gzip compressed files can only be opened for writing, use yield_block_lines "
+                            "to read")
+        fh = io.BufferedWriter(BlockGzipWriter(path, block_size=block_size))
+        if "t" in mode:
+            fh = TextIOWrapper(fh, encoding=encoding, newline="\n")
+        return fh
+    else:
+        raise Exception(f"Compression not supported: {compression}")
+
+
+def _decompressing_stream(stream, compression: Optional[str]):
+    if compression is None:
+        return stream
+    elif compression == "gzip":
+        return gzip.GzipFile(fileobj=stream)
+    elif compression == "bz2":
+        return bz2.BZ2File(stream)
+    elif compression == "zstd":
+        return _zstandard().ZstdDecompressor().stream_reader(stream)
+    else:
+        raise Exception(f"Compression not supported: {compression}")
+
+
+def yield_lines_from(
+        url_or_file: Union[str, Path, ParseResult],
+        encoding: str = "utf-8",
+        compression: Optional[str] = "infer"):  # pragma: no cover
     """
     Yields lines of text from either a file or an URL
 
@@ -120,16 +223,19 @@ def yield_lines_from(url_or_file: Union[str, Path, ParseResult], encoding: str =
             only if it starts with http:// or https://, otherwise it can be a parsed urllib url
             or a pathlib path
         encoding: the encoding to use
+        compression: one of None, "gzip", "bz2", "zstd" or "infer" (default) to determine the compression
+            from the file or URL extension.
     """
     isurl, extstr = is_url(url_or_file)
     if isurl is None:
         return
     if isurl:
-        for line in urlopen(extstr):
-            line = line.decode(encoding)
+        compression = infer_compression(urlparse(extstr).path, compression)
+        stream = _decompressing_stream(urlopen(extstr), compression)
+        for line in TextIOWrapper(stream, encoding=encoding):
             yield line
     else:
-        with open(extstr, "rt", encoding=encoding) as infp:
+        with open_compressed(extstr, "rt", compression=compression, encoding=encoding) as infp:
             for line in infp:
                 yield line
 
@@ -161,3 +267,174 @@ def stream_from(url_or_file: Union[str, Path, ParseResult], encoding: str = "utf
             return open(extstr, "rt", encoding=encoding)
         else:
             return open(extstr, "rb")
+
+
+def part_byte_range(size: int, nparts: int, partnr: int) -> Tuple[int, int]:
+    """
+    Return the byte range (start, end) for part partnr of nparts roughly equal parts of size bytes.
+    """
+    return (size * partnr) // nparts, (size * (partnr + 1)) // nparts
+
+
+def yield_part_lines(
+        path: Union[str, Path],
+        nparts: int = 1,
+        partnr: int = 0,
+        encoding: str = "utf-8"):
+    """
+    Yield the lines from the byte range of part partnr of nparts roughly equal sized parts of the uncompressed file.
+    Each line belongs to the part which contains its first byte, so each reader of a part only reads
+    its own share of the file plus the remainder of its last line.
+
+    Args:
+        path: the path of the file
+        nparts: the number of parts (default: 1)
+        partnr: the part to read, 0 <= partnr < nparts (default: 0)
+        encoding: the encoding of the text
+
+    Yields:
+        the lines of text
+    """
+    path = str(path)
+    start, end = part_byte_range(os.path.getsize(path), nparts, partnr)
+    with open(path, "rb") as infp:
+        if start > 0:
+            # resync: skip to the beginning of the first line which starts in our range, if the previous byte
+            # is a newline, this just reads that newline
+            infp.seek(start - 1)
+            infp.readline()
+        pos = infp.tell()
+        while pos < end:
+            line = infp.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line.decode(encoding)
+
+
+class BlockGzipWriter(io.RawIOBase):
+    """
+    A binary file-like object for writing a block gzip compressed file: the data is written as a sequence
+    of independently gzip compressed blocks, where each block ends at a line boundary. Since a
+    sequence of gzip members is a valid gzip file, the file can be read like any other gzip compressed file,
+    but the index file, which is written next to the file (file path plus ".idx") when the writer is closed,
+    also allows to quickly find and decompress any part of the file in parallel, see `yield_block_lines`.
+    """
+    def __init__(self, path: Union[str, Path], block_size: int = 1024 * 1024, compresslevel: int = 6):
+        """
+        Create a block gzip writer.
+
+        Args:
+            path: the path of the file to write, the index is written to the path with ".idx" appended
+            block_size: the minimum size of the uncompressed data in each block (default: 1MB)
+            compresslevel: the gzip compression level
+        """
+        super().__init__()
+        self.path = str(path)
+        self.block_size = block_size
+        self.compresslevel = compresslevel
+        self._fh = open(self.path, "wb")
+        self._buf = bytearray()
+        self._offset = 0
+        self._index = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buf.extend(data)
+        if len(self._buf) >= self.block_size:
+            cut = self._buf.rfind(b"\n")
+            if cut >= 0:
+                self._write_block(bytes(self._buf[:cut + 1]))
+                del self._buf[:cut + 1]
+        return len(data)
+
+    def _write_block(self, data):
+        comp = gzip.compress(data, compresslevel=self.compresslevel, mtime=0)
+        self._fh.write(comp)
+        self._index.append((self._offset, len(comp), data.count(b"\n")))
+        self._offset += len(comp)
+
+    def close(self):
+        if self.closed:
+            return
+        if self._buf:
+            self._write_block(bytes(self._buf))
+            self._buf = bytearray()
+        self._fh.close()
+        with open(self.path + BLOCK_INDEX_EXT, "wt", encoding="utf-8") as outfp:
+            outfp.write(BLOCK_INDEX_HEADER + "\n")
+            for offset, size, nlines in self._index:
+                outfp.write(f"{offset}\t{size}\t{nlines}\n")
+        super().close()
+
+
+def read_block_index(path: Union[str, Path]) -> Optional[List[Tuple[int, int, int]]]:
+    """
+    Read the block index for a block gzip compressed file.
+
+    Args:
+        path: the path of the compressed file (not the index file)
+
+    Returns:
+        a list of tuples (offset, compressed size, number of lines) for each block or None if there is no
+        index for the file.
+    """
+    idxpath = str(path) + BLOCK_INDEX_EXT
+    if not os.path.exists(idxpath):
+        return None
+    with open(idxpath, "rt", encoding="utf-8") as infp:
+        hdr = infp.readline().rstrip("\n")
+        if hdr != BLOCK_INDEX_HEADER:
+            raise Exception(f"Not a block index file: {idxpath}")
+        return [tuple(int(x) for x in line.split("\t")) for line in infp]
+
+
+def _read_block(path, offset, size):
+    with open(path, "rb") as infp:
+        infp.seek(offset)
+        data = infp.read(size)
+    # zlib releases the GIL, so this can run in parallel on several threads
+    return zlib.decompress(data, wbits=31)
+
+
+def yield_block_lines(
+        path: Union[str, Path],
+        nparts: int = 1,
+        partnr: int = 0,
+        n_workers: int = 1,
+        encoding: str = "utf-8"):
+    """
+    Yield the lines from a block gzip compressed file, as written by BlockGzipWriter, optionally only the
+    lines from the blocks which belong to part partnr of nparts roughly equal sized parts.
+
+    Args:
+        path: the path of the compressed file, there must be an index file for it
+        nparts: the number of parts (default: 1)
+        partnr: the part to read, 0 <= partnr < nparts (default: 0)
+        n_workers: the number of blocks to decompress in parallel (default: 1)
+        encoding: the encoding of the text
+
+    Yields:
+        the lines of text
+    """
+    path = str(path)
+    index = read_block_index(path)
+    if index is None:
+        raise Exception(f"No block index file for {path}")
+    nblocks = len(index)
+    blocks = index[(partnr * nblocks) // nparts:((partnr + 1) * nblocks) // nparts]
+    if n_workers > 1:
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            for offset, size, _ in blocks:
+                pending.append(pool.submit(_read_block, path, offset, size))
+                # limit the number of decompressed blocks held in memory
+                if len(pending) >= 2 * n_workers:
+                    yield from io.StringIO(pending.popleft().result().decode(encoding), newline="\n")
+            while pending:
+                yield from io.StringIO(pending.popleft().result().decode(encoding), newline="\n")
+    else:
+        for offset, size, _ in blocks:
+            yield from io.StringIO(_read_block(path, offset, size).decode(encoding), newline="\n")
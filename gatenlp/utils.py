@@ -369,3 +369,34 @@ def get_nested(adict, name, default=None, silent=False):
         return default
     else:
         return ret
+
+
+def intern_name(name):
+    """
+    Return the interned version of a string which is used as a name, e.g. an annotation type or feature name,
+    so that all equal names share the same string object and comparing them is mostly an identity check.
+    Anything which is not a string is returned unchanged.
+
+    Args:
+        name: the name to intern
+
+    Returns:
+        the interned string
+    """
+    return sys.intern(name) if type(name) is str else name
+
+
+def intern_feature_names(features):
+    """
+    Return a dictionary of features where all the feature names are interned strings, see `intern_name`.
+    Anything which is not a non-empty dictionary is returned unchanged.
+
+    Args:
+        features: a dictionary of features, e.g. as loaded from some serialization format
+
+    Returns:
+        the dictionary with interned feature names
+    """
+    if not features or type(features) is not dict:
+        return features
+    return {intern_name(fname): fval for fname, fval in features.items()}
@@ -51,6 +51,8 @@ def get_install_extras_require():
         "stanza": ["stanza>=1.3.0"],
         "spacy": ["spacy>=2.2"],
         "nltk": ["nltk>=3.5"],
+        "zstd": ["zstandard"],
+        "parquet": ["pyarrow"],
         "mltner": ["tner"],
         # the following are not included in all but in alldev
         "notebook": [
@@ -194,3 +194,50 @@ class TestAnnotationRels:
         assert ann2.features == {"a": 1}
 
         assert str(ann2) == "Annotation(1,2,x,features=Features({'a': 1}),id=3)"
+
+    def test_annotation_lazyfeatures(self):
+        """
+        Unit test method (make linter happy)
+        """
+        import copy
+        import pickle
+        from gatenlp.changelog import ChangeLog
+
+        ann1 = Annotation(1, 2, "x", annid=3)
+        assert not hasattr(ann1, "__dict__")
+        # serializing or comparing an annotation without features does not create a Features object
+        assert ann1.to_dict()["features"] == {}
+        assert str(ann1) == "Annotation(1,2,x,features=Features({}),id=3)"
+        assert ann1.equal(Annotation(1, 2, "x", {}))
+        assert ann1._features is None
+        assert copy.deepcopy(ann1).same(ann1)
+        assert pickle.loads(pickle.dumps(ann1)).same(ann1)
+        assert len(ann1.features) == 0
+        assert ann1._features is not None
+        assert not ann1.equal(Annotation(1, 2, "x", {"a": 1}))
+
+        # changes to the features which get created later are logged
+        doc = Document("Some text", changelog=ChangeLog())
+        ann2 = doc.annset().add(0, 4, "Token")
+        ann2.features["x"] = 1
+        assert doc.changelog.changes[0]["features"] == {}
+        assert doc.changelog.changes[1]["value"] == 1
+        assert doc.clone().annset().get(ann2.id).features.to_dict() == {"x": 1}
+        assert doc.annset().add(5, 9, "Token").to_dict()["features"] == {}
+
+    def test_annotation_interning(self):
+        """
+        Unit test method (make linter happy)
+        """
+        import sys
+        from gatenlp.annotation_set import AnnotationSet
+
+        # build the strings at runtime so they are not interned constants
+        anntype = "".join(["Tok", "en"])
+        fname = "".join(["ca", "tegory"])
+        ann1 = Annotation.from_dict(dict(type=anntype, start=0, end=1, id=0, features={fname: "NN"}))
+        assert ann1.type is sys.intern("Token")
+        assert next(iter(ann1.features)) is sys.intern("category")
+        annset = AnnotationSet()
+        assert annset.add(0, 1, "".join(["Tok", "en"])).type is sys.intern("Token")
+        assert annset.add_many([(0, 1, "".join(["Tok", "en"]))])[0].type is sys.intern("Token")
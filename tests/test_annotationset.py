@@ -84,6 +84,45 @@ class TestAnnotationSet01:
         assert len(ret) == 7
         # TODO: check other kinds of overlap in the original set!
 
+    def test_annotationset01m02(self):
+        """
+        Unit test method for adding many annotations at once
+        """
+        from gatenlp.document import Document
+        from gatenlp.annotation_set import InvalidOffsetError
+
+        doc = Document("0123456789")
+        annset = doc.annset()
+        annset.add(0, 2, "Existing")
+        # make sure the indices exist and get updated
+        assert len(annset.with_type("Existing")) == 1
+        assert len(annset.overlapping(0, 10)) == 1
+        anns = annset.add_many([(i, i + 1, "Char", {"i": i}) for i in range(10)] + [(0, 10, "All")])
+        assert len(anns) == 11
+        assert [a.id for a in anns] == list(range(1, 12))
+        assert len(annset) == 12
+        assert len(annset.with_type("Char")) == 10
+        assert len(annset.overlapping(3, 5)) == 3
+        assert annset.get(4).features["i"] == 3
+        assert len(annset.with_type("All").first().features) == 0
+        assert annset.add(0, 1, "Next").id == 12
+        try:
+            annset.add_many([(0, 11, "TooLong")])
+            assert False
+        except InvalidOffsetError:
+            pass
+        # an invalid annotation part-way through leaves the set unchanged
+        try:
+            annset.add_many([(0, 1, "Ok"), (0, 11, "TooLong"), (1, 2, "Ok")])
+            assert False
+        except InvalidOffsetError:
+            pass
+        assert len(annset) == 13
+        assert len(list(annset)) == 13
+        assert len(annset.with_type("Ok")) == 0
+        assert annset.add(0, 1, "Next").id == 13
+        assert len(annset.with_type("Next")) == 2
+
 
 class TestAnnotationSetRels:
 
@@ -372,3 +411,253 @@ class TestAnnotationSetEdit:
             assert ann.start == 2
             assert ann.end == 2
 
+
+    def test_annotationset_edit20(self):
+        doc = make_doc2()
+        annset = doc.annset()
+        annset.add(1, 9, "SPAN")
+        # make sure the offset indices exist and get updated
+        assert annset.start == 0
+        doc.edit([(8, 10, "x"), (0, 0, "abc"), (2, 5, "hhhh")], affected_strategy="keepadapt")
+        assert doc.text == "abc01hhhh567x"
+        for n, start, end in [("ANN0", 3, 4), ("ANN1", 4, 5), ("ANN2", 5, 6), ("ANN3", 6, 7), ("ANN4", 7, 8),
+                              ("ANN5", 9, 10), ("ANN7", 11, 12), ("ANN8", 12, 13), ("ANN9", 13, 13),
+                              ("SPAN", 4, 13)]:
+            ann = annset.with_type(n).first()
+            assert (ann.start, ann.end) == (start, end)
+        assert [a.type for a in annset.within(9, 12)] == ["ANN5", "ANN6", "ANN7"]
+        assert [a.type for a in annset.start_ge(12)] == ["ANN8", "ANN9"]
+        doc.edit([(3, 4, ""), (11, 13, "")], affected_strategy="delete_all")
+        assert doc.text == "abc1hhhh56"
+        # the zero length annotation at the end of the deleted range is not affected
+        assert [a.type for a in annset] == ["ANN1", "ANN2", "ANN3", "ANN4", "ANN5", "ANN6", "ANN9"]
+        assert [(a.start, a.end) for a in annset.within(8, 10)] == [(8, 9), (9, 10), (10, 10)]
+
+
+def check_indices(annset):
+    """
+    Check that all indices of the set which exist are the same as freshly built ones.
+    """
+    fresh = AnnotationSet(name="fresh")
+    fresh._annotations = dict(annset._annotations)
+    fresh.build_indices()
+    if annset._index_by_offset is not None:
+        assert list(annset._index_by_offset.irange()) == list(fresh._index_by_offset.irange())
+    if annset._index_by_ol is not None:
+        assert list(annset._index_by_ol.irange()) == list(fresh._index_by_ol.irange())
+    if annset._index_by_type is not None:
+        assert dict(annset._index_by_type) == dict(fresh._index_by_type)
+
+
+class TestAnnotationSetIndices:
+    def test_annotationset_indices01(self):
+        """
+        Unit test method (make linter happy)
+        """
+        doc = make_doc()
+        annset = doc.annset("set1")
+        annset.build_indices()
+        assert all(stats["built"] for stats in annset.index_stats().values())
+        check_indices(annset)
+        annset.add(5, 20, "Added")
+        annset.add_many([(1, 2, "Many"), (2, 40, "Many")])
+        check_indices(annset)
+        annset.remove(annset.with_type("Ann3").first())
+        annset.remove([ann.id for ann in annset.with_type("Many")])
+        check_indices(annset)
+        assert "Many" not in annset.type_names
+        assert [a.type for a in annset.start_ge(36)] == ["Ann12", "Ann4"]
+        doc.edit([(0, 2, ""), (20, 21, "xyz")], affected_strategy="adapt")
+        check_indices(annset)
+        doc.edit([(4, 5, ""), (30, 40, "")], affected_strategy="delete_all")
+        check_indices(annset)
+        ann = annset.first()
+        annset._update_offsets(ann.id, ann.start, ann.start)
+        check_indices(annset)
+        annset.clear()
+        assert not any(stats["built"] for stats in annset.index_stats().values())
+        annset.build_indices("ol")
+        annset.add(0, 1, "X")
+        check_indices(annset)
+        annset.drop_indices("ol")
+        assert not annset.index_stats()["ol"]["built"]
+        try:
+            annset.build_indices("unknown")
+            assert False
+        except Exception as ex:
+            assert "unknown" in str(ex)
+
+    def test_annotationset_indices02(self):
+        """
+        Unit test method (make linter happy)
+        """
+        from gatenlp.annotation_set import global_index_stats
+
+        doc = make_doc()
+        annset = doc.annset("set1")
+        global_index_stats(reset=True)
+        annset.within(0, 10)
+        annset.within(10, 20)
+        stats = annset.index_stats()
+        assert stats["offset"] == {"builds": 1, "lookups": 2, "built": True}
+        assert stats["type"]["builds"] == 0
+        assert global_index_stats()["offset"] == {"builds": 1, "lookups": 2}
+
+        # a detached copy shares the indices which already exist
+        detached = annset.detach()
+        assert detached._index_by_offset is annset._index_by_offset
+        detached.within(0, 10)
+        assert detached.index_stats()["offset"]["builds"] == 0
+        # modifying the original set does not change the detached set or its indices
+        annset.add(0, 1, "New")
+        assert detached._index_by_offset is not annset._index_by_offset
+        assert len(detached) == 12
+        assert len(detached.within(0, 1)) == 0
+        assert len(annset.within(0, 1)) == 1
+        assert global_index_stats(reset=True)["offset"] == {"builds": 1, "lookups": 5}
+        assert global_index_stats()["offset"] == {"builds": 0, "lookups": 0}
+        check_indices(annset)
+        check_indices(detached)
+        try:
+            detached.add(0, 1, "New")
+            assert False
+        except Exception:
+            pass
+
+
+class TestAnnotationSetFeatureIndex:
+    def test_annotationset_featureindex01(self):
+        """
+        Unit test method (make linter happy)
+        """
+        from gatenlp.annotation_set import UNHASHABLE_VALUES
+
+        doc = Document("0123456789" * 3)
+        annset = doc.annset()
+        cats = ["NN", "NNP", "VB", None]
+        for i in range(20):
+            fs = {} if cats[i % 4] is None else {"cat": cats[i % 4]}
+            annset.add(i, i + 1, "Token", fs)
+        annset.add(0, 5, "Lookup", {"cat": "NN"})
+
+        def brute(value):
+            return sorted(a.id for a in annset.with_type("Token") if a.features.get("cat", ()) == value)
+
+        def check():
+            for value in cats + [[1, 2], "XX"]:
+                assert sorted(a.id for a in annset.with_feature("Token", "cat", value)) == brute(value)
+
+        check()
+        annset.create_feature_index("Token", "cat")
+        assert annset.has_feature_index("Token", "cat")
+        check()
+        assert set(annset._feature_indices[("Token", "cat")].keys()) == {"NN", "NNP", "VB"}
+        # adding and removing annotations
+        annset.add(20, 21, "Token", {"cat": "XX"})
+        annset.add_many([(21, 22, "Token", {"cat": "NN"}), (22, 23, "Token", {"cat": [1, 2]})])
+        annset.remove(annset.with_feature("Token", "cat", "VB").first())
+        check()
+        # changing the features of the annotations in the set
+        ann = annset.with_feature("Token", "cat", "NNP").first()
+        ann.features["cat"] = "VB"
+        check()
+        ann.features["other"] = 1
+        del ann.features["cat"]
+        check()
+        annset.with_feature("Token", "cat", "NN").first().features.clear()
+        annset.with_feature("Token", "cat", [1, 2]).first().features["cat"] = "NN"
+        annset.get(3).features.update(cat="NNP")
+        check()
+        assert UNHASHABLE_VALUES not in annset._feature_indices[("Token", "cat")]
+        # the features of removed annotations are not tracked any more
+        removed = annset.with_feature("Token", "cat", "NNP").first()
+        annset.remove(removed)
+        removed.features["cat"] = "VB"
+        check()
+        # editing the document
+        doc.edit([(0, 2, "")], affected_strategy="delete_all")
+        check()
+        annset.clear()
+        check()
+        annset.add(0, 1, "Token", {"cat": "NN"})
+        check()
+        assert len(annset.with_feature("Token", "cat", "NN")) == 1
+        annset.drop_feature_index("Token", "cat")
+        assert not annset.has_feature_index("Token", "cat")
+        check()
+
+
+class TestAnnotationSetGroups:
+    def test_annotationset_groups01(self):
+        """
+        Unit test method (make linter happy)
+        """
+        import random
+
+        rng = random.Random(42)
+        doc = Document("x" * 60)
+        annset = doc.annset()
+        for _ in range(80):
+            start = rng.randint(0, 60)
+            end = min(60, start + rng.choice([0, 0, 1, 2, 3, 5, 10]))
+            annset.add(start, end, rng.choice(["Token", "Sentence", "Other"]))
+        other = doc.annset("other")
+        for _ in range(30):
+            start = rng.randint(0, 60)
+            other.add(start, min(60, start + rng.choice([0, 1, 4, 8, 20])), "Container")
+        for containers in [other, annset.with_type("Sentence"), list(annset)]:
+            groups = annset.group_within(containers)
+            assert list(groups.keys()) == list(containers)
+            for container, members in groups.items():
+                assert sorted(a.id for a in members) == sorted(a.id for a in annset.within(container))
+            groups = annset.group_within(containers, include_self=True)
+            for container, members in groups.items():
+                assert sorted(a.id for a in members) == \
+                    sorted(a.id for a in annset.within(container, include_self=True))
+            groups = annset.group_overlapping(containers)
+            assert list(groups.keys()) == list(containers)
+            for container, members in groups.items():
+                assert sorted(a.id for a in members) == sorted(a.id for a in annset.overlapping(container))
+            groups = annset.group_overlapping(containers, include_self=True)
+            for container, members in groups.items():
+                assert sorted(a.id for a in members) == \
+                    sorted(a.id for a in annset.overlapping(container, include_self=True))
+
+            # nearest annotations compared with checking all annotations
+            before = annset.nearest_before(containers)
+            after = annset.nearest_after(containers)
+            assert list(before.keys()) == list(containers)
+            for container in containers:
+                cands = [a for a in annset if a.end <= container.start and a is not container]
+                exp = max(cands, key=lambda a: (a.end, a.start, -a.id)) if cands else None
+                assert before[container] is exp
+                cands = [a for a in annset if a.start >= container.end and a is not container]
+                exp = min(cands, key=lambda a: (a.start, a.end, a.id)) if cands else None
+                assert after[container] is exp
+        assert annset.group_within([]) == {}
+        assert AnnotationSet().nearest_after(other)[other.first()] is None
+
+    def test_annotationset_edit21(self):
+        """
+        Unit test method (make linter happy)
+        """
+        for strategy in ["delete_all", "adapt", "keepadapt"]:
+            doc = Document("abcdefghij")
+            annset = doc.annset()
+            zann = annset.add(5, 5, "Z")
+            before = annset.add(3, 5, "Before")
+            after = annset.add(5, 7, "After")
+            doc.edit([(5, 5, "XX")], affected_strategy=strategy)
+            assert doc.text == "abcdeXXfghij"
+            assert (zann.start, zann.end) == (7, 7)
+            assert (before.start, before.end) == (3, 5)
+            assert (after.start, after.end) == (7, 9)
+            assert [a.type for a in annset.within(7, 7)] == ["Z"]
+            # a zero length annotation inside a replaced range
+            doc.edit([(6, 8, "")], affected_strategy=strategy)
+            if strategy == "delete_all":
+                assert "Z" not in annset.type_names
+            else:
+                assert (zann.start, zann.end) == (6, 6)
+            for ann in annset:
+                assert ann.start <= ann.end
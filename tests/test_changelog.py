@@ -67,6 +67,147 @@ class TestChangeLog01:
         annset1.clear()
         assert len(annset1) == 0
 
+    def test_changelog01m02(self):
+        """
+        Unit test method (make linter happy)
+        """
+        from gatenlp.document import Document, OFFSET_TYPE_JAVA
+        from gatenlp.changelog import ChangeLog, CompactChangeLog
+        from gatenlp.offsetmapper import OffsetMapper
+
+        text = "Just a simple \U0001F4A9 document with some words."
+
+        def make_changes(doc):
+            set1 = doc.annset()
+            set2 = doc.annset("Set2")
+            ann1 = set1.add(0, 4, "Token", {"n": 1})
+            ann2 = set1.add(16, 24, "Token", {"n": 2})
+            ann3 = set2.add(14, 15, "Emoji")
+            set1.add_many([(25, 29, "Token", {"n": 3}), (30, 34, "Token")])
+            # features of the added annotation get logged as they were when it was added
+            ann1.features["n"] = 11
+            ann1.features["pos"] = "RB"
+            ann1.features["pos"] = "NN"
+            ann1.features["pos"] = "NNP"
+            ann2.features["pos"] = "NN"
+            ann2.features.pop("pos")
+            ann2.features["pos"] = "VB"
+            ann2.features["pos"] = "VBZ"
+            ann3.features["x"] = 1
+            ann3.features.clear()
+            ann3.features["x"] = 2
+            ann3.features["x"] = 3
+            doc.features["f"] = 1
+            doc.features["f"] = 2
+            del doc.features["f"]
+            set2.remove(ann3)
+            set2.add(1, 2, "Other", {"k": "v"})
+            set2.clear()
+            set2.add(3, 4, "Other")
+
+        doc1 = Document(text, changelog=ChangeLog())
+        make_changes(doc1)
+        doc2 = Document(text, changelog=CompactChangeLog())
+        make_changes(doc2)
+        chl1 = doc1.changelog
+        chl2 = doc2.changelog
+        # repeated sets of the same feature are coalesced, but not across a removal of the feature,
+        # clearing the features or removing the annotation
+        assert len(chl1) == 24
+        assert len(chl2) == 20
+        setchanges = [(c["id"], c["value"]) for c in chl2.changes if c["command"] == "ann-feature:set"]
+        assert setchanges == [(0, 11), (0, "NNP"), (1, "NN"), (1, "VBZ"), (0, 1), (0, 3)]
+        assert chl2.changes[0] == chl1.changes[0]
+        assert chl2.changes[0]["features"] == {"n": 1}
+
+        # replaying both changelogs gives the same document
+        red1 = Document(text)
+        red1.apply_changes(chl1)
+        red2 = Document(text)
+        red2.apply_changes(chl2)
+        assert red1.to_dict() == red2.to_dict()
+        assert red2.annset().get(0).features.to_dict() == {"n": 11, "pos": "NNP"}
+        assert red2.annset().get(1).features.to_dict() == {"n": 2, "pos": "VBZ"}
+        assert [a.type for a in red2.annset("Set2")] == ["Other"]
+        assert red2.features.to_dict() == {}
+
+        # round trip through the dict representation and serialization
+        chl3 = ChangeLog.from_dict(chl2.to_dict())
+        assert chl3.changes == chl2.changes
+        om = OffsetMapper(text)
+        jsonstr = chl2.save_mem(offset_type=OFFSET_TYPE_JAVA, offset_mapper=om)
+        assert ChangeLog.load_mem(jsonstr, offset_mapper=om).changes == chl2.changes
+
+        # converting the offsets
+        java1 = chl1.fixup_changes(om, OFFSET_TYPE_JAVA, replace=False)
+        java2 = chl2.fixup_changes(om, OFFSET_TYPE_JAVA, replace=False)
+        assert [c.get("end") for c in java2 if c["command"] == "annotation:add"] == [4, 25, 16, 30, 35, 2, 4]
+        assert [c for c in java1 if c["command"] == "annotation:add"] == \
+            [c for c in java2 if c["command"] == "annotation:add"]
+        assert chl2.changes[1]["end"] == 24
+        chl2.fixup_changes(om, OFFSET_TYPE_JAVA, replace=True)
+        assert chl2.offset_type == OFFSET_TYPE_JAVA
+        assert chl2.changes == java2
+
+    def test_changelog01m03(self):
+        """
+        Unit test method for applying changes in batches
+        """
+        from gatenlp.document import Document
+        from gatenlp.changelog import ChangeLog
+        from gatenlp.changelog_consts import ADDANN_REPLACE_ANNOTATION, ADDANN_UPDATE_FEATURES, ADDANN_IGNORE
+
+        text = "Just a simple \U0001F4A9 document with some words."
+        chlog = ChangeLog()
+        doc = Document(text, changelog=chlog)
+        set1 = doc.annset()
+        set2 = doc.annset("Set2")
+        for i in range(20):
+            set1.add(i, i + 2, "Token", {"i": i})
+        set2.add(0, 5, "Other")
+        set1.add(3, 4, "Token")
+        set1.add_many([(i, i + 1, "Char") for i in range(5)])
+        set1.get(2).features["x"] = 1
+        set1.remove(3)
+        set1.add(5, 6, "After")
+        set2.clear()
+        set2.add(7, 8, "Other", {"k": "v"})
+        doc.features["f"] = 1
+        set1.get(4).features.clear()
+        set1.get(5).features.pop("i")
+
+        # applying all changes at once gives the same document as applying one change at a time
+        doc1 = Document(text)
+        doc1.apply_changes(chlog)
+        doc2 = Document(text)
+        for change in chlog.changes:
+            doc2.apply_changes(change)
+        assert doc1.to_dict() == doc.to_dict()
+        assert doc2.to_dict() == doc.to_dict()
+        assert doc1.annset().add(0, 1, "New").id == doc.annset().add(0, 1, "New").id
+
+        # annotations with ids which already exist in the set, also within a batch
+        changes = [
+            {"command": "annotation:add", "set": "", "start": 0, "end": 1, "type": "A", "features": {"a": 1},
+             "id": 0},
+            {"command": "annotation:add", "set": "", "start": 1, "end": 2, "type": "B", "features": {"b": 1},
+             "id": 1},
+            {"command": "annotation:add", "set": "", "start": 2, "end": 3, "type": "C", "features": {"c": 1},
+             "id": 0},
+        ]
+        for handling in [ADDANN_REPLACE_ANNOTATION, ADDANN_UPDATE_FEATURES, ADDANN_IGNORE]:
+            doc1 = Document(text)
+            doc1.apply_changes(changes, handle_existing_anns=handling)
+            doc2 = Document(text)
+            for change in changes:
+                doc2.apply_changes(change, handle_existing_anns=handling)
+            assert doc1.to_dict() == doc2.to_dict()
+        assert [(a.type, a.features.to_dict()) for a in doc1.annset()] == [("A", {"a": 1}), ("B", {"b": 1})]
+        doc1 = Document(text)
+        doc1.apply_changes(changes)
+        assert [(a.id, a.type, a.features.to_dict()) for a in doc1.annset()] == \
+            [(0, "A", {"a": 1}), (1, "B", {"b": 1}), (2, "C", {"c": 1})]
+
 
 class TestAnnotationSet01:
 
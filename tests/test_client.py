@@ -12,3 +12,150 @@ class TestClient01:
         from gatenlp.processing.client.elg import ElgTextAnnotator
         from gatenlp.processing.client.gatecloud import GateCloudAnnotator
         from gatenlp.processing.client.textrazor import TextRazorTextAnnotator
+
+
+class TestClient02:
+    def test_client02a(self):
+        """
+        Test concurrent processing, ordering and retries against a local stub server.
+        """
+        import json
+        import random
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from gatenlp.processing.client.gatecloud import GateCloudAnnotator
+
+        calls = dict(n=0, failed=set())
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                text = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+                with lock:
+                    calls["n"] += 1
+                    # fail the first request for each text with a temporary error
+                    fail = text not in calls["failed"]
+                    calls["failed"].add(text)
+                if fail:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                time.sleep(random.random() * 0.05)
+                data = json.dumps(dict(entities={"Word": [{"indices": [0, len(text)], "text": text}]}))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/gate+json")
+                self.end_headers()
+                self.wfile.write(data.encode("utf-8"))
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/"
+            annotator = GateCloudAnnotator(url=url, min_delay_ms=0, n_workers=4, max_retries=2)
+            annotator.backoff_s = 0.01
+            docs = [Document(f"text{i}") for i in range(20)]
+            docs.insert(5, None)
+            ret = list(annotator.pipe(docs))
+            assert len(ret) == 20
+            for i, doc in enumerate(ret):
+                assert doc.text == f"text{i}"
+                anns = doc.annset().with_type("Word")
+                assert len(anns) == 1
+                assert anns.first().features["text"] == f"text{i}"
+            assert calls["n"] == 40
+            doc = annotator(Document("single"))
+            assert len(doc.annset()) == 1
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_client02b(self):
+        """
+        Test the token bucket rate limiter.
+        """
+        from gatenlp.processing.client.base import TokenBucket
+
+        now = [0.0]
+
+        def sleep(secs):
+            now[0] += secs
+
+        bucket = TokenBucket(10, capacity=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(12):
+            bucket.acquire()
+        # two requests from the initial burst, then 10 at a rate of 10 per second
+        assert abs(now[0] - 1.0) < 1e-6
+        unlimited = TokenBucket(None)
+        unlimited.acquire()
+
+
+class TestClient03:
+    def test_client03a(self, tmp_path):
+        """
+        Test the response cache LRU eviction, statistics and persistence.
+        """
+        from gatenlp.processing.client.cache import ResponseCache
+
+        path = tmp_path / "cache.db"
+        cache = ResponseCache(str(path), max_entries=2)
+        key1 = ResponseCache.make_key("url", dict(a=1), "text1")
+        key2 = ResponseCache.make_key("url", dict(a=1), "text2")
+        key3 = ResponseCache.make_key("url", dict(a=2), "text1")
+        assert len({key1, key2, key3}) == 3
+        assert cache.get(key1) is None
+        cache.put(key1, dict(x=1))
+        cache.put(key2, dict(x=2))
+        assert cache.get(key1) == dict(x=1)
+        # key2 is now the least recently used and gets evicted
+        cache.put(key3, [3])
+        assert key2 not in cache
+        assert key1 in cache
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["evictions"] == 1
+        assert stats["entries"] == 2
+        cache.close()
+        cache = ResponseCache(str(path), max_entries=2)
+        assert len(cache) == 2
+        assert cache.get(key3) == [3]
+        cache.close()
+
+    def test_client03b(self):
+        """
+        Test that client annotators use the cache.
+        """
+        from gatenlp.processing.client.base import RestClientAnnotator
+        from gatenlp.processing.client.cache import ResponseCache
+
+        class MyAnnotator(RestClientAnnotator):
+            def __init__(self, cache=None):
+                self.url = "http://localhost/dummy"
+                self.n_requests = 0
+                self._init_client(n_workers=2, cache=cache)
+
+            def _request(self, doc, **kwargs):
+                self.n_requests += 1
+                return len(doc.text)
+
+            def _annotate(self, doc, data, **kwargs):
+                doc.annset().add(0, data, "All")
+                return doc
+
+        cache = ResponseCache()
+        annotator = MyAnnotator(cache=cache)
+        texts = ["a", "bb", "a", "ccc", "bb"]
+        docs = list(annotator.pipe([Document(t) for t in texts]))
+        assert [len(d.annset()) for d in docs] == [1] * 5
+        annotator(Document("ccc"))
+        assert annotator.n_requests <= 5
+        docs = list(annotator.pipe([Document(t) for t in texts]))
+        assert [d.annset().first().end for d in docs] == [1, 2, 1, 3, 2]
+        assert annotator.n_requests <= 5
+        assert len(cache) == 3
+        assert cache.stats()["hits"] >= 6
@@ -1,8 +1,10 @@
 import sys
 import os
+import json
+import time
 import pytest
 from gatenlp.document import Document
-from gatenlp.corpora import ListCorpus, ShuffledCorpus, EveryNthCorpus
+from gatenlp.corpora import ListCorpus, ShuffledCorpus, EveryNthCorpus, DocumentDestination, NullDestination
 
 TEXTS = [
     "00 This is the first document.",
@@ -55,3 +57,459 @@ class TestCorpora1:
         assert len(lc2) == 10
         for doc in lc2:
             assert doc == None
+
+
+class TestCorpora2:
+
+    def test_prefetchsource(self, tmp_path):
+        """
+        Unit test method (make linter happy)
+        """
+        from gatenlp.corpora import PrefetchSource, BdocjsLinesFileSource, JsonLinesFileSource
+        from gatenlp.corpora import DirFilesSource, DirFilesDestination
+        jsonlpath = str(tmp_path / "docs.bdocjs.jsonl")
+        with open(jsonlpath, "wt", encoding="utf-8") as outfp:
+            for idx, text in enumerate(TEXTS):
+                doc = Document(text)
+                doc.annset().add(0, 2, "Num", dict(idx=idx))
+                outfp.write(doc.save_mem(fmt="json"))
+                outfp.write("\n")
+        with BdocjsLinesFileSource(jsonlpath) as src:
+            docs = list(PrefetchSource(src, n_workers=3, prefetch=2))
+        assert [d.text for d in docs] == TEXTS
+        assert [d.annset().first().features["idx"] for d in docs] == list(range(len(TEXTS)))
+
+        jsonpath = str(tmp_path / "docs.jsonl")
+        with open(jsonpath, "wt", encoding="utf-8") as outfp:
+            for idx, text in enumerate(TEXTS):
+                outfp.write('{"text": "%s", "id": %d}\n' % (text, idx))
+        src = JsonLinesFileSource(jsonpath, feature_fields=["id"])
+        pf = PrefetchSource(src, n_workers=2)
+        docs = list(pf)
+        src.close()
+        assert [d.text for d in docs] == TEXTS
+        assert [d.features["id"] for d in docs] == list(range(len(TEXTS)))
+        assert pf.n == len(TEXTS)
+
+        dirpath = tmp_path / "dir"
+        dirpath.mkdir()
+        with DirFilesDestination(str(dirpath), path_from="idx:3") as dest:
+            for text in TEXTS:
+                dest.append(Document(text))
+        src = DirFilesSource(str(dirpath), sort=True, docname_from="index")
+        docs = list(PrefetchSource(src, n_workers=2, prefetch=3))
+        assert [d.text for d in docs] == TEXTS
+        assert [d.name for d in docs] == [str(i) for i in range(len(TEXTS))]
+        assert docs[0].features["_relpath"] == "000.bdocjs"
+
+        # a source which does not support separate reading and decoding, just read ahead
+        docs = list(PrefetchSource(ListCorpus([Document(t) for t in TEXTS]), prefetch=2))
+        assert [d.text for d in docs] == TEXTS
+
+        # stopping early must not hang
+        pf = PrefetchSource(BdocjsLinesFileSource(jsonlpath), prefetch=1)
+        for doc in pf:
+            break
+        assert pf.n == 1
+
+    def test_bufferedasyncdestination(self, tmp_path):
+        """
+        Unit test method (make linter happy)
+        """
+        from gatenlp.corpora import BufferedAsyncDestination, BdocjsLinesFileSource, BdocjsLinesFileDestination
+        from gatenlp.corpora import JsonLinesFileDestination, DirFilesDestination, DirFilesSource
+        jsonlpath = str(tmp_path / "docs.bdocjs.jsonl")
+        with BufferedAsyncDestination(
+                BdocjsLinesFileDestination(jsonlpath), n_workers=3, batch_size=2, max_pending=3, fsync="batch") as dest:
+            for text in TEXTS:
+                dest.append(Document(text))
+            dest.append(None)
+        assert dest.n == len(TEXTS)
+        assert dest.destination.n == len(TEXTS)
+        with BdocjsLinesFileSource(jsonlpath) as src:
+            assert [d.text for d in src] == TEXTS
+
+        jsonpath = str(tmp_path / "docs.jsonl")
+        with BufferedAsyncDestination(JsonLinesFileDestination(jsonpath), fsync="close") as dest:
+            for text in TEXTS:
+                dest.append(Document(text))
+        with open(jsonpath, "rt", encoding="utf-8") as infp:
+            assert [json.loads(line)["text"] for line in infp] == TEXTS
+
+        dirpath = tmp_path / "dir"
+        dirpath.mkdir()
+        with BufferedAsyncDestination(DirFilesDestination(str(dirpath), path_from="idx:3"), batch_size=3) as dest:
+            for text in TEXTS:
+                dest.append(Document(text))
+        assert [d.text for d in DirFilesSource(str(dirpath), sort=True)] == TEXTS
+
+        gzdirpath = tmp_path / "gzdir"
+        gzdirpath.mkdir()
+        with BufferedAsyncDestination(
+                DirFilesDestination(str(gzdirpath), ext="bdocjs.gz", path_from="idx:3")) as dest:
+            for text in TEXTS:
+                dest.append(Document(text))
+        assert [d.text for d in DirFilesSource(str(gzdirpath), exts=[".bdocjs.gz"], sort=True)] == TEXTS
+
+        # destinations without support for raw writing just get appended to on the writer thread
+        nulldest = NullDestination()
+        with BufferedAsyncDestination(nulldest) as dest:
+            for text in TEXTS:
+                dest.append(Document(text))
+        assert nulldest.n == len(TEXTS)
+
+        # errors get raised when closing
+        class FailingDestination(DocumentDestination):
+            def append(self, doc):
+                raise Exception("Failed")
+        dest = BufferedAsyncDestination(FailingDestination())
+        dest.append(Document("x"))
+        with pytest.raises(Exception, match="Failed"):
+            dest.close()
+
+        # after a failed write, no more documents get written and every later call raises the error
+        class FailOnceDestination(DocumentDestination):
+            def __init__(self):
+                super().__init__()
+                self.written = []
+
+            def append(self, doc):
+                if doc.text == "1" and not self.written[1:]:
+                    self.written.append(None)
+                    raise Exception("Failed once")
+                self.written.append(doc.text)
+        faildest = FailOnceDestination()
+        dest = BufferedAsyncDestination(faildest, batch_size=1)
+        nraised = 0
+        for i in range(12):
+            try:
+                dest.append(Document(str(i)))
+            except Exception as ex:  # pylint: disable=W0703
+                assert "Failed once" in str(ex)
+                nraised += 1
+        with pytest.raises(Exception, match="Failed once"):
+            dest.close()
+        with pytest.raises(Exception, match="Failed once"):
+            dest.close()
+        assert faildest.written == ["0", None]
+        assert dest.n == 1
+        with pytest.raises(Exception, match="Failed once"):
+            dest.append(Document("12"))
+
+        # the same when writing serialized documents in batches
+        class FailingDirFilesDestination(DirFilesDestination):
+            def _write_raw(self, items, sync=False):
+                if self.n > 0:
+                    raise Exception("Failed raw")
+                super()._write_raw(items, sync=sync)
+        faildirpath = tmp_path / "faildir"
+        faildirpath.mkdir()
+        dest = BufferedAsyncDestination(
+            FailingDirFilesDestination(str(faildirpath), path_from="idx:3"), batch_size=2, fsync="close")
+        with pytest.raises(Exception, match="Failed raw"):
+            for text in TEXTS * 5:
+                dest.append(Document(text))
+            dest.close()
+        with pytest.raises(Exception, match="Failed raw"):
+            dest.close()
+        assert dest.n == dest.destination.n
+        assert len(list(DirFilesSource(str(faildirpath)))) == dest.n
+
+    def test_bufferedasyncdestination_fsync(self, tmp_path, monkeypatch):
+        """
+        Unit test method (make linter happy)
+        """
+        import os
+        from gatenlp.corpora import BufferedAsyncDestination, DirFilesDestination, DirFilesSource
+
+        synced = []
+        orig_fsync = os.fsync
+
+        def fsync(fd):
+            synced.append(fd)
+            orig_fsync(fd)
+
+        def sync():
+            raise Exception("Must not sync all filesystems")
+        monkeypatch.setattr(os, "fsync", fsync)
+        monkeypatch.setattr(os, "sync", sync, raising=False)
+        dirpath = tmp_path / "dir"
+        dirpath.mkdir()
+        with BufferedAsyncDestination(
+                DirFilesDestination(str(dirpath), path_from="idx:3:2"), batch_size=2, fsync="close") as dest:
+            for text in TEXTS:
+                dest.append(Document(text))
+            assert not synced
+        assert dest.destination._unsynced == []
+        # one for each file and its directory
+        assert len(synced) == len(TEXTS) + len(set(os.path.dirname(p) for p in DirFilesSource(str(dirpath)).paths))
+        assert [d.text for d in DirFilesSource(str(dirpath), sort=True)] == TEXTS
+
+    def test_compressedlines(self, tmp_path):
+        """
+        Unit test method (make linter happy)
+        """
+        from gatenlp.corpora import BdocjsLinesFileSource, BdocjsLinesFileDestination
+        from gatenlp.corpora import JsonLinesFileSource, JsonLinesFileDestination
+        from gatenlp.urlfileutils import yield_lines_from, read_block_index, open_compressed
+        for ext in ["gz", "bz2"]:
+            path = str(tmp_path / f"docs.jsonl.{ext}")
+            with BdocjsLinesFileDestination(path) as dest:
+                for text in TEXTS:
+                    dest.append(Document(text))
+            with BdocjsLinesFileSource(path) as src:
+                assert [d.text for d in src] == TEXTS
+            assert len(list(yield_lines_from(path))) == len(TEXTS)
+            path = str(tmp_path / f"texts.jsonl.{ext}")
+            with JsonLinesFileDestination(path) as dest:
+                for text in TEXTS:
+                    dest.append(Document(text))
+            with JsonLinesFileSource(path) as src:
+                assert [d.text for d in src] == TEXTS
+
+        # block compressed, use a tiny block size to get several blocks
+        texts = [f"{i:04d} Document number {i}" for i in range(2000)]
+        path = str(tmp_path / "docs.bdocjs.gz")
+        with BdocjsLinesFileDestination(open_compressed(path, "wt", compression="blockgzip", block_size=2000)) as dest:
+            for text in texts:
+                dest.append(Document(text))
+        index = read_block_index(path)
+        assert len(index) > 5
+        assert sum(nlines for _, _, nlines in index) == len(texts)
+        # can be read as a normal gzip file, or using the index
+        with BdocjsLinesFileSource(path, compression="gzip") as src:
+            assert [d.text for d in src] == texts
+        with BdocjsLinesFileSource(path, n_workers=3) as src:
+            assert src.compression == "blockgzip"
+            assert [d.text for d in src] == texts
+        parts = []
+        for partnr in range(3):
+            with BdocjsLinesFileSource(path, nparts=3, partnr=partnr, n_workers=2) as src:
+                parts.append([d.text for d in src])
+        assert all(len(p) > 0 for p in parts)
+        assert parts[0] + parts[1] + parts[2] == texts
+
+    def test_byterangeparts(self, tmp_path):
+        """
+        Unit test method (make linter happy)
+        """
+        from gatenlp.corpora import BdocjsLinesFileSource, BdocjsLinesFileDestination
+        from gatenlp.corpora import JsonLinesFileSource, TsvFileSource
+        texts = [f"{i:03d} Document number {i}" + "x" * (i % 7) for i in range(50)]
+        path = str(tmp_path / "docs.bdocjs.jsonl")
+        with BdocjsLinesFileDestination(path) as dest:
+            for text in texts:
+                dest.append(Document(text))
+        for nparts in [1, 2, 3, 7, 60]:
+            alltexts = []
+            for partnr in range(nparts):
+                with BdocjsLinesFileSource(path, nparts=nparts, partnr=partnr) as src:
+                    assert src.nparts == nparts
+                    alltexts.extend(d.text for d in src)
+            assert alltexts == texts
+
+        path = str(tmp_path / "texts.jsonl")
+        with open(path, "wt", encoding="utf-8") as outfp:
+            for text in texts:
+                outfp.write(json.dumps(dict(text=text)) + "\n")
+        alltexts = []
+        for partnr in range(4):
+            with JsonLinesFileSource(path, nparts=4, partnr=partnr) as src:
+                alltexts.extend(d.text for d in src)
+        assert alltexts == texts
+
+        path = str(tmp_path / "texts.tsv")
+        with open(path, "wt", encoding="utf-8") as outfp:
+            outfp.write("id\ttext\n")
+            for idx, text in enumerate(texts):
+                outfp.write(f"{idx}\t{text}\n")
+        alltexts = []
+        allids = []
+        for partnr in range(3):
+            src = TsvFileSource(path, text_col="text", feature_cols=dict(id="id"), nparts=3, partnr=partnr)
+            for doc in src:
+                alltexts.append(doc.text)
+                allids.append(doc.features["id"])
+        assert alltexts == texts
+        assert allids == [str(i) for i in range(len(texts))]
+
+    def test_pathindex(self, tmp_path, monkeypatch):
+        """
+        Unit test method (make linter happy)
+        """
+        import pickle
+        from gatenlp.corpora import PathIndex, DirFilesDestination, DirFilesSource, DirFilesCorpus
+        from gatenlp.corpora.dirs import matching_paths
+        # by default, the index files get stored in the user cache directory
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+        dirpath = str(tmp_path / "docs")
+        os.makedirs(dirpath)
+        with DirFilesDestination(dirpath, path_from="idx:4:2") as dest:
+            for text in TEXTS:
+                dest.append(Document(text))
+        with open(os.path.join(dirpath, "other.txt"), "wt") as outfp:
+            outfp.write("not a document")
+        expected = sorted(matching_paths(dirpath, exts=[".bdocjs"]))
+        pidx = PathIndex(dirpath, exts=".bdocjs", n_workers=2)
+        assert len(pidx) == len(TEXTS)
+        assert list(pidx) == expected
+        assert pidx.index_path.startswith(str(tmp_path / "cache"))
+        assert sorted(os.listdir(dirpath)) == ["00", "other.txt"]
+        assert pidx[-1] == expected[-1]
+        with pytest.raises(IndexError):
+            pidx[len(TEXTS)]
+        # the index gets reused, and can be pickled
+        pidx2 = pickle.loads(pickle.dumps(PathIndex(dirpath, exts=".bdocjs")))
+        assert list(pidx2) == expected
+        assert sorted(matching_paths(dirpath)) == sorted(expected + ["other.txt"])
+
+        corpus = DirFilesCorpus(dirpath, path_index=True)
+        assert len(corpus) == len(TEXTS)
+        assert [corpus[i].text for i in range(len(corpus))] == TEXTS
+        corpus = DirFilesCorpus(dirpath, path_index=True, nparts=3, partnr=1)
+        assert [corpus[i].text for i in range(len(corpus))] == TEXTS[1::3]
+
+        corpus0 = DirFilesCorpus(dirpath, path_index=True)
+        corpus2 = DirFilesCorpus(dirpath, path_index=True, nparts=3, partnr=len(TEXTS) % 3)
+
+        # add a new document, the source refreshes the index
+        Document("new document").save(os.path.join(dirpath, "00", "99.bdocjs"))
+        time.sleep(0.01)
+        src = DirFilesSource(dirpath, exts=[".bdocjs"], path_index=True)
+        assert [d.text for d in src] == TEXTS + ["new document"]
+        # refreshing the paths of a corpus changes its size
+        assert corpus0.paths.refresh() == 0
+        assert len(corpus0) == len(TEXTS) + 1
+        assert corpus0.size == len(TEXTS) + 1
+        assert corpus0[len(TEXTS)].text == "new document"
+        size2 = len(corpus2)
+        assert corpus2.paths.refresh() == 1
+        assert corpus2.size == size2 + 1
+        assert corpus2[size2].text == "new document"
+        assert pidx2.refresh() == 0
+        pidx2.close()
+        pidx.close()
+        # rebuilding sorts all paths
+        pidx = PathIndex(dirpath, exts=".bdocjs")
+        pidx.build()
+        assert pidx[-1] == os.path.join("00", "99.bdocjs")
+        pidx.close()
+
+    def test_cachedcorpus(self):
+        """
+        Unit test method (make linter happy)
+        """
+        from gatenlp.corpora import CachedCorpus
+        base = ListCorpus([Document(t) for t in TEXTS])
+        cc = CachedCorpus(base, max_docs=2)
+        assert len(cc) == len(TEXTS)
+        assert cc[0].text == TEXTS[0]
+        assert cc[1].text == TEXTS[1]
+        assert cc[0].text == TEXTS[0]
+        assert cc[2].text == TEXTS[2]   # evicts 1
+        assert cc[1].text == TEXTS[1]
+        stats = cc.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 4 and stats["evictions"] == 2 and stats["docs"] == 2
+        # write through
+        doc = cc[3]
+        doc.features["x"] = 1
+        cc.store(doc)
+        assert base[3].features["x"] == 1
+
+        # write back
+        base = ListCorpus([Document(t) for t in TEXTS])
+        cc = CachedCorpus(base, max_docs=2, write_mode="back")
+        cc[0] = Document("changed 0")
+        cc[1] = Document("changed 1")
+        assert base[0].text == TEXTS[0]
+        cc[2] = Document("changed 2")   # evicts 0
+        assert base[0].text == "changed 0"
+        assert base[1].text == TEXTS[1]
+        cc.flush()
+        assert base[1].text == "changed 1"
+        assert base[2].text == "changed 2"
+
+        # second level cache, caching only
+        base = ListCorpus([Document(t) for t in TEXTS])
+        cache2 = ListCorpus.empty(len(TEXTS))
+        cc = CachedCorpus(base, cache2, cacheonread=True, max_docs=None, max_bytes=800)
+        for idx in range(len(TEXTS)):
+            assert cc[idx].text == TEXTS[idx]
+        assert all(d is not None for d in cache2)
+        assert cc.stats()["bytes"] <= 800
+        assert cc.stats()["evictions"] > 0
+        cc[0] = Document("processed")
+        assert base[0].text == TEXTS[0]
+        assert cache2[0].text == "processed"
+        cc2 = CachedCorpus(base, cache2)
+        assert cc2[0].text == "processed"
+        assert cc2.stats()["cache2_hits"] == 1
+
+    def test_mmapfilecorpus(self, tmp_path):
+        """
+        Unit test method (make linter happy)
+        """
+        import pickle
+        from gatenlp.corpora import MmapFileCorpus
+        docs = []
+        for idx, text in enumerate(TEXTS):
+            doc = Document(text)
+            doc.annset("set1").add(0, 2, "Num", dict(idx=idx))
+            docs.append(doc)
+        for fmt in ["json", "msgpack"]:
+            path = str(tmp_path / f"corpus.{fmt}.mmc")
+            corpus = MmapFileCorpus.create(path, docs, fmt=fmt)
+            assert len(corpus) == len(TEXTS)
+            assert corpus[3].text == TEXTS[3]
+            assert corpus[3].annset("set1").first().features["idx"] == 3
+            assert [d.text for d in corpus] == TEXTS
+            corpus2 = pickle.loads(pickle.dumps(EveryNthCorpus(corpus, nparts=2, partnr=1)))
+            assert [corpus2[i].text for i in range(len(corpus2))] == TEXTS[1::2]
+            shuffled = ShuffledCorpus(corpus, seed=42)
+            assert sorted(d.text for d in shuffled) == TEXTS
+            with pytest.raises(Exception):
+                corpus[0] = docs[0]
+            corpus.close()
+        corpus = MmapFileCorpus.create(str(tmp_path / "empty.mmc"), [])
+        assert len(corpus) == 0
+        assert list(corpus) == []
+
+    def test_pandas_parquet(self, tmp_path):
+        """
+        Unit test method (make linter happy)
+        """
+        try:
+            import pandas as pd
+            import pyarrow
+        except ImportError:
+            pytest.skip("pandas or pyarrow not installed")
+        from gatenlp.corpora import PandasDfSource, ParquetSource, ParquetDestination
+        df = pd.DataFrame(dict(text=TEXTS, id=list(range(len(TEXTS))), other=["x"] * len(TEXTS)))
+        src = PandasDfSource(df, text_col="text", feature_cols=dict(docid="id"), data_cols=["other"], batch_size=3)
+        docs = list(src)
+        assert [d.text for d in docs] == TEXTS
+        assert [d.features["docid"] for d in docs] == list(range(len(TEXTS)))
+        assert docs[2].features["__data"] == dict(other="x")
+        assert src.n == len(TEXTS)
+
+        path = str(tmp_path / "docs.parquet")
+        with ParquetDestination(path, feature_cols=dict(docid="id"), bdocjs_col="bdocjs", batch_size=2) as dest:
+            for doc in docs:
+                doc.annset().add(0, 2, "Num")
+                dest.append(doc)
+        assert dest.n == len(TEXTS)
+        src = ParquetSource(path, feature_cols=["id"], data_cols=True, batch_size=3)
+        docs2 = list(src)
+        assert [d.text for d in docs2] == TEXTS
+        assert [d.features["id"] for d in docs2] == list(range(len(TEXTS)))
+        assert set(docs2[0].features["__data"].keys()) == {"text", "id", "bdocjs"}
+        assert len(docs2[0].annset()) == 0
+        src = ParquetSource(path, text_col=None, bdocjs_col="bdocjs")
+        docs3 = list(src)
+        assert [d.text for d in docs3] == TEXTS
+        assert all(len(d.annset()) == 1 for d in docs3)
+        # each batch of 2 documents is a row group, the parts get a share of the row groups
+        texts = []
+        for partnr in range(3):
+            texts.extend(d.text for d in ParquetSource(path, nparts=3, partnr=partnr))
+        assert texts == TEXTS
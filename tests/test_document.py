@@ -81,6 +81,46 @@ class TestDocument01:
         doc.text = "some text"
         assert doc.text == "some text"
 
+    def test_document01m04(self):
+        """
+        Unit test method (make linter happy)
+        """
+        import copy
+        doc = Document("some text here")
+        doc.features["list"] = [1, 2]
+        annset = doc.annset()
+        annset.add(0, 4, "Word", dict(x=[1]))
+        annset.add(5, 9, "Word")
+        annset.add(10, 14, "Other")
+        doc.annset("Set2").add(0, 14, "Sent")
+        assert len(annset.within(0, 9)) == 2
+        # copies share everything until modified
+        doc2 = doc.copy()
+        assert doc2.to_dict() == doc.to_dict()
+        assert doc2.annset()._annotations is annset._annotations
+        doc2.annset().add(0, 14, "New")
+        doc2.features["new"] = 1
+        doc2.annset("Set2").clear()
+        assert len(doc2.annset()) == 4 and len(annset) == 3
+        assert len(doc2.annset().within(0, 9)) == 2 and len(doc2.annset().with_type("New")) == 1
+        assert len(annset.with_type("New")) == 0
+        assert "new" not in doc.features
+        assert len(doc.annset("Set2")) == 1
+        annset.remove(annset.with_type("Other").first())
+        assert len(annset) == 2 and len(doc2.annset().with_type("Other")) == 1
+        # copy restricted to some types keeps the annotation ids
+        doc3 = doc.copy(annspec=[("", "Word")])
+        assert [a.id for a in doc3.annset()] == [0, 1]
+        assert doc3.annset().name == ""
+        # clones and deep copies share nothing
+        for doc4 in [doc.clone(), copy.deepcopy(doc)]:
+            assert doc4.to_dict() == doc.to_dict()
+            doc4.features["list"].append(3)
+            doc4.annset().first().features["x"].append(2)
+            assert doc.features["list"] == [1, 2]
+            assert annset.first().features["x"] == [1]
+            assert doc4.annset().first().owning_set() is doc4.annset()
+
 def make_doc():
     doc = Document("0123456789")
     annset = doc.annset()
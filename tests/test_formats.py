@@ -60,6 +60,32 @@ class TestFormatGateXml:
         assert ann2.end == 8
         assert ann2.id == 1
 
+    def test_formatgatexml02(self):
+        """
+        Unit test method (make linter happy)
+        """
+        from gatenlp.document import Document
+
+        tstpath = os.path.join(os.path.abspath(os.path.curdir), "tests")
+        doc = Document.load(
+            source=os.path.join(tstpath, "testdoc1.xml"),
+            fmt="gatexml",
+            show_warnings=False,
+            skip_sets=["Set2"],
+        )
+        assert doc.annset_names() == [""]
+        assert len(doc.annset()) == 2
+        assert doc.features["fInt1"] == 222
+        doc = Document.load(
+            source=os.path.join(tstpath, "testdoc1.xml"),
+            fmt="gatexml",
+            show_warnings=False,
+            skip_types=["Type1"],
+        )
+        assert len(doc.annset()) == 0
+        # annotation ids of skipped annotations are not re-used
+        assert doc.annset().add(0, 1, "Type1").id == 2
+
 
 class TestFormatYaml:
 
@@ -356,3 +382,52 @@ class TestFormatHtml:
         # html5lib includes a zero length head annotation for the missing head, so one more annotation than
         # other parsers!
         assert set1.size == 5
+
+    def test_formathtml04(self):
+        """
+        Unit test method (make linter happy)
+        """
+        from gatenlp.document import Document
+        html = """<!DOCTYPE html><html><head><title>T &amp; t</title><script>var a="<p>";</script></head>
+<body class="a b" data-x>
+<!-- a comment -->
+<h1 id=h>Heading</h1>
+<p>Para one<br>next line<p>Para two <b>bold <i>it</b> after</i>
+<ul><li>one<li>two</ul><div>Before<style>p {}</style><img src="x.png"/>tail</div>
+</body></html>"""
+        # whitespace-only text between elements gets collapsed like with the tree based parsers
+        indented = """<html>
+  <head><title>T</title></head>
+  <body>
+    <div>
+      <p>a</p>
+      <p>b <b>c</b> <i>d</i></p>
+      <pre>
+  x  y
+   </pre>
+      <span> </span><span>e</span>
+    </div>
+  </body>
+</html>
+"""
+
+        def spans(doc):
+            return [(a.start, a.end, a.type, a.features.to_dict()) for a in doc.annset("Original markups")]
+
+        parsers = [("html.parser", "stream")]
+        try:
+            import lxml
+            parsers.append(("lxml", "lxml-stream"))
+        except ImportError:
+            pass
+        for treeparser, streamparser in parsers:
+            for thehtml in [html, indented, "<p>a</p>\n\n<p>b</p>\n"]:
+                doc1 = Document.load_mem(thehtml, fmt="html", parser=treeparser)
+                doc2 = Document.load_mem(thehtml, fmt="html", parser=streamparser)
+                assert doc1.text == doc2.text
+                assert spans(doc1) == spans(doc2)
+        assert Document.load_mem(indented, fmt="html", parser="stream").text == "\nT\na\nb c d\n\n  x  y\n   \n e\n"
+        tstpath = os.path.join(os.path.abspath(os.path.curdir), "tests")
+        doc = Document.load(source=os.path.join(tstpath, "file1.html"), parser="stream")
+        assert "some heading" in doc.text
+        assert doc.annset("Original markups").size == 4
@@ -35,3 +35,21 @@ class TestTextNormalizer1:
         tn_nfc = TextNormalizer(form="NFC")
         doc5 = tn_nfc(doc3)
         assert doc5.text == TEXT_NFC
+
+    def test_edit(self):
+        """
+        Unit test method (make linter happy)
+        """
+        doc1 = Document("The ﬁne ｆｏｏ é Äffin.", features=dict(a=1))
+        annset = doc1.annset()
+        annset.add(0, 3, "Word")
+        annset.add(4, 7, "Word")
+        annset.add(8, 11, "Word")
+        annset.add(12, 14, "Word")
+        annset.add(15, 20, "Word")
+        assert [doc1[ann] for ann in annset] == ["The", "\ufb01ne", "\uff46\uff4f\uff4f", "e\u0301", "\u00c4ffin"]
+        doc2 = TextNormalizer(form="NFKC", edit=True)(doc1)
+        assert doc2 is doc1
+        assert doc2.text == "The fine foo \u00e9 \u00c4ffin."
+        assert [doc2[ann] for ann in annset] == ["The", "fine", "foo", "\u00e9", "\u00c4ffin"]
+        assert doc2.features == dict(a=1)
@@ -671,3 +671,29 @@ Caused by:
 
         parser1 = Function(fun1)
         assert parser1.parse(1, 2) == (1, 2)
+
+    def test03(self):
+        """
+        Unit test method (make linter happy)
+        """
+        import re
+        from gatenlp.pam.matcher import FeatureMatcher
+
+        doc = Document("The quick brown fox jumps")
+        annset = doc.annset()
+        for i, (cat, kind) in enumerate([("DT", "a"), ("JJ", "a"), ("JJ", "b"), ("NN", "a"), ("VBZ", 1)]):
+            annset.add(i * 4, i * 4 + 3, "Token", dict(category=cat, kind=kind))
+        annset.add(0, 3, "Other", dict(category="JJ"))
+        matchers = [
+            FeatureMatcher(category="JJ"),
+            FeatureMatcher(category="JJ", kind="b"),
+            FeatureMatcher(kind="1"),
+            FeatureMatcher(category=re.compile("N|V")),
+        ]
+        expected = [[id(a) for a in annset.with_type("Token") if m(a.features)] for m in matchers]
+        for withindex in [False, True]:
+            if withindex:
+                annset.create_feature_index("Token", "category")
+                annset.create_feature_index("Token", "kind")
+            for matcher, exp in zip(matchers, expected):
+                assert sorted(id(a) for a in matcher.select(annset, "Token")) == sorted(exp)
@@ -172,3 +172,108 @@ class TestSpacy01:
         for ann in containing_set1:
             assert ann.features["number"] == ann.features["Number_freq"]
 
+    def test_spacy04(self):
+        """
+        Unit test method to test batched processing with the pipe method
+        """
+        try:
+            import spacy
+            from gatenlp.lib_spacy import AnnSpacy
+        except ImportError:
+            logger.warning("Module spacy not installed, skipping spacy test")
+            return
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        annspacy = AnnSpacy(pipeline=nlp, add_nounchunks=False, batchsize=2)
+        texts = ["Barack Obama was born in Hawaii.  He was elected president in 2008.",
+                 "", "Another document.", "And one more document here."]
+        docs = [Document(t) for t in texts]
+        ret = list(annspacy.pipe(docs[:2] + [None] + docs[2:]))
+        assert all(r is d for r, d in zip(ret, docs))
+        for doc in ret:
+            expected = annspacy(Document(doc.text)).annset()
+            anns = doc.annset()
+            assert len(anns) == len(expected)
+            assert [(a.start, a.end, a.type) for a in anns] == [(a.start, a.end, a.type) for a in expected]
+        assert len(ret[0].annset().with_type("Sentence")) == 2
+        assert len(ret[0].annset().with_type("Token")) == 14
+
+        # only process the text covered by containing annotations
+        doc1 = Document("Barack Obama was born in Hawaii. He was elected president in 2008. ")
+        doc1.annset("in").add(0, 32, "Sentence")
+        doc1.annset("in").add(33, 67, "Sentence")
+        doc2 = Document("Nothing to process here.")
+        annspacy = AnnSpacy(pipeline=nlp, outsetname="out", add_nounchunks=False,
+                            containing_anns_desc=("in", "Sentence"))
+        ret = list(annspacy.pipe([doc1, doc2]))
+        assert ret == [doc1, doc2]
+        tokens = doc1.annset("out").with_type("Token")
+        assert len(tokens) == 14
+        assert doc1[tokens.first()] == "Barack"
+        assert doc1[tokens.last()] == "."
+        assert tokens.last().start == 65
+        assert len(doc2.annset("out")) == 0
+
+        # with several processes, the original documents get yielded and annotated
+        doc1.annset("out").clear()
+        doc2.annset("out").clear()
+        docs = [Document(t) for t in texts]
+        annspacy = AnnSpacy(pipeline=nlp, add_nounchunks=False, batchsize=1, n_process=2)
+        ret = list(annspacy.pipe(docs))
+        assert len(ret) == len(docs)
+        assert all(r is d for r, d in zip(ret, docs))
+        assert len(docs[0].annset().with_type("Token")) == 14
+        annspacy = AnnSpacy(pipeline=nlp, outsetname="out", add_nounchunks=False, batchsize=1, n_process=2,
+                            containing_anns_desc=("in", "Sentence"))
+        ret = list(annspacy.pipe([doc1, doc2]))
+        assert ret[0] is doc1 and ret[1] is doc2
+        assert len(doc1.annset("out").with_type("Token")) == 14
+        assert len(doc2.annset("out")) == 0
+
+    def test_spacy05(self):
+        """
+        Unit test method to test the conversion of token attributes and feature groups
+        """
+        try:
+            import spacy
+            from spacy.tokens import Doc
+            from gatenlp.lib_spacy import spacy2gatenlp
+        except ImportError:
+            logger.warning("Module spacy not installed, skipping spacy test")
+            return
+        nlp = spacy.blank("en")
+        sdoc = Doc(nlp.vocab, words=["Barack", "Obama", "was", "born", "."],
+                   spaces=[True, True, True, False, False],
+                   pos=["PROPN", "PROPN", "AUX", "VERB", "PUNCT"],
+                   tags=["NNP", "NNP", "VBD", "VBN", "."],
+                   deps=["compound", "nsubjpass", "auxpass", "ROOT", "punct"],
+                   heads=[1, 3, 3, 3, 3],
+                   lemmas=["Barack", "Obama", "be", "bear", "."],
+                   ents=["B-PERSON", "I-PERSON", "O", "O", "O"])
+        gdoc = spacy2gatenlp(sdoc, add_nounchunks=False)
+        anns = gdoc.annset()
+        tokens = list(anns.with_type("Token"))
+        assert len(tokens) == 5
+        assert len(anns.with_type("SpaceToken")) == 3
+        assert len(anns.with_type("PERSON")) == 1
+        for tok, stok in zip(tokens, sdoc):
+            fm = tok.features
+            assert gdoc[tok] == stok.text
+            assert fm["_i"] == stok.i
+            assert fm["pos"] == stok.pos_
+            assert fm["tag"] == stok.tag_
+            assert fm["lemma"] == stok.lemma_
+            assert fm["dep"] == stok.dep_
+            assert fm["ent_type"] == stok.ent_type_
+            assert fm["is_sent_start"] == stok.is_sent_start
+            assert fm["is_title"] == stok.is_title
+            assert fm["is_punct"] == stok.is_punct
+            assert fm["orth"] == stok.orth
+            assert fm["prob"] == stok.prob
+            assert anns.get(fm["head"]).features["_i"] == stok.head.i
+            assert anns.get(fm["left_edge"]).features["_i"] == stok.left_edge.i
+            assert anns.get(fm["right_edge"]).features["_i"] == stok.right_edge.i
+
+        gdoc = spacy2gatenlp(sdoc, add_nounchunks=False, add_dep=False, token_features=["tags"])
+        tok = gdoc.annset().with_type("Token").first()
+        assert set(tok.features.keys()) == {"_i", "pos", "tag", "ent_type"}
@@ -32,6 +32,17 @@ class TestStanza01:
         # assert len(words) == 14
         tokens = anns.with_type("Token")
         assert len(tokens) == 14
+        # the token features are the same as when converting from the dict representation of the stanza tokens,
+        # except for the head, which is mapped to the annotation id
+        from gatenlp.lib_stanza import tok2tok
+        stokens = [token for sent in sdoc.sentences for token in sent.tokens]
+        assert len(stokens) == len(tokens)
+        for token, ann in zip(stokens, tokens):
+            expected = tok2tok(token.to_dict()[0])["fm"]
+            expected.pop("head", None)
+            fm = ann.features.to_dict()
+            fm.pop("head", None)
+            assert fm == expected
 
         doc = Document(txt)
         annstanza = AnnStanza(pipeline=nlp, batchsize=50)
@@ -76,3 +87,18 @@ class TestStanza01:
         d_pipe_d = d_pipe.to_dict()
         d_call_d = d_call.to_dict()
         assert d_pipe_d == d_call_d
+
+    def test_stanza02(self):
+        """
+        Unit test method for splitting texts into chunks
+        """
+        try:
+            from gatenlp.lib_stanza import text_chunks
+        except ImportError:
+            logger.warning("Module stanza not installed, skipping stanza test")
+            return
+        txt = "Hello world I don't know\nSecond line here\n\nThird Para  x"
+        spans = text_chunks(txt, 20)
+        assert spans == [(0, 20), (20, 25), (25, 43), (43, 56)]
+        assert text_chunks(txt, 100) == [(0, len(txt))]
+        assert text_chunks("abcdefghij", 4) == [(0, 4), (4, 8), (8, 10)]